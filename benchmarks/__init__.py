@@ -0,0 +1,6 @@
+"""Offline benchmarks of importers
+
+Run from repository root, e.g.:
+
+    PYTHONPATH=src python -m benchmarks.run --importers trello monday --sizes 1k 10k
+"""
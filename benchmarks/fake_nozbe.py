@@ -0,0 +1,32 @@
+"""In-process fake of Nozbe REST API used by openapi_client"""
+
+from ntimporters.emulator import NozbeEmulator
+
+# requests are answered in-process, without the HTTP front of the emulator
+FakeNozbe = NozbeEmulator
+
+
+class FakeResponse:
+    """urllib3.HTTPResponse look-alike"""
+
+    def __init__(self, status: int, data: bytes):
+        self.status = status
+        self.reason = "OK" if status < 400 else "Error"
+        self.data = data
+        self.headers = {"Content-Type": "application/json", "Content-Length": str(len(data))}
+
+
+class FakePoolManager:
+    """urllib3.PoolManager routing requests to FakeNozbe"""
+
+    def __init__(self, server: FakeNozbe):
+        self.server = server
+
+    def request(self, method, url, body=None, **_kwargs) -> FakeResponse:
+        return FakeResponse(*self.server.handle(method, url, body))
+
+
+def install(nt_client, server: FakeNozbe):
+    """Route requests of openapi_client.ApiClient to the fake server"""
+    nt_client.rest_client.pool_manager = FakePoolManager(server)
+    return nt_client
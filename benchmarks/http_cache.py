@@ -0,0 +1,83 @@
+"""Measure source traffic of re-running an import with the on-disk response cache
+
+Every importer runs end-to-end (run_import) over HTTP twice against the
+same source servers, with NTIMPORTERS_HTTP_CACHE set to a fresh file: the
+first run fills the cache, the re-run (as after a failed import) makes
+conditional requests, answered with 304 for unchanged responses. Each run
+imports into a fresh fake Nozbe. Reported per run: source requests, 304
+answers, body MB sent by source servers and wall time.
+"""
+
+import argparse
+import importlib
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks import fake_nozbe, source_servers
+from benchmarks import workspace as ws
+from ntimporters.emulator import serve
+from ntimporters.http_cache import default_cache
+
+IMPORTERS = ("trello", "monday")
+
+
+def run_import(importer: str) -> float:
+    """Seconds of import into a fresh fake Nozbe"""
+    module = importlib.import_module(f"ntimporters.{importer}.importer")
+    server = fake_nozbe.FakeNozbe()
+    front = serve(server, port=0)
+    host, port = front.server_address[:2]
+    os.environ["CUSTOM_API_HOST"] = f"http://{host}:{port}/v1/api"
+    credentials = {field: "token" for field in module.SPEC["input_fields"]}
+    credentials |= {"nt_auth_token": server.api_key, "team_id": server.team_id}
+    start = time.perf_counter()
+    try:
+        if error := module.run_import(**credentials):
+            print(f"{importer}: {error!r}")
+    finally:
+        front.shutdown()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--importers", nargs="+", choices=IMPORTERS, default=IMPORTERS)
+    parser.add_argument("--tasks", type=int, default=1_000)
+    parser.add_argument("--cache-mb", type=int, help="size bound of the cache")
+    args = parser.parse_args(argv)
+
+    workspace = ws.generate(tasks=args.tasks)
+    directory = tempfile.mkdtemp()
+    os.environ["NTIMPORTERS_HTTP_CACHE"] = os.path.join(directory, "cache.sqlite")
+    if args.cache_mb:
+        os.environ["NTIMPORTERS_HTTP_CACHE_MB"] = str(args.cache_mb)
+
+    print(
+        f"{'importer':<8} {'run':<6} {'requests':>9} {'not_modified':>13}"
+        f" {'body_mb':>8} {'wall_s':>7}"
+    )
+    for importer in args.importers:
+        server = source_servers.serve(importer, workspace)
+        os.environ[f"{importer.upper()}_API_HOST"] = server.url
+        for run in ("cold", "re-run"):
+            before = server.requests, server.not_modified, server.bytes
+            seconds = run_import(importer)
+            requests, not_modified, sent = (
+                now - then
+                for now, then in zip((server.requests, server.not_modified, server.bytes), before)
+            )
+            print(
+                f"{importer:<8} {run:<6} {requests:>9} {not_modified:>13}"
+                f" {sent / 2**20:>8.2f} {seconds:>7.2f}",
+                flush=True,
+            )
+        server.shutdown()
+    print(f"cache: {default_cache().stats()}")
+    default_cache().close()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Measure per-job setup latency: fresh clients per import vs clients of the process pool
+
+Setup of a job is what a Trello import does before reading boards: create
+the Nozbe and Trello clients, find the current Nozbe member and read the
+Trello user. Fresh clients (the previous behavior) open new connections
+every job, pooled ones (ntimporters.client_pool) reuse connections of the
+previous job. Servers use TLS with a self-signed certificate (openssl), so
+that handshakes cost what they cost against the real APIs, unless --plain.
+"""
+
+import argparse
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+
+import requests
+
+from benchmarks import source_servers
+from benchmarks import workspace as ws
+from ntimporters.client_pool import default_pool
+from ntimporters.emulator import NozbeEmulator, serve
+from ntimporters.trello.trello_api import TrelloClient
+from ntimporters.utils import current_nt_member, nozbe_client
+
+
+def _certificate(directory: str) -> tuple[str, str]:
+    """Self-signed certificate and key of localhost"""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+        + ["-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost"]
+        + ["-keyout", key, "-out", cert],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def _use_tls(server, context: ssl.SSLContext) -> str:
+    """Accept TLS connections on server, return its https origin"""
+    accept = server.get_request
+
+    def get_request():
+        sock, address = accept()
+        return context.wrap_socket(sock, server_side=True), address
+
+    server.get_request = get_request
+    return f"https://localhost:{server.server_address[1]}"
+
+
+def setup(emulator, nozbe_url: str, trello_url: str, ca_cert: str | None, pooled: bool):
+    """Seconds of a job setup with fresh or pooled clients"""
+    start = time.perf_counter()
+    nt_client = nozbe_client(emulator.api_key, host=nozbe_url, ssl_ca_cert=ca_cert, pooled=pooled)
+    session = None if pooled else requests.Session()
+    trello = TrelloClient("app_key", "token", api_path=trello_url, session=session)
+    current_nt_member(nt_client, emulator.team_id)
+    _ = trello.author_email
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--plain", action="store_true", help="plain HTTP instead of TLS")
+    args = parser.parse_args(argv)
+
+    emulator = NozbeEmulator()
+    nozbe = serve(emulator, port=0)
+    trello = source_servers.serve("trello", ws.generate(tasks=10))
+    with tempfile.TemporaryDirectory() as directory:
+        ca_cert = None
+        host, port = nozbe.server_address[:2]
+        nozbe_origin, trello_url = f"http://{host}:{port}", trello.url
+        if not args.plain:
+            ca_cert, key = _certificate(directory)
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(ca_cert, key)
+            nozbe_origin = _use_tls(nozbe, context)
+            trello_url = _use_tls(trello, context) + source_servers.PATHS["trello"]
+            # trust the certificate in requests sessions
+            os.environ["REQUESTS_CA_BUNDLE"] = ca_cert
+        nozbe_url = f"{nozbe_origin}/v1/api"
+
+        results = {}
+        for pooled in (False, True):
+            # warm-up job, for pooled clients it opens connections of the pool
+            setup(emulator, nozbe_url, trello_url, ca_cert, pooled)
+            results[pooled] = [
+                setup(emulator, nozbe_url, trello_url, ca_cert, pooled) for _ in range(args.jobs)
+            ]
+    nozbe.shutdown()
+    trello.shutdown()
+
+    print(f"{'clients':<8} {'jobs':>6} {'median_ms':>10} {'p95_ms':>8}")
+    for pooled, samples in results.items():
+        samples.sort()
+        print(
+            f"{'pooled' if pooled else 'fresh':<8} {len(samples):>6}"
+            f" {statistics.median(samples) * 1000:>10.2f}"
+            f" {samples[int(len(samples) * 0.95)] * 1000:>8.2f}"
+        )
+    print(f"pool: {default_pool().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Measure job-start latency: fresh process per import vs pre-forked WorkerPool
+
+A job is an import failing validation right away, so the time is spent only
+on starting it (and, for fresh processes, on interpreter start and imports).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from ntimporters import registry
+from ntimporters.workers import WorkerPool
+
+FRESH = "from ntimporters import registry; registry.run_import({importer!r})(**{kwargs!r})"
+
+
+def _kwargs(importer: str) -> dict:
+    """Empty credentials, run_import returns "Missing 'nt_auth_token'" right away"""
+    return {field: "" for field in registry.spec(importer)["input_fields"]}
+
+
+def fresh_process(importer: str) -> float:
+    """Seconds to run a job in a fresh interpreter"""
+    env = os.environ | {"PYTHONPATH": os.pathsep.join(sys.path)}
+    start = time.perf_counter()
+    statement = FRESH.format(importer=importer, kwargs=_kwargs(importer))
+    subprocess.run([sys.executable, "-c", statement], check=True, env=env)
+    return time.perf_counter() - start
+
+
+def pooled(pool: WorkerPool, importer: str) -> float:
+    """Seconds to run a job in the pool"""
+    start = time.perf_counter()
+    pool.submit(importer, **_kwargs(importer)).result()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--importer", default="trello")
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--max-jobs", type=int, default=5, help="jobs per worker before recycling")
+    args = parser.parse_args(argv)
+
+    fresh = [fresh_process(args.importer) for _ in range(min(args.jobs, 5))]
+    start = time.perf_counter()
+    with WorkerPool(workers=2, max_jobs=args.max_jobs) as pool:
+        warmup = time.perf_counter() - start
+        # the first job waits for the fork server to start and preload
+        first = pooled(pool, args.importer)
+        samples = [pooled(pool, args.importer) for _ in range(args.jobs)]
+        stats = pool.stats()
+
+    print(f"fresh process  median {statistics.median(fresh) * 1000:8.1f} ms")
+    print(f"pool start            {warmup * 1000:8.1f} ms, first job {first * 1000:8.1f} ms")
+    print(
+        f"pooled job     median {statistics.median(samples) * 1000:8.1f} ms,"
+        f" max {max(samples) * 1000:8.1f} ms ({stats['recycled']} workers recycled)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Measure CPU time of JSON codecs on large list responses and write bodies
+
+Every codec parses a list of Nozbe tasks from bytes, deserializes it into
+models with ApiClient.response_deserialize and serializes it back. "json
+(str)" is the previous path of openapi_client: bytes decoded to str, then
+parsed by the json module.
+
+Write bodies are serialized one model at a time, as for `post_task`: with
+sanitize_for_serialization and dumps (the previous path) and with
+ApiClient.serialize_body.
+
+The run fails (exit code 1) if the default codec is not the json module
+while NTIMPORTERS_JSON is unset, e.g. because orjson is installed.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.sources import Reply
+from ntimporters.json_codec import CODECS, get_codec
+from openapi_client import ApiClient, Configuration
+from openapi_client.models.task import Task
+
+
+class _StrCodec:
+    """Stdlib codec decoding bytes to str before parsing"""
+
+    name = "json (str)"
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+
+
+def tasks(count: int) -> list[dict]:
+    """List of Nozbe tasks as returned by GET /tasks"""
+    return [
+        {
+            "id": f"{i:016d}",
+            "name": f"Task {i} with a reasonably long name to parse",
+            "project_id": f"{i // 100:016d}",
+            "project_section_id": f"{i // 10:016d}",
+            "author_id": "a" * 16,
+            "responsible_id": "b" * 16 if i % 3 else None,
+            "created_at": 1_700_000_000_000 + i,
+            "last_modified": 1_700_000_000_000 + i,
+            "due_at": 1_700_000_000_000 + i * 1000 if i % 2 else None,
+            "last_activity_at": 1_700_000_000_000 + i,
+            "is_followed": False,
+            "is_abandoned": False,
+            "is_all_day": bool(i % 2),
+            "project_position": i / 3,
+            "priority_position": None,
+            "time_needed": 0,
+            "time_spent": 0,
+            "type": "thread" if i % 10 == 0 else None,
+        }
+        for i in range(count)
+    ]
+
+
+def _cpu_ms(func, repeat: int) -> float:
+    """Median CPU milliseconds of func"""
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        samples.append(time.process_time() - start)
+    return statistics.median(samples) * 1000
+
+
+def measure(codec, payload: list, repeat: int) -> dict:
+    """CPU ms of parse, deserialize into models and dump of payload with codec"""
+    data = json.dumps(payload).encode()
+    configuration = Configuration()
+    configuration.json_codec = codec
+    client = ApiClient(configuration)
+    reply = Reply(payload)
+    return {
+        "parse": _cpu_ms(lambda: codec.loads(data), repeat),
+        "deserialize": _cpu_ms(
+            lambda: client.response_deserialize(reply, {"200": "List[Task]"}), repeat
+        ),
+        "dump": _cpu_ms(lambda: codec.dumps(payload), repeat),
+    }
+
+
+def measure_bodies(codec, payload: list, repeat: int) -> dict:
+    """CPU ms of serializing every task of payload as a write body"""
+    configuration = Configuration()
+    configuration.json_codec = codec
+    client = ApiClient(configuration)
+    models = [Task.from_dict(task) for task in payload]
+    return {
+        "sanitize": _cpu_ms(
+            lambda: [codec.dumps(client.sanitize_for_serialization(elt)) for elt in models],
+            repeat,
+        ),
+        "serialize_body": _cpu_ms(
+            lambda: [client.serialize_body(elt) for elt in models], repeat
+        ),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not os.getenv("NTIMPORTERS_JSON") and (default := get_codec().name) != "json":
+        print(f"default codec is {default}, json expected without NTIMPORTERS_JSON")
+        return 1
+
+    codecs = [_StrCodec()]
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name} not installed, skipped")
+
+    print(f"{'codec':<12} {'tasks':>8} {'parse_ms':>10} {'deserialize_ms':>15} {'dump_ms':>10}")
+    for count in args.tasks:
+        payload = tasks(count)
+        for codec in codecs:
+            result = measure(codec, payload, args.repeat)
+            print(
+                f"{codec.name:<12} {count:>8} {result['parse']:>10.1f}"
+                f" {result['deserialize']:>15.1f} {result['dump']:>10.1f}",
+                flush=True,
+            )
+
+    print(f"\n{'codec':<12} {'bodies':>8} {'sanitize_ms':>12} {'serialize_body_ms':>18}")
+    for count in args.tasks:
+        payload = tasks(count)
+        for codec in codecs[1:]:
+            result = measure_bodies(codec, payload, args.repeat)
+            print(
+                f"{codec.name:<12} {count:>8} {result['sanitize']:>12.1f}"
+                f" {result['serialize_body']:>18.1f}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
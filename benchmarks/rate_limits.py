@@ -0,0 +1,117 @@
+"""Check that 429s of Nozbe reads reach the client instead of being retried by the transport
+
+Threads read a task of the emulator while it rejects every n-th request
+with 429 and Retry-After. Every 429 must be retried by RESTClientObject:
+recorded by metrics as a retry and reported to the adaptive limit of the
+limiter as a rejection. With --transport http2 every response must also be
+closed (returned to the pool of the transport) once read or retried. The run fails (exit code 1) on any error or missed 429.
+"""
+
+import argparse
+import sys
+import threading
+
+from ntimporters.concurrency import AdaptiveLimit, RequestLimiter
+from ntimporters.emulator import NozbeEmulator, serve
+from ntimporters.telemetry import NOZBE, Metrics
+from ntimporters.transport import Http2Transport, WSGITransport
+from ntimporters.utils import nozbe_client
+from openapi_client import api
+
+
+class _CountingLimit(AdaptiveLimit):
+    """AdaptiveLimit counting rejected requests reported to it"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rejected = 0
+        self._counted = threading.Lock()
+
+    def release(self, started, outcome=None, failed=False):
+        if outcome is not None and outcome.overloaded:
+            with self._counted:
+                self.rejected += 1
+        super().release(started, outcome, failed)
+
+
+class _KeepingHttp2Transport(Http2Transport):
+    """Http2Transport keeping its responses, so that unreleased ones are not closed by gc"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.responses = []
+
+    def send(self, *args):
+        response = super().send(*args)
+        self.responses.append(response)
+        return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--reads", type=int, default=50, help="reads of every thread")
+    parser.add_argument("--rate-limit-every", type=int, default=5)
+    parser.add_argument("--transport", choices=("http", "http2", "wsgi"), default="http")
+    args = parser.parse_args(argv)
+
+    emulator = NozbeEmulator(rate_limit_every=args.rate_limit_every)
+    server = None
+    if args.transport == "wsgi":
+        url, transport = "http://emulator/v1/api", WSGITransport(emulator.wsgi)
+    else:
+        server = serve(emulator, port=0)
+        host, port = server.server_address[:2]
+        url = f"http://{host}:{port}/v1/api"
+        transport = (
+            _KeepingHttp2Transport() if args.transport == "http2" else None
+        )
+    limit = _CountingLimit(initial=args.threads)
+    metrics = Metrics()
+    nt_client = nozbe_client(
+        emulator.api_key,
+        host=url,
+        metrics=metrics,
+        limiter=RequestLimiter({NOZBE: limit}),
+        transport=transport,
+        pooled=False,
+    )
+    nt_client.configuration.rate_limit_delay = 0.001
+    projects_api = api.ProjectsApi(nt_client)
+    project_id = next(iter(emulator.data["projects"]))
+    errors: list[str] = []
+
+    def read(_worker: int):
+        for _ in range(args.reads):
+            try:
+                projects_api.get_project_by_id(project_id)
+            except Exception as exc:  # noqa: BLE001
+                errors.append(repr(exc))
+
+    workers = [threading.Thread(target=read, args=(elt,)) for elt in range(args.threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if server is not None:
+        server.shutdown()
+    if isinstance(transport, _KeepingHttp2Transport) and (
+        unreleased := sum(not elt.isclosed() for elt in transport.responses)
+    ):
+        errors.append(f"{unreleased} of {len(transport.responses)} responses not released")
+    if transport is not None:
+        transport.clear()
+
+    served = emulator.responses[429]
+    retried = metrics.retries.get(NOZBE, 0)
+    print(
+        f"{args.transport}: {served} rejected with 429, {retried} retried,"
+        f" {limit.rejected} reported to limiter, limit {limit.limit:.2f}, {len(errors)} errors"
+    )
+    for error in errors[:10]:
+        print(error)
+    return 0 if served == retried == limit.rejected > 0 and not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Run importers against fake Nozbe API and replayed source APIs
+
+Every run happens in a fresh process, so peak RSS and caches are per run.
+With --http importers run end-to-end (run_import) over HTTP against the
+Nozbe emulator and local source servers instead of in-process fakes.
+Reported: Nozbe requests (all / writes), source requests, wall and CPU time
+of the import, time spent inside the fake Nozbe server and peak RSS.
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import fake_nozbe, source_servers, sources
+from benchmarks import workspace as ws
+
+IMPORTERS = tuple(sources.CLIENTS)
+COLUMNS = (
+    ("importer", "{:<8}"),
+    ("size", "{:>5}"),
+    ("nozbe_requests", "{:>9}"),
+    ("nozbe_writes", "{:>9}"),
+    ("source_requests", "{:>9}"),
+    ("wall_s", "{:>9.2f}"),
+    ("cpu_s", "{:>9.2f}"),
+    ("server_s", "{:>9.2f}"),
+    ("peak_rss_mb", "{:>9.1f}"),
+)
+
+
+def load_workspace(size: str, fixtures: str | None = None) -> dict:
+    """Load recorded workspace of given size, generate (and record) it if missing"""
+    path = fixtures and os.path.join(fixtures, f"workspace-{size}.json")
+    if path and os.path.exists(path):
+        return ws.load(path)
+    workspace = ws.generate(tasks=ws.SIZES[size])
+    if path:
+        os.makedirs(fixtures, exist_ok=True)
+        ws.save(workspace, path)
+    return workspace
+
+
+def run_one(
+    importer: str,
+    size: str,
+    latency: float = 0.0,
+    rate_limit_every: int = 0,
+    fixtures: str | None = None,
+    http: bool = False,
+) -> dict:
+    """Import workspace of given size with given importer and return measurements"""
+    # imported here, so that spawned process measures its own imports
+    from ntimporters.telemetry import NOZBE, Metrics
+
+    workspace = load_workspace(size, fixtures)
+    module = importlib.import_module(f"ntimporters.{importer}.importer")
+    server = fake_nozbe.FakeNozbe(latency=latency, rate_limit_every=rate_limit_every)
+    metrics = Metrics()
+    run = _run_http if http else _run_in_process
+
+    error = None
+    wall, cpu = time.perf_counter(), time.process_time()
+    # a failing import is measured and reported like the others, not aborting the run
+    try:
+        error = run(module, importer, workspace, server, metrics)
+    except Exception as exc:  # noqa: BLE001
+        error = exc
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    return {
+        "importer": importer,
+        "size": size,
+        "nozbe_requests": sum(server.requests.values()),
+        "nozbe_writes": server.writes,
+        "source_requests": sum(
+            count for (service, *_), count in metrics.requests.items() if service != NOZBE
+        ),
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "server_s": server.seconds,
+        # kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "error": repr(error) if error else None,
+        "phases": metrics.phase_timings(),
+    }
+
+
+def _run_in_process(module, importer: str, workspace: dict, server, metrics):
+    """Import with in-process fake Nozbe and replayed source clients"""
+    from openapi_client import ApiClient, Configuration
+
+    configuration = Configuration(
+        host="https://nozbe.invalid/v1/api",
+        api_key={"ApiKeyAuth": server.api_key},
+        username=server.user_id,
+    )
+    configuration.metrics = metrics
+    configuration.rate_limit_delay = 0.01
+    nt_client = fake_nozbe.install(ApiClient(configuration=configuration), server)
+    clients = sources.CLIENTS[importer](workspace, metrics)
+    with metrics.phase("import"):
+        return module._import_data(nt_client, *clients, server.team_id, server.api_key)
+
+
+def _run_http(module, _importer: str, workspace: dict, server, metrics):
+    """Import end-to-end with run_import, over HTTP to Nozbe emulator and source servers"""
+    from ntimporters.emulator import serve
+
+    front = serve(server, port=0)
+    servers = source_servers.serve_all(workspace)
+    host, port = front.server_address[:2]
+    # the run has a process of its own
+    os.environ.update(source_servers.environ(servers))
+    os.environ["CUSTOM_API_HOST"] = f"http://{host}:{port}/v1/api"
+    credentials = {field: "token" for field in module.SPEC["input_fields"]}
+    credentials |= {"nt_auth_token": server.api_key, "team_id": server.team_id}
+    try:
+        return module.run_import(**credentials, metrics=metrics)
+    finally:
+        front.shutdown()
+        for source in servers.values():
+            source.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--importers", nargs="+", choices=IMPORTERS, default=IMPORTERS)
+    parser.add_argument("--sizes", nargs="+", choices=tuple(ws.SIZES), default=("1k",))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per Nozbe request")
+    parser.add_argument(
+        "--rate-limit-every", type=int, default=0, help="answer every n-th Nozbe request with 429"
+    )
+    parser.add_argument(
+        "--http", action="store_true", help="run end-to-end over HTTP to local servers"
+    )
+    parser.add_argument("--fixtures", help="directory of recorded workspaces (created if missing)")
+    parser.add_argument("--json", help="write results to given file")
+    args = parser.parse_args(argv)
+
+    print(" ".join(f"{name:>9}" for name, _ in COLUMNS))
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        for importer in args.importers:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(
+                    run_one,
+                    importer,
+                    size,
+                    args.latency,
+                    args.rate_limit_every,
+                    args.fixtures,
+                    args.http,
+                ).result()
+            results.append(result)
+            row = " ".join(fmt.format(result[name]) for name, fmt in COLUMNS)
+            print(row + (f"  {result['error']}" if result["error"] else ""), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
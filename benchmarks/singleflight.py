@@ -0,0 +1,82 @@
+"""Count requests of concurrent identical lookups with and without singleflight
+
+Many threads look up the same few Trello members (`TrelloClient.member`)
+and Nozbe team limits (`nt_limits`) at once, as parallel imports do.
+Servers answer with --latency, so that lookups overlap. Reported: requests
+that reached every server and wall time.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import source_servers
+from benchmarks import workspace as ws
+from ntimporters.emulator import NozbeEmulator, serve
+from ntimporters.singleflight import SingleFlight
+from ntimporters.trello.trello_api import TrelloClient
+from ntimporters.utils import nozbe_client, nt_limits
+
+
+class _Unshared:
+    """SingleFlight look-alike making every call"""
+
+    @staticmethod
+    def do(_key, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+def run(
+    emulator: NozbeEmulator, nozbe_url: str, trello_url: str, members: list, args, coalesce: bool
+) -> float:
+    """Seconds of all lookups, made by args.threads threads"""
+    group = SingleFlight if coalesce else _Unshared
+    nt_client = nozbe_client(emulator.api_key, host=nozbe_url, pooled=False, singleflight=group())
+    trello = TrelloClient("app_key", "token", api_path=trello_url, singleflight=group())
+    start = threading.Barrier(args.threads)
+
+    def lookup(i: int):
+        start.wait()
+        for _ in range(args.rounds):
+            nt_limits(nt_client, emulator.team_id)
+            # functools.cache of member is bypassed, to count requests of every round
+            TrelloClient.member.__wrapped__(trello, members[i % len(members)])
+
+    seconds = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        list(executor.map(lookup, range(args.threads)))
+    return time.perf_counter() - seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5, help="lookups of every thread")
+    parser.add_argument("--members", type=int, default=4, help="distinct members looked up")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    args = parser.parse_args(argv)
+
+    emulator = NozbeEmulator(latency=args.latency)
+    nozbe = serve(emulator, port=0)
+    host, port = nozbe.server_address[:2]
+    workspace = ws.generate(tasks=10, members=args.members)
+    trello = source_servers.serve("trello", workspace, latency=args.latency)
+    members = [elt["id"] for elt in workspace["members"]][: args.members]
+
+    print(f"{'mode':<12} {'nozbe_requests':>15} {'trello_requests':>16} {'seconds':>8}")
+    for coalesce in (False, True):
+        nozbe_before, trello_before = sum(emulator.requests.values()), trello.requests
+        seconds = run(emulator, f"http://{host}:{port}/v1/api", trello.url, members, args, coalesce)
+        print(
+            f"{'singleflight' if coalesce else 'every call':<12}"
+            f" {sum(emulator.requests.values()) - nozbe_before:>15}"
+            f" {trello.requests - trello_before:>16} {seconds:>8.2f}",
+            flush=True,
+        )
+    nozbe.shutdown()
+    trello.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Local HTTP servers of Trello, Monday, Asana and Todoist APIs answering from a synthetic workspace
+
+Run `python -m benchmarks.source_servers --tasks 100000` and export the printed
+environment variables, importers then read the generated workspace from the
+servers instead of the real services (e.g. with the Nozbe emulator, see
+ntimporters.emulator, a whole import runs offline).
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks import sources
+from benchmarks import workspace as ws
+from ntimporters.emulator import Server
+
+# API path of every service, appended to server URL in <SERVICE>_API_HOST
+PATHS = {"trello": "/1", "monday": "/v2", "asana": "/api/1.0", "todoist": ""}
+REPLAYS = {
+    "trello": sources.TrelloReplay,
+    "monday": sources.MondayReplay,
+    "asana": sources.AsanaReplay,
+    "todoist": sources.TodoistSession,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP front of a source replay (`server.source`)"""
+
+    protocol_version = "HTTP/1.1"
+    # send headers and body in one segment, flushed after every request
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if server.latency:
+            time.sleep(server.latency)
+        try:
+            status, payload = server.source.answer(parts.path, dict(parse_qsl(parts.query)), body)
+        except (KeyError, IndexError, StopIteration):
+            status, payload = 404, {}
+        content_type, data = sources.encode(payload)
+        # validator of the body, answered with 304 when the client has it
+        etag = f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, data = 304, b""
+        with server.lock:
+            server.requests += 1
+            server.bytes += len(data)
+            server.not_modified += status == 304
+        self.send_response(status)
+        if status in (200, 304):
+            self.send_header("ETag", etag)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *_args):
+        pass
+
+
+def serve(
+    service: str,
+    workspace: dict,
+    host: str = "localhost",
+    port: int = 0,
+    latency: float = 0.0,
+) -> Server:
+    """Start server of service API in a background thread, stop it with `shutdown()`
+
+    `server.url` is the API URL to put in <SERVICE>_API_HOST, `server.requests`,
+    `server.bytes` and `server.not_modified` count answered requests, sent body
+    bytes and 304 answers to conditional requests (responses have ETags).
+    """
+    server = Server((host, port), _Handler)
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.requests = server.bytes = server.not_modified = 0
+    host, port = server.server_address[:2]
+    server.url = f"http://{host}:{port}{PATHS[service]}"
+    if service in ("trello", "monday"):
+        # replays built on source clients link back to the server, e.g. Trello attachments
+        server.source = REPLAYS[service](workspace, api_path=server.url)
+    else:
+        server.source = REPLAYS[service](workspace)
+    threading.Thread(target=server.serve_forever, name=f"{service}-server", daemon=True).start()
+    return server
+
+
+def serve_all(workspace: dict, host: str = "localhost", latency: float = 0.0) -> dict:
+    """Start servers of all source APIs, return service -> server"""
+    return {service: serve(service, workspace, host, 0, latency) for service in REPLAYS}
+
+
+def environ(servers: dict) -> dict:
+    """Environment variables pointing importers at servers"""
+    return {f"{service.upper()}_API_HOST": server.url for service, server in servers.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--tasks", type=int, default=1_000)
+    parser.add_argument("--depth", type=int, default=0, help="levels of subtasks")
+    parser.add_argument("--subtasks", type=int, default=2, help="subtasks per task")
+    parser.add_argument("--comments", type=int, default=2, help="comments per task")
+    parser.add_argument("--comment-words", type=int, default=15)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--labels", type=int, default=8)
+    parser.add_argument("--attachments", type=int, default=0, help="attachments per task")
+    parser.add_argument("--attachment-bytes", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workspace", help="recorded workspace, generated if not given")
+    args = parser.parse_args(argv)
+
+    workspace = (
+        ws.load(args.workspace)
+        if args.workspace
+        else ws.generate(
+            tasks=args.tasks,
+            comments_per_task=args.comments,
+            comment_words=args.comment_words,
+            members=args.members,
+            labels=args.labels,
+            depth=args.depth,
+            subtasks_per_task=args.subtasks,
+            attachments_per_task=args.attachments,
+            attachment_bytes=args.attachment_bytes,
+            seed=args.seed,
+        )
+    )
+    servers = serve_all(workspace, args.host, args.latency)
+    for name, value in environ(servers).items():
+        print(f"{name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.shutdown()
+        print({service: server.requests for service, server in servers.items()})
+
+
+if __name__ == "__main__":
+    main()
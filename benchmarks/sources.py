@@ -0,0 +1,551 @@
+"""Source API clients replaying a synthetic workspace instead of calling real services
+
+Every replay answers `answer(path, query, body)` with status and payload, so
+the same workspace is served in-process or over HTTP (see source_servers).
+"""
+
+import json
+import re
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit
+
+import asana
+from todoist.api import TodoistAPI as TodoistAPISync
+from todoist_api_python.api import TodoistAPI
+
+from benchmarks import workspace as ws
+from ntimporters.monday.monday_api import MondayClient
+from ntimporters.rate_limiting import RLProxy
+from ntimporters.telemetry import Metrics
+from ntimporters.trello.trello_api import TrelloClient
+
+
+def encode(payload) -> tuple[str, bytes]:
+    """Return content type and body of payload, bytes are sent as they are"""
+    if isinstance(payload, bytes):
+        return "application/octet-stream", payload
+    return "application/json", json.dumps(payload).encode()
+
+
+class Reply:
+    """requests.Response look-alike with JSON body"""
+
+    def __init__(self, payload, status: int = 200):
+        self.status_code = self.status = status
+        content_type, self.content = encode(payload)
+        self.data = self.content
+        self.headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(len(self.content)),
+        }
+        self.ok = status < 400
+        self.raw = self.content
+
+    def __bool__(self):
+        return self.ok
+
+    def json(self):
+        return json.loads(self.content)
+
+    def getheaders(self) -> dict:
+        return self.headers
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise ValueError(f"HTTP {self.status_code}")
+
+
+def _record(metrics: Metrics | None, service: str, url: str, reply: Reply) -> Reply:
+    """Record replayed request in metrics"""
+    if metrics is not None:
+        metrics.record_request(service, "GET", url, reply.status_code, 0.0, len(reply.content))
+    return reply
+
+
+def _date(iso: str | None, with_time: bool = True) -> str | None:
+    """Format ISO timestamp the way source APIs do"""
+    if not iso:
+        return None
+    if with_time:
+        return datetime.fromisoformat(iso).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return iso[:10]
+
+
+def _checklist_text(item: dict) -> str:
+    return f"{'- [x]' if item['done'] else '- [ ]'} {item['name']}"
+
+
+class TrelloReplay(TrelloClient):
+    """Trello client answering from workspace"""
+
+    def __init__(
+        self, workspace: dict, metrics: Metrics | None = None, api_path: str | None = None
+    ):
+        self.workspace, self.index = workspace, ws.index(workspace)
+        super().__init__("app_key", "token", metrics=metrics, api_path=api_path)
+
+    def _get(self, url: str, **kwargs) -> Reply:
+        status, payload = self.answer(urlsplit(url).path)
+        return _record(self.metrics, "trello", url, Reply(payload, status))
+
+    def answer(self, path: str, query: dict | None = None, body: bytes | None = None) -> tuple:
+        """Answer request of Trello REST API"""
+        parts = path.removeprefix("/1/").split("/")
+        if not 2 <= len(parts) <= 3:
+            return 404, {}
+        return 200, self._route(*parts)
+
+    def _route(self, kind: str, obj_id: str, sub: str = ""):
+        index, labels = self.index, self.workspace["labels"]
+        if kind == "attachments":
+            return b"\0" * index["attachments"][obj_id]["bytes"]
+        if kind == "members":
+            if obj_id == "me":
+                owner = self.workspace["owner"]
+                return owner | {"idBoards": list(index["projects"])}
+            return index["people"].get(obj_id, {"id": obj_id})
+        if kind == "boards":
+            project = index["projects"][obj_id]
+            if sub == "boardStars":
+                return []
+            if sub == "lists":
+                return [
+                    {"id": elt["id"], "name": elt["name"], "closed": False}
+                    for elt in project["sections"]
+                ]
+            if sub == "labels":
+                return labels
+            if sub == "members":
+                return [{"id": elt["id"]} for elt in self.workspace["members"]]
+            return {"id": obj_id, "name": project["name"], "desc": project["description"]}
+        if kind == "lists":
+            return [self._card(task) for task in index["sections"][obj_id][1]["tasks"]]
+        task = index["tasks"][obj_id][2]
+        if sub == "attachments":
+            return [
+                elt | {"url": f"{self.api_path}/attachments/{elt['id']}/download"}
+                for elt in task.get("attachments", ())
+            ]
+        if sub == "actions":
+            return [
+                {
+                    "id": elt["id"],
+                    "data": {"card": {"id": obj_id}, "text": elt["text"]},
+                    "date": _date(elt["date"]),
+                    "idMemberCreator": elt["author"],
+                }
+                for elt in task["comments"]
+            ]
+        if sub == "checklists":
+            return (
+                [
+                    {
+                        "id": f"{obj_id}-checklist",
+                        "checkItems": [
+                            {
+                                "name": elt["name"],
+                                "state": "complete" if elt["done"] else "incomplete",
+                            }
+                            for elt in task["checklist"]
+                        ]
+                    }
+                ]
+                if task["checklist"]
+                else []
+            )
+        return []
+
+    def _card(self, task: dict) -> dict:
+        labels = {elt["id"]: elt for elt in self.workspace["labels"]}
+        return {
+            "id": task["id"],
+            "name": task["name"],
+            "desc": task["description"],
+            "due": _date(task["due"]),
+            "dueComplete": task["done"],
+            "idMembers": task["members"],
+            "labels": [labels[elt] for elt in task["labels"]],
+        }
+
+
+class MondayReplay(MondayClient):
+    """Monday client answering GraphQL queries from workspace"""
+
+    routes = (
+        ("me", re.compile(r"^me\{")),
+        ("boards", re.compile(r"^boards\(state:all limit:\d+\)\{")),
+        ("groups", re.compile(r"boards \(state:all ids: (\d+)\) \{ groups")),
+        ("items", re.compile(r"ids:(\d+)\) \{\s*items_page")),
+        ("subitems", re.compile(r"items\(ids:(\d+) limit:1\)")),
+        ("updates", re.compile(r"items \(ids: (\d+)\) \{\s*updates")),
+        ("users", re.compile(r"^users \{")),
+    )
+
+    def __init__(
+        self, workspace: dict, metrics: Metrics | None = None, api_path: str | None = None
+    ):
+        super().__init__("app_key", metrics=metrics, api_path=api_path)
+        self.workspace, self.index = workspace, ws.index(workspace)
+
+    def _get(self, query: str) -> Reply:
+        status, payload = self._query(query)
+        return _record(self.metrics, "monday", self.api_path, Reply(payload, status))
+
+    def answer(self, path: str, query: dict | None = None, body: bytes | None = None) -> tuple:
+        """Answer GraphQL request, `{"query": "{ ... }"}` in body"""
+        try:
+            graphql = json.loads(body or b"{}")["query"].strip()
+        except (ValueError, KeyError):
+            return 400, {}
+        return self._query(graphql.removeprefix("{").removesuffix("}"))
+
+    def _query(self, query: str) -> tuple:
+        query = query.strip()
+        for name, pattern in self.routes:
+            if match := pattern.search(query):
+                return 200, {"data": getattr(self, f"_{name}")(*match.groups())}
+        return 400, {}
+
+    def _me(self):
+        return {"me": {"email": self.workspace["owner"]["email"]}}
+
+    def _boards(self):
+        return {
+            "boards": [
+                {
+                    "id": elt["id"],
+                    "name": elt["name"],
+                    "state": "active",
+                    "description": elt["description"],
+                    "board_kind": "public",
+                }
+                for elt in self.workspace["projects"]
+            ]
+        }
+
+    def _groups(self, project_id: str):
+        sections = self.index["projects"][project_id]["sections"]
+        return {
+            "boards": [
+                {
+                    "groups": [
+                        {
+                            "id": elt["id"],
+                            "title": elt["name"],
+                            "archived": False,
+                            "position": str(i),
+                        }
+                        for i, elt in enumerate(sections)
+                    ]
+                }
+            ]
+        }
+
+    def _items(self, project_id: str):
+        items = []
+        for section in self.index["projects"][project_id]["sections"]:
+            for task in section["tasks"]:
+                due = task["due"] and datetime.fromisoformat(task["due"]).strftime("%Y-%m-%d %H:%M")
+                people = {
+                    "personsAndTeams": [{"id": elt, "kind": "person"} for elt in task["members"]]
+                }
+                items.append(
+                    {
+                        "id": task["id"],
+                        "name": task["name"],
+                        "group": {"id": section["id"]},
+                        "column_values": [
+                            {"type": "date", "text": due or "", "value": None},
+                            {"type": "multiple-person", "text": "", "value": json.dumps(people)},
+                        ],
+                    }
+                )
+        return {"boards": [{"items_page": {"items": items}}]}
+
+    def _subitems(self, task_id: str):
+        _project, section, task = self.index["tasks"][task_id]
+        # subitems are not nested in Monday, deeper subtasks are flattened
+        subitems = [
+            {"id": elt["id"], "name": elt["name"], "column_values": []}
+            for _parent, elt in ws.walk(task.get("subtasks", ()))
+        ]
+        return {"items": [{"group": {"id": section["id"], "position": "0"}, "subitems": subitems}]}
+
+    def _updates(self, task_id: str):
+        task = self.index["tasks"][task_id][2]
+        updates = [
+            {
+                "id": elt["id"],
+                "created_at": _date(elt["date"]),
+                "body": f"<p>{elt['text']}</p>",
+                "text_body": elt["text"],
+                "creator_id": elt["author"],
+                "replies": [],
+            }
+            for elt in task["comments"]
+        ]
+        if task["checklist"]:
+            updates.append(
+                {
+                    "id": f"{task_id}0",
+                    "created_at": _date(ws.BASE_DATE.isoformat()),
+                    "body": "",
+                    "text_body": "\n".join(map(_checklist_text, task["checklist"])),
+                    "creator_id": self.workspace["owner"]["id"],
+                    "replies": [],
+                }
+            )
+        return {"items": [{"updates": updates}]}
+
+    def _users(self):
+        people = (self.workspace["owner"], *self.workspace["members"])
+        return {"users": [{"id": elt["id"], "email": elt["email"]} for elt in people]}
+
+
+class AsanaReplay(asana.ApiClient):
+    """Asana ApiClient answering from workspace"""
+
+    def __init__(self, workspace: dict, metrics: Metrics | None = None):
+        conf = asana.Configuration()
+        conf.access_token = "token"
+        super().__init__(conf)
+        self.workspace, self.index, self.metrics = workspace, ws.index(workspace), metrics
+        self.workspace_gid = "1" + workspace["owner"]["id"]
+
+    def request(self, method, url, query_params=None, *_args, **_kwargs) -> Reply:
+        status, payload = self.answer(urlsplit(url).path, dict(query_params or ()))
+        return _record(self.metrics, "asana", url, Reply(payload, status))
+
+    def answer(self, path: str, query: dict | None = None, body: bytes | None = None) -> tuple:
+        """Answer request of Asana REST API"""
+        data = self._route(path.removeprefix("/api/1.0").strip("/").split("/"), query or {})
+        return 200, {"data": data, "next_page": None}
+
+    def _route(self, path: list, query: dict):
+        index = self.index
+        match path:
+            case ["workspaces"]:
+                return [{"gid": self.workspace_gid, "name": "Workspace"}]
+            case ["workspaces", _, "tags"]:
+                return [{"gid": elt["id"]} for elt in self.workspace["labels"]]
+            case ["tags", gid]:
+                label = next(elt for elt in self.workspace["labels"] if elt["id"] == gid)
+                return {"gid": gid, "name": label["name"], "color": f"light-{label['color']}"}
+            case ["workspaces", _, "projects"]:
+                return [{"gid": gid} for gid in index["projects"]]
+            case ["projects", gid]:
+                project = index["projects"][gid]
+                return {"gid": gid, "name": project["name"], "archived": False, "color": None}
+            case ["projects", gid, "sections"]:
+                return [{"gid": elt["id"]} for elt in index["projects"][gid]["sections"]]
+            case ["sections", gid]:
+                return {"gid": gid, "name": index["sections"][gid][1]["name"]}
+            case ["projects", gid, "tasks"]:
+                project = index["projects"][gid]
+                return [{"gid": task["id"]} for elt in project["sections"] for task in elt["tasks"]]
+            case ["tasks"]:
+                return []
+            case ["tasks", gid]:
+                return self._task(gid)
+            case ["tasks", gid, "subtasks"]:
+                task = index["tasks"][gid][2]
+                return [
+                    {"name": elt["name"], "completed": elt["done"]}
+                    for elt in (*task["checklist"], *task.get("subtasks", ()))
+                ]
+            case ["tasks", gid, "stories"]:
+                return [
+                    {"gid": elt["id"], "type": "comment", "text": elt["text"]}
+                    for elt in index["tasks"][gid][2]["comments"]
+                ]
+            case ["users", "me"]:
+                return {"gid": self.workspace["owner"]["id"]}
+            case ["users", gid]:
+                return {"gid": gid, "email": index["people"][gid]["email"]}
+            case ["users"]:
+                return [{"gid": gid, "email": elt["email"]} for gid, elt in index["people"].items()]
+        return None
+
+    def _task(self, gid: str) -> dict:
+        project, section, task = self.index["tasks"][gid]
+        return {
+            "gid": gid,
+            "name": task["name"],
+            "notes": task["description"],
+            "due_at": _date(task["due"]),
+            "due_on": None,
+            "completed_at": _date(task["due"]) if task["done"] else None,
+            "assignee": {"gid": task["members"][0]} if task["members"] else None,
+            "tags": [{"gid": elt} for elt in task["labels"]],
+            "memberships": [{"section": {"gid": section["id"]}}],
+            "projects": [{"gid": project["id"]}],
+        }
+
+
+class TodoistSession:
+    """requests.Session look-alike answering Todoist REST and sync API calls"""
+
+    def __init__(self, workspace: dict, metrics: Metrics | None = None):
+        self.workspace, self.index, self.metrics = workspace, ws.index(workspace), metrics
+        self.labels = {elt["id"]: elt["name"] for elt in workspace["labels"]}
+
+    def get(self, url: str, params=None, **_kwargs) -> Reply:
+        params = dict(params or {}) | dict(parse_qsl(urlsplit(url).query))
+        status, payload = self.answer(urlsplit(url).path, params)
+        return _record(self.metrics, "todoist", url, Reply(payload, status))
+
+    def answer(self, path: str, query: dict | None = None, body: bytes | None = None) -> tuple:
+        """Answer request of Todoist REST or sync API"""
+        params = query or {}
+        resource = path.rstrip("/").split("/")[-1]
+        if resource == "get_all":
+            return 200, {"items": self._tasks(params["project_id"], done=True)}
+        if resource == "collaborators":
+            return 200, {"results": self._collaborators(), "next_cursor": None}
+        if resource not in ("projects", "sections", "tasks", "comments", "labels"):
+            return 404, {}
+        return 200, {"results": getattr(self, f"_{resource}")(params), "next_cursor": None}
+
+    def close(self):
+        pass
+
+    def _projects(self, _params):
+        return [
+            {
+                "id": elt["id"],
+                "name": elt["name"],
+                "description": elt["description"],
+                "order": i,
+                "color": "blue",
+                "is_collapsed": False,
+                "is_shared": True,
+                "is_favorite": False,
+                "is_archived": False,
+                "can_assign_tasks": True,
+                "view_style": "list",
+                "created_at": _date(ws.BASE_DATE.isoformat()),
+                "updated_at": _date(ws.BASE_DATE.isoformat()),
+            }
+            for i, elt in enumerate(self.workspace["projects"])
+        ]
+
+    def _sections(self, params):
+        return [
+            {
+                "id": elt["id"],
+                "name": elt["name"],
+                "project_id": params["project_id"],
+                "is_collapsed": False,
+                "order": i,
+            }
+            for i, elt in enumerate(self.index["projects"][params["project_id"]]["sections"])
+        ]
+
+    def _tasks(self, params, done: bool = False):
+        project_id = params["project_id"] if isinstance(params, dict) else params
+        tasks = []
+        for section in self.index["projects"][project_id]["sections"]:
+            for i, (parent, task) in enumerate(ws.walk(section["tasks"])):
+                if task["done"] != done:
+                    continue
+                due = task["due"] and {
+                    "date": _date(task["due"]),
+                    "string": "",
+                    "is_recurring": False,
+                }
+                tasks.append(
+                    {
+                        "id": task["id"],
+                        "content": task["name"],
+                        "description": task["description"],
+                        "project_id": project_id,
+                        "section_id": section["id"],
+                        "parent_id": parent and parent["id"],
+                        "labels": [self.labels[elt] for elt in task["labels"]],
+                        "priority": 1,
+                        "due": due,
+                        "deadline": None,
+                        "duration": None,
+                        "is_collapsed": False,
+                        "order": i,
+                        "assignee_id": task["members"][0] if task["members"] else None,
+                        "assigner_id": None,
+                        "completed_at": _date(task["due"]) if done else None,
+                        "completed_date": _date(task["due"]) if done else None,
+                        "creator_id": self.workspace["owner"]["id"],
+                        "created_at": _date(ws.BASE_DATE.isoformat()),
+                        "updated_at": _date(ws.BASE_DATE.isoformat()),
+                    }
+                )
+        return tasks
+
+    def _comments(self, params):
+        task = self.index["tasks"][params["task_id"]][2]
+        comments = [
+            {
+                "id": elt["id"],
+                "content": elt["text"],
+                "poster_id": elt["author"],
+                "posted_at": _date(elt["date"]),
+                "task_id": task["id"],
+            }
+            for elt in task["comments"]
+        ]
+        if task["checklist"]:
+            comments.append(
+                {
+                    "id": f"{task['id']}0",
+                    "content": "\n".join(map(_checklist_text, task["checklist"])),
+                    "poster_id": self.workspace["owner"]["id"],
+                    "posted_at": _date(ws.BASE_DATE.isoformat()),
+                    "task_id": task["id"],
+                }
+            )
+        return comments
+
+    def _labels(self, _params):
+        return [
+            {
+                "id": elt["id"],
+                "name": elt["name"],
+                "color": elt["color"],
+                "order": i,
+                "is_favorite": False,
+            }
+            for i, elt in enumerate(self.workspace["labels"])
+        ]
+
+    def _collaborators(self):
+        people = (self.workspace["owner"], *self.workspace["members"])
+        return [{"id": elt["id"], "email": elt["email"], "name": elt["name"]} for elt in people]
+
+
+def trello(workspace: dict, metrics: Metrics | None = None) -> tuple:
+    """Return source clients passed to trello importer"""
+    return (TrelloReplay(workspace, metrics),)
+
+
+def monday(workspace: dict, metrics: Metrics | None = None) -> tuple:
+    """Return source clients passed to monday importer"""
+    return (MondayReplay(workspace, metrics),)
+
+
+def asana_(workspace: dict, metrics: Metrics | None = None) -> tuple:
+    """Return source clients passed to asana importer"""
+    return (AsanaReplay(workspace, metrics),)
+
+
+def todoist(workspace: dict, metrics: Metrics | None = None) -> tuple:
+    """Return source clients passed to todoist importer"""
+    session = TodoistSession(workspace, metrics)
+    return (
+        # rate limits of Todoist are not replayed
+        RLProxy(TodoistAPI("token", session=session), num_requests=10**9, metrics=metrics),
+        TodoistAPISync("token", api_version="v9", session=session),
+    )
+
+
+CLIENTS = {"trello": trello, "monday": monday, "asana": asana_, "todoist": todoist}
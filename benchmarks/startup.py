@@ -0,0 +1,67 @@
+"""Measure cold start: time and modules loaded by common imports in a fresh interpreter
+
+Every statement runs `--repeat` times, each in a new process; the median
+time is reported minus the time of an empty interpreter.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "registry": "from ntimporters import registry; registry.specs()",
+    "openapi_client": "import openapi_client",
+    "nozbe_client": "from ntimporters.utils import nozbe_client; nozbe_client('token')",
+    "trello": "from ntimporters.trello import run_import",
+    "monday": "from ntimporters.monday import run_import",
+    "asana": "from ntimporters.asana import run_import",
+    "todoist": "from ntimporters.todoist import run_import",
+}
+PROBE = """
+import sys, time
+start = time.perf_counter()
+exec({statement!r})
+print(time.perf_counter() - start, len(sys.modules))
+"""
+
+
+def measure(statement: str, repeat: int = 5) -> tuple[float, int]:
+    """Median seconds and number of loaded modules of statement in fresh interpreters"""
+    env = os.environ | {"PYTHONPATH": os.pathsep.join(sys.path)}
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        ).stdout.split()
+        samples.append((float(out[-2]), int(out[-1])))
+    return statistics.median(elt[0] for elt in samples), samples[-1][1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write results to given file")
+    args = parser.parse_args(argv)
+
+    _, baseline = measure("pass", args.repeat)
+    print(f"{'statement':<16} {'ms':>8} {'modules':>8}")
+    results = {}
+    for name, statement in STATEMENTS.items():
+        seconds, modules = measure(statement, args.repeat)
+        results[name] = {"ms": seconds * 1000, "modules": modules - baseline}
+        print(f"{name:<16} {seconds * 1000:>8.1f} {modules - baseline:>8}", flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
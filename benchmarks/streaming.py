@@ -0,0 +1,88 @@
+"""Measure peak memory of reading one large list response: whole page vs streamed
+
+The Nozbe emulator runs in a child process with `--projects` projects, all
+of them are read with one `get_projects(limit=...)` request. Peak memory of
+the client (tracemalloc) is reported for the list returned by the method
+and for ntimporters.pagination.stream, which yields projects (or records)
+while the response is read.
+"""
+
+import argparse
+import multiprocessing
+import time
+import tracemalloc
+
+from ntimporters.emulator import NozbeEmulator, serve
+from ntimporters.pagination import MAX_PAGE_SIZE, stream
+from ntimporters.utils import nozbe_client
+from openapi_client import api
+
+
+def _serve(conn, projects: int, description_bytes: int):
+    """Child process: emulator with given number of projects, served until conn is closed"""
+    emulator = NozbeEmulator()
+    for i in range(projects):
+        emulator._create(
+            "projects",
+            {
+                "name": f"Project {i}",
+                "team_id": emulator.team_id,
+                "is_open": True,
+                "description": "x" * description_bytes,
+            },
+        )
+    server = serve(emulator, port=0)
+    host, port = server.server_address[:2]
+    conn.send((f"http://{host}:{port}/v1/api", emulator.api_key, emulator.team_id))
+    try:
+        conn.recv()
+    except EOFError:
+        pass
+    server.shutdown()
+
+
+def measure(consume) -> tuple[float, float, int]:
+    """Seconds, peak MB and number of objects of consume()"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = consume()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20, count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=MAX_PAGE_SIZE)
+    parser.add_argument("--description-bytes", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_serve, args=(child, args.projects, args.description_bytes), daemon=True
+    )
+    process.start()
+    url, api_key, team_id = parent.recv()
+    projects_api = api.ProjectsApi(nozbe_client(api_key, host=url))
+    kwargs = {"limit": args.projects, "team_id": team_id}
+
+    modes = {
+        "list": lambda: len(projects_api.get_projects(**kwargs)),
+        "stream": lambda: sum(1 for _ in stream(projects_api.get_projects, **kwargs)),
+        "stream records": lambda: sum(
+            1 for _ in stream(projects_api.get_projects, records=True, **kwargs)
+        ),
+    }
+    # first request opens the connection
+    modes["list"]()
+    print(f"{'mode':<16} {'objects':>8} {'seconds':>8} {'peak_mb':>8}")
+    for name, consume in modes.items():
+        seconds, peak_mb, count = measure(consume)
+        print(f"{name:<16} {count:>8} {seconds:>8.2f} {peak_mb:>8.2f}", flush=True)
+    parent.send("stop")
+    process.join()
+
+
+if __name__ == "__main__":
+    main()
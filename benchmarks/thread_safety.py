@@ -0,0 +1,116 @@
+"""Stress one shared openapi_client.ApiClient from many threads against the Nozbe emulator
+
+Every thread creates tasks and reads them back, checking that it gets its
+own task, while another thread keeps changing default headers and the
+emulator rejects every n-th request with 429. The run fails (exit code 1)
+on any exception, mismatched response or lost write, and unless counts are
+exact: every task created, every 429 recorded as a retry and the emulator
+serving one create and one read per task plus the rejected requests.
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from ntimporters.emulator import NozbeEmulator, serve
+from ntimporters.telemetry import NOZBE, Metrics
+from ntimporters.transport import WSGITransport
+from openapi_client import ApiClient, Configuration, api, models
+
+
+def client(emulator: NozbeEmulator, url: str, transport, threads: int, metrics) -> ApiClient:
+    """ApiClient of the emulator owner with a connection per thread"""
+    configuration = Configuration(
+        host=url, api_key={"ApiKeyAuth": emulator.api_key}, username=emulator.user_id
+    )
+    configuration.connection_pool_maxsize = threads
+    configuration.rate_limit_delay = 0.001
+    configuration.transport = transport
+    configuration.metrics = metrics
+    return ApiClient(configuration)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--tasks", type=int, default=100, help="tasks created by every thread")
+    parser.add_argument("--rate-limit-every", type=int, default=7)
+    parser.add_argument("--transport", choices=("http", "wsgi"), default="http")
+    args = parser.parse_args(argv)
+
+    emulator = NozbeEmulator(rate_limit_every=args.rate_limit_every)
+    server = None
+    if args.transport == "wsgi":
+        url, transport = "http://emulator/v1/api", WSGITransport(emulator.wsgi)
+    else:
+        server = serve(emulator, port=0)
+        host, port = server.server_address[:2]
+        url, transport = f"http://{host}:{port}/v1/api", None
+    project_id = next(iter(emulator.data["projects"]))
+    metrics = Metrics()
+    nt_client = client(emulator, url, transport, args.threads, metrics)
+    tasks_api = api.TasksApi(nt_client)
+    errors: list[str] = []
+    done = threading.Event()
+
+    def work(worker: int):
+        for i in range(args.tasks):
+            name = f"Task {worker}-{i}"
+            # any error, e.g. of a response of another request, fails the check
+            try:
+                task = tasks_api.post_task(
+                    models.Task(
+                        name=name,
+                        project_id=project_id,
+                        author_id=emulator.member_id,
+                        created_at=1,
+                        last_activity_at=1,
+                    )
+                )
+                if task.name != name or tasks_api.get_task_by_id(task.id).name != name:
+                    errors.append(f"{name}: got response of another request")
+            except Exception as exc:  # noqa: BLE001
+                errors.append(f"{name}: {exc!r}")
+
+    def change_headers():
+        i = 0
+        while not done.is_set():
+            nt_client.set_default_header("X-Stress", str(i))
+            i += 1
+
+    start = time.perf_counter()
+    changer = threading.Thread(target=change_headers)
+    changer.start()
+    workers = [threading.Thread(target=work, args=(elt,)) for elt in range(args.threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    done.set()
+    changer.join()
+    seconds = time.perf_counter() - start
+    if server is not None:
+        server.shutdown()
+
+    created = len(emulator.data["tasks"])
+    expected = args.threads * args.tasks
+    if created != expected:
+        errors.append(f"{created} tasks created, {expected} expected")
+    rejected, retried = emulator.responses[429], metrics.retries.get(NOZBE, 0)
+    if retried != rejected:
+        errors.append(f"{retried} retries recorded, {rejected} requests rejected with 429")
+    requests = sum(emulator.requests.values())
+    if requests != 2 * expected + rejected:
+        errors.append(f"{requests} requests served, {2 * expected + rejected} expected")
+    print(
+        f"{args.threads} threads, {requests} requests in {seconds:.2f} s,"
+        f" {rejected} rejected with 429, {retried} retried, {len(errors)} errors"
+    )
+    for error in errors[:10]:
+        print(error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
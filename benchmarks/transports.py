@@ -0,0 +1,65 @@
+"""Measure requests per second of openapi_client transports against the Nozbe emulator
+
+Every transport reads and creates tasks: urllib3 (default) and HTTP/2
+(httpx, when installed) over HTTP to the emulator's server, WSGI and ASGI
+calling the emulator in-process, without sockets.
+"""
+
+import argparse
+import time
+
+from ntimporters.emulator import NozbeEmulator, serve
+from ntimporters.transport import ASGITransport, Http2Transport, WSGITransport
+from ntimporters.utils import nozbe_client
+from openapi_client import api, models
+
+
+def run(nt_client, project_id: str, author_id: str, requests: int) -> float:
+    """Seconds of given number of requests, half of them writes"""
+    tasks_api = api.TasksApi(nt_client)
+    start = time.perf_counter()
+    for i in range(requests // 2):
+        task = tasks_api.post_task(
+            models.Task(
+                name=f"Task {i}",
+                project_id=project_id,
+                author_id=author_id,
+                created_at=1,
+                last_activity_at=1,
+            )
+        )
+        tasks_api.get_task_by_id(task.id)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    emulator = NozbeEmulator()
+    server = serve(emulator, port=0)
+    host, port = server.server_address[:2]
+    url = f"http://{host}:{port}/v1/api"
+    project_id = next(iter(emulator.data["projects"]))
+
+    transports = {"urllib3": (url, None)}
+    try:
+        transports["http2"] = (url, Http2Transport())
+    except ImportError:
+        print("httpx not installed, http2 skipped")
+    transports["wsgi"] = ("http://emulator/v1/api", WSGITransport(emulator.wsgi))
+    transports["asgi"] = ("http://emulator/v1/api", ASGITransport(emulator.asgi))
+
+    print(f"{'transport':<10} {'requests':>9} {'seconds':>8} {'req/s':>8}")
+    for name, (host_url, transport) in transports.items():
+        nt_client = nozbe_client(emulator.api_key, host=host_url, transport=transport)
+        seconds = run(nt_client, project_id, emulator.member_id, args.requests)
+        print(f"{name:<10} {args.requests:>9} {seconds:>8.2f} {args.requests / seconds:>8.0f}")
+        if transport is not None:
+            transport.clear()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Synthetic source workspace used to replay source APIs"""
+
+import json
+import random
+import string
+from datetime import UTC, datetime, timedelta
+
+# 1m - ten times the biggest workspace imported so far
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BASE_DATE = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def _gid(rnd: random.Random) -> str:
+    """Numeric source ID (valid in Trello, Monday, Asana and Todoist payloads)"""
+    return str(rnd.randrange(10**15, 10**16))
+
+
+def _text(rnd: random.Random, words: int) -> str:
+    return " ".join(
+        "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(2, 9))) for _ in range(words)
+    )
+
+
+def _subtasks(rnd: random.Random, count: int, depth: int) -> list:
+    """Subtasks nested `depth` levels deep, `count` per task"""
+    if depth <= 0:
+        return []
+    return [
+        {
+            "id": _gid(rnd),
+            "name": _text(rnd, 4),
+            "description": "",
+            "due": None,
+            "done": rnd.random() < 0.2,
+            "labels": [],
+            "members": [],
+            "comments": [],
+            "checklist": [],
+            "attachments": [],
+            "subtasks": _subtasks(rnd, count, depth - 1),
+        }
+        for _ in range(count)
+    ]
+
+
+def generate(
+    tasks: int = 1_000,
+    tasks_per_section: int = 50,
+    sections_per_project: int = 5,
+    comments_per_task: int = 2,
+    comment_words: int = 15,
+    members: int = 10,
+    members_per_task: int = 1,
+    labels: int = 8,
+    labels_per_task: int = 2,
+    depth: int = 0,
+    subtasks_per_task: int = 2,
+    attachments_per_task: int = 0,
+    attachment_bytes: int = 1024,
+    seed: int = 0,
+) -> dict:
+    """Generate workspace with given number of tasks
+
+    Tasks are spread over projects of `sections_per_project` sections with
+    `tasks_per_section` tasks each; every other task has a due date.
+    Every task has `subtasks_per_task` subtasks nested `depth` levels deep
+    (not counted in `tasks`) and `attachments_per_task` attachments of
+    `attachment_bytes` bytes.
+    """
+    rnd = random.Random(seed)
+    workspace = {
+        "owner": {"id": _gid(rnd), "email": "owner@example.com", "name": "Owner"},
+        "members": [
+            {"id": _gid(rnd), "email": f"member{i}@example.com", "name": f"Member {i}"}
+            for i in range(members)
+        ],
+        "labels": [
+            {"id": _gid(rnd), "name": f"label {i}", "color": rnd.choice(("red", "green", "blue"))}
+            for i in range(labels)
+        ],
+        "projects": [],
+    }
+    member_ids = [elt["id"] for elt in workspace["members"]]
+    label_ids = [elt["id"] for elt in workspace["labels"]]
+    created = 0
+    while created < tasks:
+        project = {
+            "id": _gid(rnd),
+            "name": f"Project {len(workspace['projects'])}",
+            "description": _text(rnd, 10),
+            "sections": [],
+        }
+        for j in range(sections_per_project):
+            if created >= tasks:
+                break
+            section = {"id": _gid(rnd), "name": f"Section {j}", "tasks": []}
+            for _ in range(min(tasks_per_section, tasks - created)):
+                due = BASE_DATE + timedelta(days=rnd.randint(0, 365), hours=rnd.randint(0, 23))
+                section["tasks"].append(
+                    {
+                        "id": _gid(rnd),
+                        "name": _text(rnd, 4),
+                        "description": _text(rnd, 20) if rnd.random() < 0.5 else "",
+                        "due": due.isoformat() if created % 2 else None,
+                        "done": rnd.random() < 0.2,
+                        "labels": rnd.sample(label_ids, k=min(labels_per_task, len(label_ids))),
+                        "members": rnd.sample(
+                            member_ids, k=min(members_per_task, len(member_ids))
+                        ),
+                        "comments": [
+                            {
+                                "id": _gid(rnd),
+                                "author": rnd.choice(member_ids or [workspace["owner"]["id"]]),
+                                "text": _text(rnd, comment_words),
+                                "date": (BASE_DATE + timedelta(minutes=k)).isoformat(),
+                            }
+                            for k in range(comments_per_task)
+                        ],
+                        "checklist": [
+                            {"name": _text(rnd, 3), "done": bool(k % 2)}
+                            for k in range(rnd.randint(0, 3))
+                        ],
+                        "attachments": [
+                            {"id": _gid(rnd), "name": f"file-{k}.bin", "bytes": attachment_bytes}
+                            for k in range(attachments_per_task)
+                        ],
+                        "subtasks": _subtasks(rnd, subtasks_per_task, depth),
+                    }
+                )
+                created += 1
+            project["sections"].append(section)
+        workspace["projects"].append(project)
+    return workspace
+
+
+def save(workspace: dict, path: str):
+    """Record workspace to a JSON file"""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(workspace, file)
+
+
+def load(path: str) -> dict:
+    """Load recorded workspace"""
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def walk(tasks: list, parent: dict | None = None):
+    """Yield (parent, task) of tasks and their subtasks, parents first"""
+    for task in tasks:
+        yield parent, task
+        yield from walk(task.get("subtasks", ()), task)
+
+
+def index(workspace: dict) -> dict:
+    """Return lookup tables by source ID, subtasks included"""
+    projects, sections, tasks, attachments = {}, {}, {}, {}
+    for project in workspace["projects"]:
+        projects[project["id"]] = project
+        for section in project["sections"]:
+            sections[section["id"]] = (project, section)
+            for _parent, task in walk(section["tasks"]):
+                tasks[task["id"]] = (project, section, task)
+                attachments.update((elt["id"], elt) for elt in task.get("attachments", ()))
+    people = {elt["id"]: elt for elt in (workspace["owner"], *workspace["members"])}
+    return {
+        "projects": projects,
+        "sections": sections,
+        "tasks": tasks,
+        "attachments": attachments,
+        "people": people,
+    }
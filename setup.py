@@ -21,4 +21,5 @@ setup(
         "todoist-api-python==3.1.0",
         "todoist-python==8.1.4",
     ],
+    extras_require={"orjson": ["orjson>=3.6"], "http2": ["httpx[http2]>=0.23"]},
 )
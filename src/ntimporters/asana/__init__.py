@@ -1,3 +1,12 @@
-from ntimporters.asana.importer import SPEC, run_import
+from ntimporters.asana.spec import SPEC
 
 __all__ = ["SPEC", "run_import"]
+
+
+def __getattr__(name: str):
+    """Load importer with its dependencies on first use of run_import"""
+    if name == "run_import":
+        from ntimporters.asana.importer import run_import
+
+        return run_import
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
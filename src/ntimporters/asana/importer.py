@@ -1,12 +1,20 @@
 """Asana -> Nozbe importer"""
 
 import functools
-from typing import Optional
 
 import openapi_client as nt
+from ntimporters.id_map import IdMap
+from ntimporters.cancellation import CancelToken
+from ntimporters.coalescing import coalesce, flush, post
+from ntimporters.concurrency import RequestLimiter, limit_asana
+from ntimporters.dry_run import DryRun
+from ntimporters.progress import Progress
+from ntimporters.project_group import ImportGroup
+from ntimporters.singleflight import shared
+from ntimporters.asana.spec import SPEC
+from ntimporters.tagging import set_unassigned_tag
+from ntimporters.telemetry import Metrics, instrument_asana, phase
 from ntimporters.utils import (
-    API_HOST,
-    add_to_project_group,
     check_limits,
     current_nt_member,
     exists,
@@ -14,10 +22,13 @@ from ntimporters.utils import (
     get_single_tasks_project_id,
     id16,
     match_nt_users,
+    nozbe_client,
     nt_open_projects_len,
     parse_timestamp,
+    post_idempotent,
     post_tag,
-    set_unassigned_tag,
+    source_api_host,
+    stable_id,
     trim,
 )
 from openapi_client import models, api
@@ -25,13 +36,6 @@ from openapi_client.exceptions import OpenApiException
 
 import asana
 
-SPEC = {
-    "code": "asana",  # codename / ID of importer
-    "name": "Asana",  # name of application
-    "url": "https://nozbe.help/advancedfeatures/importers/#asana",  # link to documentation / specs / API
-    "input_fields": ("nt_auth_token", "auth_token", "team_id"),
-}
-
 COLOR_MAP = {
     "light-green": "green",
     "dark-green": "darkgreen",
@@ -54,29 +58,63 @@ IMPORT_NAME = "Imported from Asana"
 
 
 # main method called by Nozbe app
-def run_import(nt_auth_token: str, auth_token: str, team_id: str) -> Optional[Exception]:
-    """Perform import from Asana to Nozbe"""
+def run_import(
+    nt_auth_token: str,
+    auth_token: str,
+    team_id: str,
+    metrics: Metrics | None = None,
+    progress=None,
+    cancel_token: CancelToken | None = None,
+    limiter: RequestLimiter | None = None,
+    dry_run: bool = False,
+) -> Exception | dict | None:
+    """Perform import from Asana to Nozbe
+
+    metrics - records requests and phases
+    progress - callable or queue receiving progress events
+    cancel_token - import stops when it is cancelled or past its deadline,
+        ImportCancelled with partial-progress summary is returned
+    limiter - caps concurrent requests per service
+    dry_run - nothing is written to Nozbe, the import plan with cost estimate
+        (see DryRun.plan) is returned instead
+    """
     if not nt_auth_token:
         return "Missing 'nt_auth_token'"
     if not auth_token:
         return "Missing 'auth_token'"
+    recorder = DryRun() if dry_run else None
+    metrics = metrics or (Metrics() if progress or dry_run else None)
+    tracker = Progress(progress, metrics)
     try:
-        nt_client = nt.ApiClient(
-            configuration=nt.Configuration(
-                host=API_HOST,
-                api_key={"ApiKeyAuth": nt_auth_token},
-                access_token=nt_auth_token,
-                username=nt_auth_token.split("_")[0],
-            )
+        nt_client = nozbe_client(
+            nt_auth_token,
+            metrics=metrics,
+            cancel_token=cancel_token,
+            limiter=limiter,
+            dry_run=recorder,
+            access_token=nt_auth_token,
         )
         conf = asana.Configuration()
         conf.access_token = auth_token
-        asana_client = asana.ApiClient(conf)
-        _import_data(nt_client, asana_client, team_id, nt_auth_token)
+        conf.host = source_api_host("asana")
+        asana_client = limit_asana(
+            instrument_asana(asana.ApiClient(conf), metrics), limiter, cancel_token
+        )
+        with phase(metrics, "import"):
+            _import_data(
+                nt_client,
+                asana_client,
+                team_id,
+                nt_auth_token,
+                progress=tracker,
+                cancel_token=cancel_token,
+            )
     except Exception as exc:
         print(exc)
+        tracker.finish(exc)
         return exc
-    return None
+    tracker.finish()
+    return recorder and recorder.plan(metrics, tracker)
 
 
 def _asana_projects_len(asana_client: asana.ApiClient) -> int:
@@ -91,9 +129,16 @@ def _asana_projects_len(asana_client: asana.ApiClient) -> int:
 
 
 def _import_data(
-    nt_client: nt.ApiClient, asana_client: asana.ApiClient, team_id: str, nt_auth_token: str
+    nt_client: nt.ApiClient,
+    asana_client: asana.ApiClient,
+    team_id: str,
+    nt_auth_token: str,
+    progress: Progress | None = None,
+    cancel_token: CancelToken | None = None,
 ):
     """Import everything from Asana to Nozbe"""
+    progress = progress or Progress()
+    cancel_token = cancel_token or CancelToken()
     nt_api_projects = api.ProjectsApi(nt_client)
     nt_api_sections = api.ProjectSectionsApi(nt_client)
     nt_member_id = current_nt_member(nt_client, team_id)
@@ -103,108 +148,121 @@ def _import_data(
         team_id,
         nt_client,
         "projects_open",
-        _asana_projects_len(asana_client) + nt_open_projects_len(nt_client, team_id),
+        (projects_len := _asana_projects_len(asana_client))
+        + nt_open_projects_len(nt_client, team_id),
     )
+    progress.plan("projects", projects_len)
     imported = get_imported_entities(nt_client, team_id, IMPORT_NAME)
-    for workspace in get_workspaces(asana_client):
-        # import tags
-        map_tag_id = {}
-        tags_api = asana.TagsApi(asana_client)
-        for tag in tags_api.get_tags_for_workspace(workspace["gid"], {}):
-            tag_full = tags_api.get_tag(tag["gid"], {})
-            tag_name = tag_full.get("name", "")
-            nt_tag = exists("tags", tag_name, imported)
-            if nt_tag_id := nt_tag.get("id") or post_tag(
-                nt_client, tag_name, _map_color(tag_full.get("color"))
-            ):
-                map_tag_id[tag["gid"]] = str(nt_tag_id)
-
-        # import projects
-        projects_api = asana.ProjectsApi(asana_client)
-        for project in projects_api.get_projects_for_workspace(workspace["gid"], {}):
-            project_full = projects_api.get_project(project["gid"], {})
-            nt_project = exists(
-                "projects", project_name := trim(project_full.get("name", "")), imported
-            ) or nt_api_projects.post_project(
-                models.Project(
-                    id=id16(),
-                    name=project_name,
-                    team_id=team_id,
-                    author_id=nt_member_id,
-                    created_at=1,
-                    last_event_at=1,
-                    ended_at=1 if project_full.get("archived") else None,
-                    color=_map_color(project_full.get("color")),
-                    is_open=True,  # TODO set is_open based on 'public' and 'members' properties
-                    is_template=False,
-                    sidebar_position=1.0,
-                    extra="",
+    group = ImportGroup(nt_client, team_id, IMPORT_NAME)
+    with coalesce(nt_client):
+        for workspace in get_workspaces(asana_client):
+            # import tags
+            map_tag_id = IdMap()
+            tags_api = asana.TagsApi(asana_client)
+            for tag in tags_api.get_tags_for_workspace(workspace["gid"], {}):
+                tag_full = tags_api.get_tag(tag["gid"], {})
+                tag_name = tag_full.get("name", "")
+                nt_tag = exists("tags", tag_name, imported)
+                if nt_tag_id := nt_tag.get("id") or post_tag(
+                    nt_client, tag_name, _map_color(tag_full.get("color"))
+                ):
+                    map_tag_id[tag["gid"]] = str(nt_tag_id)
+
+            # import projects
+            projects_api = asana.ProjectsApi(asana_client)
+            for project in projects_api.get_projects_for_workspace(workspace["gid"], {}):
+                cancel_token.check()
+                project_full = projects_api.get_project(project["gid"], {})
+                nt_project = exists(
+                    "projects", project_name := trim(project_full.get("name", "")), imported
+                ) or post_idempotent(
+                    nt_api_projects.post_project,
+                    models.Project(
+                        id=stable_id(team_id, SPEC["code"], project["gid"]),
+                        name=project_name,
+                        team_id=team_id,
+                        author_id=nt_member_id,
+                        created_at=1,
+                        last_event_at=1,
+                        ended_at=1 if project_full.get("archived") else None,
+                        color=_map_color(project_full.get("color")),
+                        is_open=True,  # TODO set is_open based on 'public' and 'members' properties
+                        is_template=False,
+                        sidebar_position=1.0,
+                        extra="",
+                    ),
                 )
-            )
-            if not nt_project:
-                continue
-            nt_project_id = str(nt_project.id)
-            add_to_project_group(nt_client, team_id, nt_project_id, IMPORT_NAME)
-
-            # import project sections
-            map_section_id = {}
-            sections_api = asana.SectionsApi(asana_client)
-            for position, section in enumerate(
-                sections_api.get_sections_for_project(project["gid"], {})
-            ):
-                section_full = sections_api.get_section(section["gid"], {})
-                if section_full.get("name") == "Untitled section":
+                if not nt_project:
+                    progress.advance("projects")
                     continue
-                try:
-                    nt_section = exists(
-                        "project_sections",
-                        name := trim(section_full.get("name", "")),
-                        imported,
-                    ) or nt_api_sections.post_project_section(
-                        models.ProjectSection(
-                            id=id16(),
-                            project_id=nt_project_id,
-                            name=name,
-                            created_at=1,
-                            archived_at=1 if section_full.get("archived") else None,
-                            position=float(position),
+                nt_project_id = str(nt_project.id)
+                group.add(nt_project_id)
+
+                # import project sections
+                map_section_id = IdMap()
+                sections_api = asana.SectionsApi(asana_client)
+                sections = list(sections_api.get_sections_for_project(project["gid"], {}))
+                progress.plan("sections", len(sections))
+                for position, section in enumerate(sections):
+                    section_full = sections_api.get_section(section["gid"], {})
+                    progress.advance("sections")
+                    if section_full.get("name") == "Untitled section":
+                        continue
+                    try:
+                        nt_section = exists(
+                            "project_sections",
+                            name := trim(section_full.get("name", "")),
+                            imported,
+                        ) or nt_api_sections.post_project_section(
+                            models.ProjectSection(
+                                id=id16(),
+                                project_id=nt_project_id,
+                                name=name,
+                                created_at=1,
+                                archived_at=1 if section_full.get("archived") else None,
+                                position=float(position),
+                            )
                         )
-                    )
-                    if nt_section:
-                        map_section_id[section["gid"]] = str(nt_section.id)
-                except OpenApiException as exc:
-                    print(exc)
+                        if nt_section:
+                            map_section_id[section["gid"]] = str(nt_section.id)
+                    except OpenApiException as exc:
+                        print(exc)
+
+                # import project tasks
+                _import_tasks(
+                    nt_client,
+                    asana_client,
+                    asana.TasksApi(asana_client).get_tasks_for_project(project["gid"], {}),
+                    nt_project_id,
+                    map_section_id,
+                    map_tag_id,
+                    nt_member_id=nt_member_id,
+                    imported=imported,
+                    progress=progress,
+                )
+                flush(nt_client)
+                progress.advance("projects")
 
-            # import project tasks
+            # import loose tasks to Single Tasks project
+            me = asana.UsersApi(asana_client).get_user("me", {})
             _import_tasks(
                 nt_client,
                 asana_client,
-                asana.TasksApi(asana_client).get_tasks_for_project(project["gid"], {}),
-                nt_project_id,
-                map_section_id,
+                asana.TasksApi(asana_client).get_tasks(
+                    {"workspace": workspace["gid"], "assignee": me["gid"]}
+                ),
+                get_single_tasks_project_id(nt_client, team_id),
+                {},
                 map_tag_id,
                 nt_member_id=nt_member_id,
+                is_sap=True,
                 imported=imported,
+                progress=progress,
             )
 
-        # import loose tasks to Single Tasks project
-        me = asana.UsersApi(asana_client).get_user("me", {})
-        _import_tasks(
-            nt_client,
-            asana_client,
-            asana.TasksApi(asana_client).get_tasks(
-                {"workspace": workspace["gid"], "assignee": me["gid"]}
-            ),
-            get_single_tasks_project_id(nt_client, team_id),
-            {},
-            map_tag_id,
-            nt_member_id=nt_member_id,
-            is_sap=True,
-            imported=imported,
-        )
-
 
 @functools.cache
+@shared
 def _get_asana_email_by_gid(asana_client, gid):
     if user := asana.UsersApi(asana_client).get_user(gid, {"opt_fields": "email"}):
         return user.get("email")
@@ -221,8 +279,10 @@ def _import_tasks(
     nt_member_id: str,
     is_sap: bool = False,
     imported=None,
+    progress: Progress | None = None,
 ):
     """Import task from Asana to Nozbe"""
+    progress = progress or Progress()
     nt_api_tasks = api.TasksApi(nt_client)
     nt_api_tag_assignments = api.TagAssignmentsApi(nt_client)
     nt_api_comments = api.CommentsApi(nt_client)
@@ -240,7 +300,9 @@ def _import_tasks(
             return user_matches.get(email.lower())
         return None
 
+    progress.plan("tasks", len(asana_tasks := list(asana_tasks)))
     for task in asana_tasks:
+        progress.advance("tasks")
         task_full = asana.TasksApi(asana_client).get_task(task["gid"], {})
         due_at = parse_timestamp(task_full.get("due_at")) or parse_timestamp(
             task_full.get("due_on")
@@ -259,9 +321,10 @@ def _import_tasks(
 
         nt_task = exists(
             "tasks", name := trim(task_full.get("name", "")), imported
-        ) or nt_api_tasks.post_task(
+        ) or post_idempotent(
+            nt_api_tasks.post_task,
             models.Task(
-                id=id16(),
+                id=stable_id(nt_project_id, task["gid"]),
                 name=name,
                 missed_repeats=0,
                 is_followed=False,
@@ -276,7 +339,7 @@ def _import_tasks(
                 is_all_day=not task_full.get("due_at"),
                 ended_at=parse_timestamp(task_full.get("completed_at")),
                 extra="",
-            )
+            ),
         )
         if not nt_task:
             continue
@@ -286,22 +349,26 @@ def _import_tasks(
 
         # import tag_assignments
         for tag in task_full.get("tags") or []:
-            try:
-                nt_api_tag_assignments.post_tag_assignment(
-                    models.TagAssignment(
-                        id=id16(),
-                        tag_id=map_tag_id.get(tag["gid"]),
-                        task_id=nt_task_id,
-                    )
-                )
-            except Exception:
-                pass
+            post(
+                nt_api_tag_assignments.post_tag_assignment,
+                models.TagAssignment(
+                    id=id16(),
+                    tag_id=map_tag_id.get(tag["gid"]),
+                    task_id=nt_task_id,
+                ),
+                on_error=print,
+            )
 
         # import comments
 
-        def _post_comment(body, task_id):
-            nt_api_comments.post_comment(
+        def _post_comment(body, task_id, source_id):
+            # comments are known only when posted
+            progress.plan("comments", 1)
+            progress.advance("comments")
+            post(
+                nt_api_comments.post_comment,
                 models.Comment(
+                    id=stable_id(task_id, source_id),
                     body=body or "…",
                     is_team=False,
                     is_pinned=False,
@@ -309,13 +376,14 @@ def _import_tasks(
                     task_id=task_id,
                     author_id=nt_member_id,
                     created_at=1,
-                )
+                ),
+                key=task_id,
             )
 
         if (task_description := task_full.get("notes", "")) and not exists(
             "comments", task_description, imported
         ):
-            _post_comment(task_description, nt_task_id)
+            _post_comment(task_description, nt_task_id, "description")
         checklist = []
         for item in asana.TasksApi(asana_client).get_subtasks_for_task(
             task["gid"], {"opt_fields": "name,completed"}
@@ -326,18 +394,18 @@ def _import_tasks(
         if checklist:
             body = "\n".join(checklist)
             if not exists("comments", body, imported):
-                _post_comment(body, nt_task_id)
+                _post_comment(body, nt_task_id, "checklist")
 
         for story in asana.StoriesApi(asana_client).get_stories_for_task(task["gid"], {}):
             if (body := story.get("type")) == "comment" and not exists("comments", body, imported):
-                _post_comment(story.get("text"), nt_task_id)
+                _post_comment(story.get("text"), nt_task_id, story.get("gid"))
 
         # TODO import attachments
         # for attachment in asana_client.attachments.find_by_task(task["gid"]):
         #     pass
 
 
-def _map_color(asana_color: Optional[str]) -> Optional[models.Color]:
+def _map_color(asana_color: str | None) -> models.Color | None:
     """Maps Asana color onto Nozbe color"""
     if not asana_color:
         return None
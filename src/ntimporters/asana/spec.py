@@ -0,0 +1,8 @@
+""" Asana importer description, importable without source SDK """
+
+SPEC = {
+    "code": "asana",  # codename / ID of importer
+    "name": "Asana",  # name of application
+    "url": "https://nozbe.help/advancedfeatures/importers/#asana",  # link to documentation / specs / API
+    "input_fields": ("nt_auth_token", "auth_token", "team_id"),
+}
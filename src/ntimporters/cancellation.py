@@ -0,0 +1,80 @@
+""" Cooperative cancellation and deadlines of imports """
+
+import threading
+import time
+
+from ntimporters.utils import ImportException
+
+DEADLINE_EXCEEDED = "deadline exceeded"
+
+
+class ImportCancelled(ImportException):
+    """Import was cancelled or its deadline passed
+
+    summary - progress snapshot at the moment of cancellation (set by run_import)
+    """
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(f"Import {reason}")
+        self.reason = reason
+        self.summary: dict | None = None
+
+
+class CancelToken:
+    """Thread-safe cancellation token with optional deadline
+
+    Importers check it between requests, so a request in flight always
+    completes; sleeps (rate limiting) are interrupted right away.
+    timeout - seconds from now after which the token is cancelled
+    """
+
+    def __init__(self, timeout: float | None = None):
+        self._event = threading.Event()
+        self.reason: str | None = None
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+
+    def cancel(self, reason: str = "cancelled"):
+        """Request cancellation"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Check if cancelled or past deadline"""
+        if (
+            not self._event.is_set()
+            and self.deadline is not None
+            and time.monotonic() >= self.deadline
+        ):
+            self.cancel(DEADLINE_EXCEEDED)
+        return self._event.is_set()
+
+    def remaining(self) -> float | None:
+        """Seconds left until deadline"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout(self, default: float | None = None) -> float | None:
+        """Request timeout not exceeding the deadline"""
+        if (remaining := self.remaining()) is None:
+            return default
+        return remaining if default is None else min(default, remaining)
+
+    def check(self):
+        """Raise ImportCancelled if cancelled"""
+        if self.cancelled:
+            raise ImportCancelled(self.reason or "cancelled")
+
+    def sleep(self, seconds: float):
+        """Sleep unless cancelled, raise ImportCancelled when woken up by cancellation"""
+        self.check()
+        remaining = self.remaining()
+        if remaining is not None and remaining <= seconds:
+            # it is pointless to wait past the deadline
+            self._event.wait(remaining)
+            self.cancel(DEADLINE_EXCEEDED)
+        else:
+            self._event.wait(seconds)
+        self.check()
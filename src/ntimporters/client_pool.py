@@ -0,0 +1,153 @@
+""" Process-level pool of HTTP clients reused by consecutive and concurrent imports
+
+Connections of the Nozbe API (urllib3 pool managers) and of source APIs
+(requests sessions) are kept per host and connection credentials (TLS
+client certificate, proxy), so that imports run one after another in a
+worker reuse warm connections instead of handshaking again. API tokens are
+not connection state, they are sent with every request, so imports of
+different users share connections of a host. Clients not used for
+`idle_timeout` seconds are closed.
+"""
+
+import functools
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+
+from openapi_client.rest import pool_manager
+
+IDLE_TIMEOUT = 60.0
+
+
+class _NoCookies(DefaultCookiePolicy):
+    """Cookies are neither stored nor sent, sessions are shared by users"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+class _Pooled:
+    """Client of the pool, records time of its last use"""
+
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+
+    def request(self, *args, **kwargs):
+        self.last_used = time.monotonic()
+        return self.client.request(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        self.last_used = time.monotonic()
+        return self.client.get(*args, **kwargs)
+
+    def clear(self):
+        """Close connections, the client reconnects when used again"""
+        if hasattr(self.client, "clear"):
+            self.client.clear()
+        else:
+            self.client.close()
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class ClientPool:
+    """Clients kept by host and connection credentials, closed after idle_timeout seconds
+
+    idle_timeout - seconds after last use when the client is closed
+    """
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._clients: dict[tuple, _Pooled] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evicted = 0
+
+    def _acquire(self, key: tuple, create) -> _Pooled:
+        with self._lock:
+            self._evict_idle()
+            if (pooled := self._clients.get(key)) is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                pooled = self._clients[key] = _Pooled(create())
+            pooled.last_used = time.monotonic()
+            return pooled
+
+    def nozbe(self, configuration):
+        """Pool manager of openapi_client Configuration, set as its transport
+
+        Configurations with custom retries or socket options get a pool
+        manager of their own.
+        """
+        if configuration.retries is not None or configuration.socket_options is not None:
+            return pool_manager(configuration)
+        key = (
+            "nozbe",
+            _origin(configuration.host),
+            configuration.verify_ssl,
+            configuration.ssl_ca_cert,
+            configuration.cert_file,
+            configuration.key_file,
+            configuration.assert_hostname,
+            configuration.tls_server_name,
+            configuration.proxy,
+            tuple(sorted((configuration.proxy_headers or {}).items())),
+            configuration.connection_pool_maxsize,
+        )
+        return self._acquire(key, lambda: pool_manager(configuration))
+
+    def session(self, url: str):
+        """requests.Session-like client of the host of url, cookies are not kept"""
+
+        def create():
+            session = requests.Session()
+            session.cookies.set_policy(_NoCookies())
+            return session
+
+        return self._acquire(("source", _origin(url)), create)
+
+    def _evict_idle(self):
+        deadline = time.monotonic() - self.idle_timeout
+        for key, pooled in list(self._clients.items()):
+            if pooled.last_used < deadline:
+                del self._clients[key]
+                pooled.clear()
+                self.evicted += 1
+
+    def evict_idle(self):
+        """Close clients idle for longer than idle_timeout"""
+        with self._lock:
+            self._evict_idle()
+
+    def clear(self):
+        """Close all clients"""
+        with self._lock:
+            for pooled in self._clients.values():
+                pooled.clear()
+            self._clients.clear()
+
+    def stats(self) -> dict:
+        """Numbers of reused, created, evicted and open clients"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "open": len(self._clients),
+            }
+
+
+@functools.cache
+def default_pool() -> ClientPool:
+    """Pool of the process used by clients not given a transport or session"""
+    return ClientPool()
@@ -0,0 +1,227 @@
+""" Coalescing of Nozbe creates into batches """
+
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any
+
+from ntimporters.utils import ImportException, post_idempotent
+from openapi_client.exceptions import OpenApiException
+
+Bulk = Callable[[list], list]
+WORKERS = 8
+
+
+class WriteError(ImportException):
+    """Creates of write coalescer failed, `errors` are their exceptions"""
+
+    def __init__(self, errors: list[BaseException]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} write(s) to Nozbe failed, first: {errors[0]}")
+
+
+class WriteCoalescer:
+    """Buffer creates per resource and send them in batches
+
+    batch_size - number of buffered creates of a resource sent together
+    workers - number of requests sent at the same time
+    bulk - resource (e.g. "comment" for `post_comment`) -> callable creating a list
+        of models with one request and returning created objects in the same order;
+        resources without bulk endpoint (all of Nozbe API so far) are posted one
+        by one by concurrent workers
+
+    Exceptions of failed creates are set on their futures and raised by
+    `flush` (WriteError), unless the create was posted with `on_error`.
+
+    Creates sharing a key (e.g. comments of a task) are sent in order; entities
+    created before with the same id count as created (see `post_idempotent`).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        workers: int = WORKERS,
+        bulk: dict[str, Bulk] | None = None,
+    ):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.bulk = bulk or {}
+        self._errors: list[BaseException] = []
+        # callbacks of batches done at once run with the lock held
+        self._lock = threading.RLock()
+        # resource -> [(method, model, key, future)]
+        self._buffers: dict[str, list] = defaultdict(list)
+        # key -> batch sending the latest creates of key
+        self._tails: dict[Any, Future] = {}
+        self._batches: set[Future] = set()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="ntimporters-writes")
+
+    def post(self, method: Callable, model, key=None, on_error: Callable | None = None) -> Future:
+        """Queue create (e.g. `CommentsApi.post_comment`), the future gets created object
+
+        on_error - called with the exception of the create if it fails, instead
+            of failing `flush`, e.g. `print` for creates the import can do without
+        """
+        resource = method.__name__.removeprefix("post_")
+        future = Future()
+        with self._lock:
+            (buffer := self._buffers[resource]).append((method, model, key, on_error, future))
+            if len(buffer) >= self.batch_size:
+                self._send(resource)
+        self._throttle()
+        return future
+
+    def flush(self):
+        """Send buffered creates and wait until all are done
+
+        Raises WriteError with exceptions of creates failed so far (without on_error).
+        """
+        with self._lock:
+            for resource in list(self._buffers):
+                self._send(resource)
+            batches = list(self._batches)
+        wait(batches)
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise WriteError(errors)
+
+    def close(self, cancel: bool = False):
+        """Flush (or drop if `cancel`) buffered creates and stop workers"""
+        try:
+            if cancel:
+                with self._lock:
+                    for item in (elt for buffer in self._buffers.values() for elt in buffer):
+                        item[-1].cancel()
+                    self._buffers.clear()
+            else:
+                self.flush()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=cancel)
+
+    def _send(self, resource: str):
+        """Submit buffered creates of resource, must be called with the lock held"""
+        if not (items := self._buffers.pop(resource, None)):
+            return
+        if bulk := self.bulk.get(resource):
+            self._submit(resource, self._send_bulk, bulk, items)
+            return
+        chains = defaultdict(list)
+        for item in items:
+            # creates without key are independent
+            chains[item[2] if item[2] is not None else object()].append(item)
+        for key, chain in chains.items():
+            self._submit(key, self._send_chain, chain)
+
+    def _submit(self, key, function: Callable, *args):
+        """Run function after the previous batch of key"""
+        previous = self._tails.get(key)
+        batch = self._executor.submit(self._after, previous, function, *args)
+        self._tails[key] = batch
+        self._batches.add(batch)
+        batch.add_done_callback(lambda done: self._release(key, done))
+
+    def _release(self, key, batch: Future):
+        with self._lock:
+            self._batches.discard(batch)
+            if self._tails.get(key) is batch:
+                del self._tails[key]
+
+    def _throttle(self):
+        """Wait while too many batches are queued"""
+        while True:
+            with self._lock:
+                if len(self._batches) <= 4 * self.workers:
+                    return
+                batches = list(self._batches)
+            wait(batches, return_when=FIRST_COMPLETED)
+
+    @staticmethod
+    def _after(previous: Future | None, function: Callable, *args):
+        if previous is not None:
+            # previous batch was submitted earlier, so it is running already
+            wait([previous])
+        function(*args)
+
+    def _send_chain(self, items: list):
+        for method, model, _key, on_error, future in items:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(post_idempotent(method, model))
+            # any failure (API, connection, cancellation, invalid model) must reach
+            # the future and flush(), a worker has no caller to raise it to
+            except Exception as exc:  # noqa: BLE001
+                future.set_exception(exc)
+                self._error(exc, on_error)
+
+    def _send_bulk(self, bulk: Bulk, items: list):
+        items = [item for item in items if item[-1].set_running_or_notify_cancel()]
+        try:
+            created = bulk([item[1] for item in items])
+            for item, obj in zip(items, created, strict=True):
+                item[-1].set_result(obj)
+        # as in _send_chain, the failure is handed over to futures and flush()
+        except Exception as exc:  # noqa: BLE001
+            for *_, on_error, future in items:
+                if not future.done():
+                    future.set_exception(exc)
+                    self._error(exc, on_error)
+
+    def _error(self, exc: Exception, on_error: Callable | None):
+        if on_error is not None:
+            on_error(exc)
+        else:
+            with self._lock:
+                self._errors.append(exc)
+
+
+@contextmanager
+def coalesce(nt_client, **kwargs):
+    """Coalesce creates posted with `post` to nt_client until the end of the block
+
+    kwargs are passed to WriteCoalescer; pending creates are dropped on error.
+    Workers are capped so that they and the importing thread fit in the
+    connection pool of the client.
+    """
+    if maxsize := nt_client.configuration.connection_pool_maxsize:
+        kwargs["workers"] = max(1, min(kwargs.get("workers", WORKERS), maxsize - 1))
+    writes = nt_client.writes = WriteCoalescer(**kwargs)
+    try:
+        yield writes
+    except BaseException:
+        writes.close(cancel=True)
+        raise
+    else:
+        writes.close()
+    finally:
+        nt_client.writes = None
+
+
+def post(method: Callable, model, key=None, on_error: Callable | None = None) -> Future:
+    """Create with write coalescer of the client of api method if any, right away otherwise
+
+    on_error - called with the exception of a failed create instead of failing
+        the import (see WriteCoalescer.post)
+    Without coalescer errors (without on_error) are raised, the returned
+    future is already done.
+    """
+    if (writes := method.__self__.api_client.writes) is not None:
+        return writes.post(method, model, key=key, on_error=on_error)
+    future = Future()
+    try:
+        future.set_result(post_idempotent(method, model))
+    except OpenApiException as exc:
+        if on_error is None:
+            raise
+        future.set_exception(exc)
+        on_error(exc)
+    return future
+
+
+def flush(nt_client):
+    """Wait for creates queued in write coalescer of nt_client, raise WriteError if any failed"""
+    if nt_client.writes is not None:
+        nt_client.writes.flush()
@@ -0,0 +1,232 @@
+""" Process-wide caps on concurrent requests per service """
+
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import requests
+
+TOO_MANY_REQUESTS = 429
+# limit of adaptive services without configured limit
+MAX_ADAPTIVE = 64
+# seconds between checks of cancellation while waiting for a slot
+POLL_INTERVAL = 0.1
+
+
+class Outcome:
+    """Result of a request made in a limiter slot, `status` is set by the caller"""
+
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status: int | None = None
+
+    @property
+    def overloaded(self) -> bool:
+        return self.status is not None and (
+            self.status == TOO_MANY_REQUESTS or self.status >= 500
+        )
+
+
+class AdaptiveLimit:
+    """Concurrent requests limit of a service tuned by AIMD
+
+    initial - requests allowed in flight at start
+    minimum, maximum - bounds of the limit
+    increase - limit growth per limit's worth of healthy responses (additive)
+    decrease - factor applied to the limit on 429, 5xx, failed request or
+        latency spike (multiplicative)
+    latency_factor - latency above `latency_factor` x typical latency is a spike
+    smoothing - weight of a new sample in the typical latency (moving average)
+
+    Responses to requests started before the latest decrease do not decrease
+    the limit again, so a burst of 429s counts as a single congestion signal.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = MAX_ADAPTIVE,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_factor: float = 3.0,
+        smoothing: float = 0.05,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.smoothing = smoothing
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.latency: float | None = None  # typical latency in seconds
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, cancel_token=None) -> float:
+        """Wait for a free permit, return start time to pass to `release`
+
+        cancel_token - ImportCancelled is raised once it is cancelled while waiting
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                if cancel_token is not None:
+                    cancel_token.check()
+                self._cond.wait(None if cancel_token is None else POLL_INTERVAL)
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, outcome: Outcome | None = None, failed: bool = False):
+        """Return permit and adjust the limit to outcome of the request
+
+        Without outcome (and not failed) the limit is kept, e.g. on cancellation.
+        """
+        now = time.monotonic()
+        seconds = now - started
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+            if outcome is None and not failed:
+                return
+            spike = self.latency is not None and seconds > self.latency_factor * self.latency
+            if failed or (outcome is not None and outcome.overloaded) or spike:
+                if started >= self._decreased_at:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._decreased_at = now
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            if not failed:
+                self.latency = (
+                    seconds
+                    if self.latency is None
+                    else (1 - self.smoothing) * self.latency + self.smoothing * seconds
+                )
+
+
+class RequestLimiter:
+    """Limit number of requests in flight per service (nozbe, trello, monday, ...)
+
+    limits - service -> max concurrent requests, or AdaptiveLimit
+    default - limit of services missing in `limits` (None - unlimited)
+    adaptive - limits of all services adapt to responses (see AdaptiveLimit),
+        configured limits (MAX_ADAPTIVE if none) are their maximums
+
+    Every service talks to a single host, so the limits are per host.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, int | AdaptiveLimit] | None = None,
+        default: int | None = None,
+        adaptive: bool = False,
+    ):
+        self.limits = dict(limits or {})
+        self.default = default
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.BoundedSemaphore | AdaptiveLimit] = {}
+
+    def _semaphore(self, service: str) -> threading.BoundedSemaphore | AdaptiveLimit | None:
+        limit = self.limits.get(service, self.default)
+        if limit is None and not self.adaptive:
+            return None
+        with self._lock:
+            if (semaphore := self._semaphores.get(service)) is None:
+                if isinstance(limit, AdaptiveLimit):
+                    semaphore = limit
+                elif self.adaptive:
+                    semaphore = AdaptiveLimit(maximum=limit or MAX_ADAPTIVE)
+                else:
+                    semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[service] = semaphore
+        return semaphore
+
+    def maximum(self, service: str) -> int | None:
+        """Most requests of service ever allowed in flight (None - unlimited)"""
+        limit = self.limits.get(service, self.default)
+        if isinstance(limit, AdaptiveLimit):
+            return limit.maximum
+        if self.adaptive:
+            return limit or MAX_ADAPTIVE
+        return limit
+
+    def current(self, service: str) -> int | None:
+        """Number of requests of service currently allowed in flight (None - unlimited)"""
+        semaphore = self._semaphore(service)
+        if isinstance(semaphore, AdaptiveLimit):
+            return int(semaphore.limit)
+        return self.limits.get(service, self.default)
+
+    @contextmanager
+    def slot(self, service: str, cancel_token=None):
+        """Wait for a free request slot of service, yield Outcome to report response status
+
+        cancel_token - ImportCancelled is raised once it is cancelled while waiting
+        """
+        outcome = Outcome()
+        if (semaphore := self._semaphore(service)) is None:
+            yield outcome
+            return
+        if not isinstance(semaphore, AdaptiveLimit):
+            while not semaphore.acquire(timeout=None if cancel_token is None else POLL_INTERVAL):
+                cancel_token.check()
+            try:
+                yield outcome
+            finally:
+                semaphore.release()
+            return
+        started = semaphore.acquire(cancel_token)
+        try:
+            yield outcome
+        except Exception:
+            # connection errors and timeouts
+            semaphore.release(started, failed=True)
+            raise
+        except BaseException:
+            semaphore.release(started)
+            raise
+        semaphore.release(started, outcome)
+
+
+def limit(limiter: RequestLimiter | None, service: str, cancel_token=None):
+    """Return request slot context manager yielding Outcome, no-op without limiter"""
+    return nullcontext(Outcome()) if limiter is None else limiter.slot(service, cancel_token)
+
+
+def limit_asana(asana_client, limiter: RequestLimiter | None, cancel_token=None):
+    """Make requests of asana.ApiClient wait for `asana` slots, unless cancelled"""
+    if limiter is None:
+        return asana_client
+    request = asana_client.request
+
+    @functools.wraps(request)
+    def _request(*args, **kwargs):
+        with limiter.slot("asana", cancel_token) as outcome:
+            response = request(*args, **kwargs)
+            outcome.status = getattr(response, "status", None)
+            return response
+
+    asana_client.request = _request
+    return asana_client
+
+
+def limit_session(
+    session: requests.Session, limiter: RequestLimiter | None, service: str, cancel_token=None
+) -> requests.Session:
+    """Make requests of session wait for `service` slots, unless cancelled"""
+    if limiter is None:
+        return session
+    request = session.request
+
+    @functools.wraps(request)
+    def _request(*args, **kwargs):
+        with limiter.slot(service, cancel_token) as outcome:
+            response = request(*args, **kwargs)
+            outcome.status = response.status_code
+            return response
+
+    session.request = _request
+    return session
@@ -0,0 +1,186 @@
+""" Dry-run mode: plan of an import without writing to Nozbe """
+
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl, urlsplit
+
+from ntimporters.progress import Progress
+from ntimporters.telemetry import NOZBE, Metrics
+from ntimporters.utils import id16
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+PAGING = ("limit", "offset", "sortBy", "fields")
+# fields filled by Nozbe
+TIMESTAMPS = ("created_at", "last_event_at", "last_activity_at", "last_modified")
+# requests per second allowed by source APIs (see RLProxy defaults)
+RATE_LIMITS = {"todoist": 450 / (15 * 60)}
+
+
+class DryRun:
+    """Nozbe writes recorder
+
+    Writes are not sent; they are answered as Nozbe would (with generated
+    IDs) and kept, so that reads issued later by the importer see them.
+    Reads are sent to Nozbe and merged with recorded objects.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.objects: dict[str, dict[str, dict]] = defaultdict(dict)
+        self.writes: Counter = Counter()
+        self.limits: dict[str, dict] = {}
+        # placeholder of the team member the client acts as
+        self.author_id = id16()
+
+    def wrap(self, pool_manager) -> "DryRunPoolManager":
+        """Return pool manager of openapi_client recording writes (Configuration.dry_run hook)"""
+        return DryRunPoolManager(pool_manager, self)
+
+    def check_limit(self, name: str, current: int, limit: int):
+        """Record limit check of `check_limits`, the highest count per limit is kept"""
+        with self._lock:
+            if (checked := self.limits.get(name)) and checked["current"] >= current:
+                return
+            self.limits[name] = {
+                "name": name,
+                "current": current,
+                "limit": limit,
+                "exceeded": current > limit > -1,
+            }
+
+    def write(self, method: str, resource: str, body: dict) -> dict | None:
+        """Record write and return object as returned by Nozbe, None for existing id"""
+        now = int(time.time() * 1000)
+        obj = {"id": id16()} | {key: val for key, val in body.items() if val is not None}
+        for field in TIMESTAMPS:
+            obj.setdefault(field, now)
+        obj.setdefault("author_id", self.author_id)
+        with self._lock:
+            self.writes[(method, resource)] += 1
+            if method == "POST" and obj["id"] in self.objects[resource]:
+                return None
+            self.objects[resource][obj["id"]] = obj
+        return obj
+
+    def matching(self, resource: str, query: dict) -> list[dict]:
+        """Return recorded objects matching list filters"""
+        filters = {key: val for key, val in query.items() if key not in PAGING}
+        with self._lock:
+            return [
+                obj
+                for obj in self.objects[resource].values()
+                if all(_as_query(obj.get(key)) == val for key, val in filters.items())
+            ]
+
+    def plan(
+        self,
+        metrics: Metrics,
+        progress: Progress,
+        rate_limits: dict[str, float] | None = None,
+    ) -> dict:
+        """Return import plan: source counts, Nozbe reads/writes, limits and estimated duration
+
+        The plan is made of a full run of the importer: every source project,
+        task and comment is read, as in a real import, only Nozbe writes are
+        skipped. So a dry run costs as many source requests (and rate limit
+        quota) as the import itself, which is what makes its counts exact.
+        Duration is estimated per service as the larger of time spent on its
+        requests (writes take as long as reads on average) and the minimal time
+        allowed by its rate limit (requests per second in `rate_limits`).
+        """
+        rate_limits = RATE_LIMITS if rate_limits is None else rate_limits
+        snapshot = progress.snapshot("plan")
+        with metrics._lock:
+            requests, seconds = Counter(), Counter()
+            for (service, method, *_), count in metrics.requests.items():
+                requests[(service, method)] += count
+            for (service, method, _), histogram in metrics.latency.items():
+                seconds[(service, method)] += histogram.total
+            source_bytes = sum(
+                val for service, val in metrics.bytes_in.items() if service != NOZBE
+            )
+
+        services = {service for service, _ in requests}
+        reads = requests[(NOZBE, "GET")]
+        writes = sum(self.writes.values())
+        per_read = seconds[(NOZBE, "GET")] / reads if reads else 0.0
+        estimate = {}
+        for service in services:
+            count = sum(val for (name, _), val in requests.items() if name == service)
+            spent = sum(val for (name, _), val in seconds.items() if name == service)
+            if service == NOZBE:
+                # writes were not sent, assume they take as long as reads
+                spent = seconds[(NOZBE, "GET")] + writes * per_read
+            if rate := rate_limits.get(service):
+                spent = max(spent, count / rate)
+            estimate[service] = round(spent, 3)
+
+        return {
+            "source": {
+                **snapshot["planned"],
+                "requests": sum(val for (name, _), val in requests.items() if name != NOZBE),
+                "bytes": source_bytes,
+            },
+            "nozbe": {
+                "reads": reads,
+                "writes": writes,
+                "writes_by_resource": {
+                    f"{method} {resource}": count
+                    for (method, resource), count in sorted(self.writes.items())
+                },
+            },
+            "limits": list(self.limits.values()),
+            "limits_exceeded": any(elt["exceeded"] for elt in self.limits.values()),
+            "estimated_seconds": {"total": round(sum(estimate.values()), 3), **estimate},
+        }
+
+
+class DryRunPoolManager:
+    """urllib3.PoolManager proxy answering writes from DryRun"""
+
+    def __init__(self, pool_manager, dry_run: DryRun):
+        self.pool_manager = pool_manager
+        self.dry_run = dry_run
+
+    def request(self, method, url, body=None, **kwargs):
+        parts = urlsplit(url)
+        segments = [elt for elt in parts.path.split("/") if elt]
+        if method in WRITE_METHODS:
+            obj = self.dry_run.write(
+                method, segments[-1] if method == "POST" else segments[-2], json.loads(body or "{}")
+            )
+            if obj is None:
+                return _Response(409, b'{"error": "Conflict"}')
+            return _Response(201 if method == "POST" else 200, json.dumps(obj).encode())
+
+        resource, obj_id = segments[-2], segments[-1]
+        if obj := self.dry_run.objects.get(resource, {}).get(obj_id):
+            return _Response(200, json.dumps(obj).encode())
+        response = self.pool_manager.request(method, url, body=body, **kwargs)
+        resource, query = segments[-1], dict(parse_qsl(parts.query))
+        if response.status != 200 or not (recorded := self.dry_run.matching(resource, query)):
+            return response
+        found = json.loads(response.data or b"[]")
+        if isinstance(found, list) and len(found) < int(query.get("limit") or 100):
+            found = (found + recorded)[: int(query.get("limit") or 100)]
+            return _Response(response.status, json.dumps(found).encode())
+        return response
+
+
+class _Response:
+    """urllib3.HTTPResponse look-alike"""
+
+    def __init__(self, status: int, data: bytes):
+        self.status = status
+        self.reason = "OK" if status < 400 else "Error"
+        self.data = data
+        self.headers = {"Content-Type": "application/json", "Content-Length": str(len(data))}
+
+
+def _as_query(value) -> str:
+    """Format value as in query string"""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
@@ -0,0 +1,382 @@
+""" Local emulator of Nozbe API for load testing importers
+
+Run it with `python -m ntimporters.emulator --port 8888` and point importers
+at it with CUSTOM_API_HOST=http://localhost:8888/v1/api, the printed API key
+is accepted as nt_auth_token.
+"""
+
+import argparse
+import json
+import math
+import random
+import string
+import threading
+import time
+from collections import Counter, defaultdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+RESOURCES = (
+    "attachments",
+    "comments",
+    "group_assignments",
+    "project_accesses",
+    "project_groups",
+    "project_sections",
+    "projects",
+    "reminders",
+    "tag_assignments",
+    "tags",
+    "tasks",
+    "team_members",
+    "teams",
+    "users",
+)
+# fields filled by the server
+TIMESTAMPS = ("created_at", "last_event_at", "last_activity_at", "last_modified")
+PAGING = ("limit", "offset", "sortBy", "fields")
+UNLIMITED = {name: -1 for name in ("projects_open", "project_sections", "tags", "team_members")}
+TOO_MANY_REQUESTS = 429
+
+
+def id16() -> str:
+    return "".join(random.choices(string.ascii_letters + string.digits, k=16))
+
+
+class NozbeEmulator:
+    """Nozbe API keeping objects in memory
+
+    latency - seconds added to every request
+    jitter - random extra latency, up to given number of seconds
+    rate_limit - requests per second allowed (bursts up to one second of requests),
+        other requests are rejected with 429 and Retry-After
+    rate_limit_every - every n-th request is rejected with 429 (0 - never)
+    error_rate - part of requests failing with 503
+    errors - resource -> part of its requests failing with 503
+    seed - seed of random latency and failures
+
+    A team with unlimited limits, its owner and the Single tasks project are
+    created up front; `api_key` authorizes requests as the owner.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: float | None = None,
+        rate_limit_every: int = 0,
+        error_rate: float = 0.0,
+        errors: dict[str, float] | None = None,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_limit_every = rate_limit_every
+        self.error_rate = error_rate
+        self.errors = dict(errors or {})
+        self.requests: Counter = Counter()
+        self.responses: Counter = Counter()
+        self.seconds = 0.0  # time spent handling requests, without latency
+        self.data: dict[str, dict[str, dict]] = {name: {} for name in RESOURCES}
+        # (resource, field) -> field value -> objects, built on first filter by field
+        self._indexes: dict[tuple, defaultdict] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._count = 0
+        self._tokens = rate_limit or 0.0
+        self._refilled_at = time.monotonic()
+
+        self.user_id, self.team_id, self.member_id = id16(), id16(), id16()
+        self.api_key = f"{self.user_id}_emulator"
+        self.data["users"][self.user_id] = {
+            "id": self.user_id,
+            "name": "Owner",
+            "email": "owner@example.com",
+            "color": "avatarColor1",
+            "is_placeholder": False,
+        }
+        self.data["teams"][self.team_id] = {
+            "id": self.team_id,
+            "name": "Emulated team",
+            "limits": json.dumps(UNLIMITED),
+        }
+        self.data["team_members"][self.member_id] = {
+            "id": self.member_id,
+            "team_id": self.team_id,
+            "user_id": self.user_id,
+            "role": "owner",
+            "status": "active",
+        }
+        self._create(
+            "projects",
+            {"name": "Single tasks", "team_id": self.team_id, "is_open": True},
+        )["is_single_actions"] = True
+
+    @property
+    def writes(self) -> int:
+        """Number of write requests"""
+        return sum(count for (method, _), count in self.requests.items() if method != "GET")
+
+    def _create(self, resource: str, body: dict) -> dict:
+        """Store object filling read-only fields"""
+        now = int(time.time() * 1000)
+        obj = {"id": id16()} | {key: val for key, val in body.items() if val is not None}
+        for field in TIMESTAMPS:
+            obj.setdefault(field, now)
+        obj.setdefault("author_id", self.member_id)
+        self.data[resource][obj["id"]] = obj
+        for (indexed, field), index in self._indexes.items():
+            if indexed == resource:
+                index[_as_query(obj.get(field))].append(obj)
+        return obj
+
+    def _update(self, resource: str, obj_id: str, body: dict) -> dict:
+        obj = self.data[resource][obj_id]
+        self._unindex(resource, obj)
+        obj |= {key: val for key, val in body.items() if key != "id"}
+        obj["last_modified"] = int(time.time() * 1000)
+        for (indexed, field), index in self._indexes.items():
+            if indexed == resource:
+                index[_as_query(obj.get(field))].append(obj)
+        return obj
+
+    def _delete(self, resource: str, obj_id: str):
+        self._unindex(resource, self.data[resource].pop(obj_id))
+
+    def _unindex(self, resource: str, obj: dict):
+        for (indexed, field), index in self._indexes.items():
+            if indexed == resource:
+                index[_as_query(obj.get(field))].remove(obj)
+
+    def _index(self, resource: str, field: str) -> defaultdict:
+        """Get objects by field value"""
+        if (index := self._indexes.get((resource, field))) is None:
+            index = self._indexes[(resource, field)] = defaultdict(list)
+            for obj in self.data[resource].values():
+                index[_as_query(obj.get(field))].append(obj)
+        return index
+
+    def _list(self, resource: str, query: dict) -> list:
+        """Filter and page objects"""
+        filters = {key: val for key, val in query.items() if key not in PAGING}
+        candidates = self.data[resource].values()
+        if filters:
+            field = next(iter(filters))
+            candidates = self._index(resource, field).get(filters.pop(field), [])
+        matching = [
+            obj
+            for obj in candidates
+            if all(_as_query(obj.get(key)) == val for key, val in filters.items())
+        ]
+        offset = int(query.get("offset", 0))
+        return matching[offset : offset + int(query.get("limit", 100))]
+
+    def _rate_limited(self) -> bool:
+        """Take a request token, must be called with the lock held"""
+        self._count += 1
+        if self.rate_limit_every and not self._count % self.rate_limit_every:
+            return True
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        self._tokens = min(
+            self.rate_limit, self._tokens + (now - self._refilled_at) * self.rate_limit
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next request is allowed"""
+        if not self.rate_limit:
+            return 0.0
+        return max(0.0, (1 - self._tokens) / self.rate_limit)
+
+    def handle(self, method: str, url: str, body: bytes | str | None = None) -> tuple[int, bytes]:
+        """Handle request and return status and JSON body"""
+        if delay := self.latency + (self.jitter and self._random.uniform(0, self.jitter)):
+            time.sleep(delay)
+        start = time.perf_counter()
+        try:
+            status, data = self._handle(method, url, body)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.responses[status] += 1
+        return status, data
+
+    def respond(
+        self, method: str, url: str, authorization: str | None, body: bytes | None
+    ) -> tuple[int, list, bytes]:
+        """Handle authorized HTTP request and return status, headers and body"""
+        if authorization != self.api_key:
+            status, data = 401, b'{"error": "Unauthorized"}'
+        else:
+            status, data = self.handle(method, url, body)
+        headers = [("Content-Type", "application/json"), ("Content-Length", str(len(data)))]
+        if status == TOO_MANY_REQUESTS:
+            headers.append(("Retry-After", str(math.ceil(self.retry_after()))))
+        return status, headers, data
+
+    def wsgi(self, environ: dict, start_response) -> list[bytes]:
+        """WSGI application, see ntimporters.transport.WSGITransport"""
+        url = environ.get("PATH_INFO", "/")
+        if query := environ.get("QUERY_STRING"):
+            url += f"?{query}"
+        body = environ["wsgi.input"].read(int(environ.get("CONTENT_LENGTH") or 0))
+        status, headers, data = self.respond(
+            environ["REQUEST_METHOD"], url, environ.get("HTTP_AUTHORIZATION"), body
+        )
+        start_response(f"{status} {HTTPStatus(status).phrase}", headers)
+        return [data]
+
+    async def asgi(self, scope: dict, receive, send):
+        """ASGI application, see ntimporters.transport.ASGITransport"""
+        body, more = b"", True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+        url = scope["path"]
+        if scope.get("query_string"):
+            url += f"?{scope['query_string'].decode()}"
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode() or None
+        status, headers, data = self.respond(scope["method"], url, authorization, body)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+            }
+        )
+        await send({"type": "http.response.body", "body": data})
+
+    def _handle(self, method: str, url: str, body: bytes | str | None) -> tuple[int, bytes]:
+        parts = urlsplit(url)
+        segments = [elt for elt in parts.path.split("/") if elt]
+        if segments and segments[-1] in RESOURCES:
+            resource, obj_id = segments[-1], None
+        elif len(segments) > 1:
+            resource, obj_id = segments[-2], segments[-1]
+        else:
+            return 404, b"{}"
+        with self._lock:
+            self.requests[(method, resource)] += 1
+            if self._rate_limited():
+                return TOO_MANY_REQUESTS, b'{"error": "Too many requests"}'
+            if self._random.random() < self.errors.get(resource, self.error_rate):
+                return 503, b'{"error": "Service unavailable"}'
+            if resource not in RESOURCES:
+                return 404, b"{}"
+            if obj_id and obj_id not in self.data[resource]:
+                return 404, b"{}"
+            match method, obj_id:
+                case "GET", None:
+                    found = self._list(resource, dict(parse_qsl(parts.query)))
+                    return 200, json.dumps(found).encode()
+                case "GET", _:
+                    return 200, json.dumps(self.data[resource][obj_id]).encode()
+                case "POST", None:
+                    if (created := json.loads(body or "{}")).get("id") in self.data[resource]:
+                        return 409, b'{"error": "Conflict"}'
+                    return 201, json.dumps(self._create(resource, created)).encode()
+                case "PUT" | "PATCH", _:
+                    updated = self._update(resource, obj_id, json.loads(body or "{}"))
+                    return 200, json.dumps(updated).encode()
+                case "DELETE", _:
+                    self._delete(resource, obj_id)
+                    return 200, b"{}"
+        return 405, b"{}"
+
+
+def _as_query(value) -> str:
+    """Format value as in query string"""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+class Server(ThreadingHTTPServer):
+    """HTTP server with a thread per connection and a listen backlog for many clients
+
+    The default backlog of 5 overflows under concurrent imports and stress
+    runs, resetting connections.
+    """
+
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP front of NozbeEmulator (`server.emulator`)"""
+
+    protocol_version = "HTTP/1.1"
+    # send headers and body in one segment, flushed after every request
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        status, headers, data = self.server.emulator.respond(
+            self.command, self.path, self.headers.get("Authorization"), body
+        )
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, *_args):
+        pass
+
+
+def serve(
+    emulator: NozbeEmulator | None = None, host: str = "localhost", port: int = 8888
+) -> Server:
+    """Start emulator HTTP server in a background thread, stop it with `shutdown()`
+
+    Port 0 picks a free port, see `server.server_address`.
+    """
+    server = Server((host, port), _Handler)
+    server.emulator = emulator or NozbeEmulator()
+    threading.Thread(target=server.serve_forever, name="nozbe-emulator", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0].strip())
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random extra latency")
+    parser.add_argument("--rate-limit", type=float, help="requests per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part of requests failing")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    emulator = NozbeEmulator(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    server = serve(emulator, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"CUSTOM_API_HOST=http://{host}:{port}/v1/api")
+    print(f"nt_auth_token={emulator.api_key}")
+    print(f"team_id={emulator.team_id}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print({f"{method} {resource}": n for (method, resource), n in emulator.requests.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+""" On-disk cache of source API reads, revalidated with ETag / Last-Modified
+
+Set NTIMPORTERS_HTTP_CACHE to a file path to cache reads of Trello and
+Monday clients there, e.g. so that re-running a failed import gets 304s for
+boards, lists and members it has read before instead of their bodies.
+"""
+
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+
+MAX_BYTES = 256 * 2**20
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _expires(headers) -> float | None:
+    """Time until response is fresh (Cache-Control max-age), None if it must not be stored"""
+    control = headers.get("Cache-Control", "").lower()
+    if "no-store" in control:
+        return None
+    if "no-cache" not in control and (match := _MAX_AGE.search(control)):
+        return time.time() + int(match.group(1))
+    return 0.0
+
+
+class ResponseCache:
+    """sqlite cache of GET responses, least recently used ones evicted past max_bytes
+
+    path - sqlite file, may be shared by processes
+    max_bytes - bound of size of cached bodies
+
+    Responses are keyed by URL, body and Authorization header (hashed), so
+    users never get responses of each other. Only 200 responses with ETag,
+    Last-Modified or Cache-Control max-age are stored, `no-store` ones never.
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key BLOB PRIMARY KEY, etag TEXT,"
+            " last_modified TEXT, expires REAL, content_type TEXT, body BLOB, used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        # size of bodies, exact after eviction, other processes may add to it meanwhile
+        self._bytes = self._size()
+        self.hits = self.revalidated = self.misses = self.evicted = 0
+
+    @staticmethod
+    def key(url: str, headers: dict | None = None, data: bytes | str | None = None) -> bytes:
+        """Key of request"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (url, (headers or {}).get("Authorization", ""), data or b""):
+            digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.digest()
+
+    def lookup(self, key: bytes) -> tuple | None:
+        """(etag, last_modified, expires, content_type, body) of key, None if not cached"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, expires, content_type, body FROM responses"
+                " WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+            return row
+
+    def store(self, key: bytes, response: requests.Response):
+        """Store 200 response (read) if it has validators or is fresh for a while"""
+        if (expires := _expires(response.headers)) is None:
+            return
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified or expires > time.time()):
+            return
+        if len(body := response.content) > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    etag,
+                    last_modified,
+                    expires,
+                    response.headers.get("Content-Type"),
+                    body,
+                    time.time(),
+                ),
+            )
+            self._bytes += len(body)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def touch(self, key: bytes, expires: float | None = None, revalidated: bool = False):
+        """Mark key used now, with new freshness after revalidation"""
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+                self._db.execute(
+                    "UPDATE responses SET used = ?, expires = ? WHERE key = ?",
+                    (time.time(), expires or 0.0, key),
+                )
+            else:
+                self.hits += 1
+                self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+
+    def _evict(self):
+        """Remove least recently used responses until bodies fit in max_bytes"""
+        self._bytes = self._size()
+        if (excess := self._bytes - self.max_bytes) <= 0:
+            return
+        keys = []
+        for key, size in self._db.execute(
+            "SELECT key, LENGTH(body) FROM responses ORDER BY used"
+        ).fetchall():
+            keys.append((key,))
+            self._bytes -= size
+            if (excess := excess - size) <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self.evicted += len(keys)
+
+    def _size(self) -> int:
+        row = self._db.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()
+        return row[0]
+
+    def clear(self):
+        """Remove all responses"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._bytes = 0
+
+    def close(self):
+        self._db.close()
+
+    def stats(self) -> dict:
+        """Numbers of fresh hits, 304s, misses, evicted and cached responses and bytes"""
+        with self._lock:
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "responses": count,
+            "bytes": size,
+        }
+
+
+class CachedSession:
+    """requests.Session-like client making GETs conditional on cached responses
+
+    session - client making requests, e.g. requests.Session
+    cache - ResponseCache
+
+    Fresh responses are returned without a request, others are requested with
+    If-None-Match / If-Modified-Since and returned from cache on 304.
+    Streamed requests are not cached.
+    """
+
+    def __init__(self, session, cache: ResponseCache):
+        self.session = session
+        self.cache = cache
+
+    def get(self, url: str, headers=None, data=None, stream: bool = False, **kwargs):
+        if stream:
+            return self.session.get(url, headers=headers, data=data, stream=True, **kwargs)
+        key = self.cache.key(url, headers, data)
+        conditional = dict(headers or {})
+        if (entry := self.cache.lookup(key)) is not None:
+            etag, last_modified, expires, *_ = entry
+            if expires and expires > time.time():
+                self.cache.touch(key)
+                return self._cached(url, entry)
+            if etag:
+                conditional["If-None-Match"] = etag
+            if last_modified:
+                conditional["If-Modified-Since"] = last_modified
+        resp = self.session.get(url, headers=conditional, data=data, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            self.cache.touch(key, _expires(resp.headers), revalidated=True)
+            return self._cached(url, entry)
+        if resp.status_code == 200:
+            self.cache.store(key, resp)
+        return resp
+
+    @staticmethod
+    def _cached(url: str, entry: tuple) -> requests.Response:
+        """Response of cache entry"""
+        *_, content_type, body = entry
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = body
+        resp.headers["Content-Length"] = str(len(body))
+        if content_type:
+            resp.headers["Content-Type"] = content_type
+        return resp
+
+
+@functools.cache
+def default_cache() -> ResponseCache | None:
+    """Cache of NTIMPORTERS_HTTP_CACHE file (size bound NTIMPORTERS_HTTP_CACHE_MB), None if unset"""
+    if path := os.getenv("NTIMPORTERS_HTTP_CACHE"):
+        megabytes = os.getenv("NTIMPORTERS_HTTP_CACHE_MB")
+        return ResponseCache(path, int(megabytes) * 2**20 if megabytes else MAX_BYTES)
+    return None
@@ -0,0 +1,123 @@
+""" Compact key -> Nozbe ID mapping """
+
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import weakref
+from collections.abc import Iterator, MutableMapping
+from itertools import chain
+
+ID_LEN = 16  # Nozbe IDs are 16 ASCII characters
+SPILL_THRESHOLD = 1_000_000
+
+
+def _close_db(db: sqlite3.Connection, path: str):
+    """Close and remove spilled database"""
+    db.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class IdMap(MutableMapping):
+    """Mapping of keys onto Nozbe IDs, much smaller than dict of str -> str
+
+    IDs are kept in a single bytearray (16 bytes per entry) and keys are interned.
+    Values which are not 16 ASCII characters (e.g. IDs of a changed API) are kept
+    in a plain dict aside.
+    With `hash_keys` keys are replaced by 16-bytes digests - useful for long keys
+    like comment bodies, iteration returns digests then (bytes keys are taken as digests).
+    Past `spill_threshold` entries the mapping is moved to a temporary sqlite file.
+    Setting None as a value removes the key.
+    """
+
+    __slots__ = ("__weakref__", "_db", "_ids", "_other", "_slots", "hash_keys", "spill_threshold")
+
+    def __init__(self, data=None, hash_keys: bool = False, spill_threshold: int | None = None):
+        self._slots: dict = {}
+        self._ids = bytearray()
+        self._other: dict = {}
+        self._db: sqlite3.Connection | None = None
+        self.hash_keys = hash_keys
+        self.spill_threshold = spill_threshold
+        if data:
+            self.update(data)
+
+    def _key(self, key):
+        """Normalize key"""
+        if self.hash_keys:
+            if isinstance(key, bytes):
+                return key
+            return hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        return sys.intern(str(key))
+
+    def __getitem__(self, key) -> str:
+        key = self._key(key)
+        if self._db is not None:
+            if row := self._db.execute("SELECT id FROM ids WHERE key = ?", (key,)).fetchone():
+                return row[0]
+            raise KeyError(key)
+        if key in self._other:
+            return self._other[key]
+        slot = self._slots[key] * ID_LEN
+        return self._ids[slot : slot + ID_LEN].decode("ascii")
+
+    def __setitem__(self, key, value):
+        if value is None:
+            self.pop(key, None)
+            return
+        value, key = str(value), self._key(key)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO ids VALUES (?, ?)", (key, value))
+            return
+        if len(value) != ID_LEN or not value.isascii():
+            self._slots.pop(key, None)
+            self._other[key] = value
+            return
+        self._other.pop(key, None)
+        raw = value.encode("ascii")
+        if (slot := self._slots.get(key)) is None:
+            self._slots[key] = len(self._ids) // ID_LEN
+            self._ids += raw
+            if self.spill_threshold and len(self) > self.spill_threshold:
+                self._spill()
+        else:
+            self._ids[slot * ID_LEN : (slot + 1) * ID_LEN] = raw
+
+    def __delitem__(self, key):
+        key = self._key(key)
+        if self._db is not None:
+            if not self._db.execute("DELETE FROM ids WHERE key = ?", (key,)).rowcount:
+                raise KeyError(key)
+        elif self._other.pop(key, None) is None:
+            del self._slots[key]  # freed slot in self._ids is not reused
+
+    def __iter__(self) -> Iterator:
+        if self._db is not None:
+            return (row[0] for row in self._db.execute("SELECT key FROM ids"))
+        return chain(self._slots, self._other)
+
+    def __len__(self) -> int:
+        if self._db is not None:
+            return self._db.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+        return len(self._slots) + len(self._other)
+
+    def _items(self) -> Iterator[tuple]:
+        """Iterate over normalized keys and IDs"""
+        for key, slot in self._slots.items():
+            yield key, self._ids[slot * ID_LEN : (slot + 1) * ID_LEN].decode("ascii")
+        yield from self._other.items()
+
+    def _spill(self):
+        """Move mapping to a temporary sqlite database"""
+        fd, path = tempfile.mkstemp(prefix="ntimporters-", suffix=".sqlite")
+        os.close(fd)
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("CREATE TABLE ids (key PRIMARY KEY, id TEXT NOT NULL)")
+        db.executemany("INSERT INTO ids VALUES (?, ?)", self._items())
+        weakref.finalize(self, _close_db, db, path)
+        self._db, self._slots, self._ids, self._other = db, {}, bytearray(), {}
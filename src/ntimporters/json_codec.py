@@ -0,0 +1,63 @@
+""" JSON codecs shared by Nozbe API client and source clients """
+
+import functools
+import json
+import os
+
+
+class StdlibCodec:
+    """JSON codec of the standard library"""
+
+    name = "json"
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        """Serialize obj to UTF-8 JSON"""
+        return json.dumps(obj).encode()
+
+    @staticmethod
+    def loads(data: bytes | str):
+        """Deserialize JSON, bytes are decoded by the parser (UTF-8, -16 or -32)"""
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """JSON codec of orjson (optional dependency), serializes and parses bytes in one pass"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj) -> bytes:
+        """Serialize obj to UTF-8 JSON"""
+        return self._orjson.dumps(obj, option=self._options)
+
+    def loads(self, data: bytes | str):
+        """Deserialize JSON without decoding bytes to str first"""
+        return self._orjson.loads(data)
+
+
+CODECS = {"json": StdlibCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(name: str | None = None):
+    """Return codec by name ("json" or "orjson")
+
+    Without name NTIMPORTERS_JSON environment variable is used, if not set
+    the standard library: orjson writes different bytes (separators, floats,
+    non-ASCII characters), so it is used only when selected.
+    """
+    name = name or os.getenv("NTIMPORTERS_JSON") or "json"
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec {name!r}, expected one of {list(CODECS)}")
+    return CODECS[name]()
+
+
+@functools.cache
+def default_codec():
+    """Codec used by clients not given one, see get_codec"""
+    return get_codec()
@@ -1,74 +1,114 @@
 """Monday -> Nozbe importer"""
 
 import re
-from typing import Optional
 
 import openapi_client as nt
 from dateutil.parser import isoparse
 from ntimporters.monday.monday_api import MondayClient
+from ntimporters.telemetry import Metrics, phase
+from ntimporters.id_map import IdMap
+from ntimporters.cancellation import CancelToken
+from ntimporters.coalescing import coalesce, flush, post
+from ntimporters.concurrency import RequestLimiter
+from ntimporters.dry_run import DryRun
+from ntimporters.progress import Progress
+from ntimporters.project_group import ImportGroup
+from ntimporters.monday.spec import SPEC
+from ntimporters.tagging import set_unassigned_tag
 from ntimporters.utils import (
-    API_HOST,
-    add_to_project_group,
     check_limits,
     current_nt_member,
     exists,
     get_imported_entities,
     id16,
     match_nt_users,
+    nozbe_client,
     nt_open_projects_len,
-    set_unassigned_tag,
+    post_idempotent,
+    stable_id,
     trim,
 )
 from openapi_client import models, api
 from openapi_client.exceptions import OpenApiException
 
-SPEC = {
-    "code": "monday",  # codename / ID of importer
-    "name": "Monday",  # name of application
-    "url": "https://nozbe.help/advancedfeatures/importers/#monday",
-    "input_fields": ("team_id", "nt_auth_token", "app_key"),
-}
 IMPORT_NAME = "Imported from Monday"
 
 
 # main method called by Nozbe app
-def run_import(nt_auth_token: str, app_key: str, team_id: str) -> Optional[Exception]:
-    """Perform import from monday to Nozbe"""
+def run_import(
+    nt_auth_token: str,
+    app_key: str,
+    team_id: str,
+    metrics: Metrics | None = None,
+    progress=None,
+    cancel_token: CancelToken | None = None,
+    limiter: RequestLimiter | None = None,
+    dry_run: bool = False,
+) -> Exception | dict | None:
+    """Perform import from monday to Nozbe
+
+    metrics - records requests and phases
+    progress - callable or queue receiving progress events
+    cancel_token - import stops when it is cancelled or past its deadline,
+        ImportCancelled with partial-progress summary is returned
+    limiter - caps concurrent requests per service
+    dry_run - nothing is written to Nozbe, the import plan with cost estimate
+        (see DryRun.plan) is returned instead
+    """
     if not nt_auth_token:
         return "Missing 'nt_auth_token'"
     if not app_key:
         return "Missing 'app_key'"
 
+    recorder = DryRun() if dry_run else None
+    metrics = metrics or (Metrics() if progress or dry_run else None)
+    tracker = Progress(progress, metrics)
     try:
-        _import_data(
-            nt.ApiClient(
-                configuration=nt.Configuration(
-                    host=API_HOST,
-                    api_key={"ApiKeyAuth": nt_auth_token},
-                    username=nt_auth_token.split("_")[0],
-                )
-            ),
-            MondayClient(app_key),
-            team_id,
-            nt_auth_token,
-        )
+        with phase(metrics, "import"):
+            _import_data(
+                nozbe_client(
+                    nt_auth_token,
+                    metrics=metrics,
+                    cancel_token=cancel_token,
+                    limiter=limiter,
+                    dry_run=recorder,
+                ),
+                MondayClient(app_key, metrics=metrics, cancel_token=cancel_token, limiter=limiter),
+                team_id,
+                nt_auth_token,
+                progress=tracker,
+                cancel_token=cancel_token,
+            )
 
     except Exception as exc:
+        tracker.finish(exc)
         return exc
-    return None
+    tracker.finish()
+    return recorder and recorder.plan(metrics, tracker)
 
 
-def _import_data(nt_client: nt.ApiClient, monday_client, team_id: str, nt_auth_token: str):
+def _import_data(
+    nt_client: nt.ApiClient,
+    monday_client,
+    team_id: str,
+    nt_auth_token: str,
+    progress: Progress | None = None,
+    cancel_token: CancelToken | None = None,
+):
     """Import everything from monday to Nozbe"""
+    progress = progress or Progress()
+    cancel_token = cancel_token or CancelToken()
     projects_api = api.ProjectsApi(nt_client)
     curr_member = current_nt_member(nt_client, team_id)
     imported = get_imported_entities(nt_client, team_id, IMPORT_NAME)
+    group = ImportGroup(nt_client, team_id, IMPORT_NAME)
 
     def _import_project(project: dict, curr_member: str):
         """Import monday project"""
         if project.get("name", "").startswith("Subitems of"):
             return
         project_model = models.Project(
+            id=stable_id(team_id, SPEC["code"], project.get("id")),
             name=(name := trim(project.get("name", ""))),
             team_id=team_id,
             author_id=curr_member,
@@ -82,11 +122,13 @@ def _import_data(nt_client: nt.ApiClient, monday_client, team_id: str, nt_auth_t
             extra="",
         )
         nt_project = (
-            exists("projects", name, imported) or projects_api.post_project(project_model) or {}
+            exists("projects", name, imported)
+            or post_idempotent(projects_api.post_project, project_model)
+            or {}
         )
         if not (nt_project_id := nt_project and str(nt_project.id)):
             return
-        add_to_project_group(nt_client, team_id, nt_project_id, IMPORT_NAME)
+        group.add(nt_project_id)
 
         _import_project_sections(
             nt_client,
@@ -97,6 +139,7 @@ def _import_data(nt_client: nt.ApiClient, monday_client, team_id: str, nt_auth_t
             team_id,
             nt_auth_token,
             imported=imported,
+            progress=progress,
         )
 
     monday_projects = monday_client.projects()
@@ -111,10 +154,16 @@ def _import_data(nt_client: nt.ApiClient, monday_client, team_id: str, nt_auth_t
         len(monday_projects_open) + nt_open_projects_len(nt_client, team_id),
     )
 
-    for project in monday_projects:
-        if project.get("state") in ("archived", "deleted"):
-            continue
-        _import_project(project, curr_member)
+    monday_projects = [
+        elt for elt in monday_projects if elt.get("state") not in ("archived", "deleted")
+    ]
+    progress.plan("projects", len(monday_projects))
+    with coalesce(nt_client):
+        for project in monday_projects:
+            cancel_token.check()
+            _import_project(project, curr_member)
+            flush(nt_client)
+            progress.advance("projects")
 
 
 # pylint: disable=too-many-arguments
@@ -127,8 +176,10 @@ def _import_project_sections(
     team_id: str,
     nt_auth_token: str,
     imported=None,
+    progress=None,
 ):
     """Import monday lists as project sections"""
+    progress = progress or Progress()
     nt_api_sections = api.ProjectSectionsApi(nt_client)
     imported = imported or {}
 
@@ -139,7 +190,8 @@ def _import_project_sections(
         "project_sections",
         len(monday_sections := monday_client.sections(project.get("id"))),
     )
-    sections_mapping = {}
+    sections_mapping = IdMap()
+    progress.plan("sections", len(monday_sections))
     for section in monday_sections:
         try:
             if nt_section := exists(
@@ -157,6 +209,7 @@ def _import_project_sections(
                 sections_mapping[section.get("id")] = str(nt_section.id)
         except OpenApiException:
             pass
+        progress.advance("sections")
     _import_tasks(
         nt_client,
         monday_client,
@@ -165,6 +218,7 @@ def _import_project_sections(
         nt_project_id,
         curr_member,
         imported=imported,
+        progress=progress,
     )
 
 
@@ -176,12 +230,15 @@ def _import_tasks(
     nt_project_id,
     author_id,
     imported=None,
+    progress=None,
 ):
     """Import tasks"""
+    progress = progress or Progress()
     nt_api_tasks = api.TasksApi(nt_client)
     monday_users = monday_client.users()
     nt_members = match_nt_users(nt_client, monday_users.values())
-    for task in monday_client.tasks(m_project_id):
+    progress.plan("tasks", len(monday_tasks := list(monday_client.tasks(m_project_id))))
+    for task in monday_tasks:
         responsible_id = None
         if task.get("assigned"):
             for resp in task.get("assigned") or []:
@@ -191,8 +248,10 @@ def _import_tasks(
 
         if nt_task := exists(
             "tasks", name := trim(task.get("name", "")), imported
-        ) or nt_api_tasks.post_task(
+        ) or post_idempotent(
+            nt_api_tasks.post_task,
             models.Task(
+                id=stable_id(nt_project_id, task.get("id")),
                 is_followed=False,
                 is_abandoned=False,
                 missed_repeats=0,
@@ -207,7 +266,7 @@ def _import_tasks(
                 due_at=task.get("due_at"),
                 is_all_day=task.get("is_all_day"),
                 responsible_id=responsible_id if task.get("due_at") else None,
-            )
+            ),
         ):
             if task.get("due_at") and not responsible_id:
                 set_unassigned_tag(nt_client, str(nt_task.id))
@@ -218,25 +277,35 @@ def _import_tasks(
                 task.get("id"),
                 imported=imported,
                 author_id=author_id,
+                progress=progress,
             )
+        progress.advance("tasks")
 
 
 # pylint: enable=too-many-arguments
 
 
 def _import_comments(
-    nt_client, monday_client, nt_task_id: str, tr_task_id: str, imported=None, author_id=None
+    nt_client,
+    monday_client,
+    nt_task_id: str,
+    tr_task_id: str,
+    imported=None,
+    author_id=None,
+    progress=None,
 ):
     """Import task-related comments"""
+    progress = progress or Progress()
     nt_api_comments = api.CommentsApi(nt_client)
     author_id = author_id or id16()
-    for comment in sorted(
-        monday_client.comments(tr_task_id),
-        key=lambda elt: isoparse(elt.get("created_at")).timestamp(),
-    ):
+    comments = monday_client.comments(tr_task_id)
+    progress.plan("comments", len(comments))
+    for comment in sorted(comments, key=lambda elt: isoparse(elt.get("created_at")).timestamp()):
         if not exists("comments", body := format_body(comment.get("text_body") or "…"), imported):
-            nt_api_comments.post_comment(
+            post(
+                nt_api_comments.post_comment,
                 models.Comment(
+                    id=stable_id(nt_task_id, comment.get("id"), comment.get("created_at"), body),
                     is_pinned=False,
                     is_team=False,
                     body=body,
@@ -244,8 +313,10 @@ def _import_comments(
                     created_at=1,
                     author_id=author_id,
                     extra="",
-                )
+                ),
+                key=nt_task_id,
             )
+        progress.advance("comments")
 
 
 def format_body(body) -> str:
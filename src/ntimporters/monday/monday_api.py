@@ -3,24 +3,90 @@
 import json
 
 import requests
-from ntimporters.utils import parse_timestamp
+from ntimporters.client_pool import default_pool
+from ntimporters.concurrency import limit
+from ntimporters.http_cache import CachedSession, default_cache
+from ntimporters.json_codec import default_codec
+from ntimporters.singleflight import SingleFlight
+from ntimporters.telemetry import Metrics, body_size
+from ntimporters.utils import parse_timestamp, source_api_host
 
 
 class MondayClient:
-    """Client to connect to Monday API"""
+    """Client to connect to Monday API
+
+    api_path - Monday API URL, MONDAY_API_HOST environment variable or the real API by default
+    json_codec - JSON codec of queries and responses (see ntimporters.json_codec)
+    session - requests.Session-like client, shared one of the host by default
+        (see ntimporters.client_pool)
+    singleflight - coalescing of concurrent identical reads (see ntimporters.singleflight)
+    cache - on-disk cache of reads (see ntimporters.http_cache), of NTIMPORTERS_HTTP_CACHE
+        file by default, none if not set
+    """
 
-    api_path = "https://api.monday.com/v2"
     limit = 300
 
-    def __init__(self, app_key):
-        self.headers = {"Authorization": app_key}
+    def __init__(
+        self,
+        app_key,
+        metrics: Metrics | None = None,
+        cancel_token=None,
+        limiter=None,
+        api_path: str | None = None,
+        json_codec=None,
+        session=None,
+        singleflight=None,
+        cache=None,
+    ):
+        self.api_path = (api_path or source_api_host("monday")).rstrip("/")
+        self.singleflight = singleflight or SingleFlight()
+        self.session = session or default_pool().session(self.api_path)
+        if (cache := cache or default_cache()) is not None:
+            self.session = CachedSession(self.session, cache)
+        self.headers = {"Authorization": app_key, "Content-Type": "application/json"}
+        self.json_codec = json_codec or default_codec()
+        self.metrics = metrics
+        self.cancel_token = cancel_token
+        self.limiter = limiter
+
+    def _get(self, query: str) -> requests.Response:
+        """Perform GraphQL query"""
+        body = self.json_codec.dumps({"query": f"{{ {query} }}"})
+        timeout = None
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+            timeout = self.cancel_token.timeout()
+        if self.metrics is None:
+            with limit(self.limiter, "monday", self.cancel_token) as outcome:
+                resp = self.session.get(
+                    self.api_path, data=body, headers=self.headers, timeout=timeout
+                )
+                outcome.status = resp.status_code
+                return resp
+        with (
+            self.metrics.track(
+                "monday", "GET", self.api_path, bytes_out=body_size(body)
+            ) as tracked,
+            limit(self.limiter, "monday", self.cancel_token) as outcome,
+        ):
+            resp = self.session.get(
+                self.api_path, data=body, headers=self.headers, timeout=timeout
+            )
+            tracked["status"] = outcome.status = resp.status_code
+            tracked["bytes_in"] = len(resp.content)
+            return resp
+
+    def _read(self, query: str) -> requests.Response:
+        """Perform GraphQL query and read its body"""
+        resp = self._get(query)
+        _ = resp.content
+        return resp
 
     def _req(self, query) -> dict:
-        if resp := requests.get(
-            self.api_path, json={"query": f"{{ {query} }}"}, headers=self.headers
-        ):
+        # concurrent identical queries share one response
+        if resp := self.singleflight.do(query, self._read, query):
             if resp.status_code == 200:
-                return resp.json()
+                return self.json_codec.loads(resp.content)
 
         return {}
 
@@ -83,7 +149,8 @@ class MondayClient:
             assigned = []
             for col in task.get("column_values"):
                 if col and col.get("type") == "multiple-person" and col.get("value"):
-                    assigned = json.loads(col.get("value", "{}")).get("personsAndTeams") or []
+                    value = self.json_codec.loads(col.get("value", "{}"))
+                    assigned = value.get("personsAndTeams") or []
                     break
             task["is_all_day"] = False
             task, counter, due_at = self._convert_columns(task)
@@ -106,7 +173,7 @@ class MondayClient:
         """Get Monday subitems (NT tasks)"""
         query = f"""items(ids:{item_id} limit:1)
             {{ group {{id position}}
-                subitems{{ name column_values {{ value type text }} }} }}
+                subitems{{ id name column_values {{ value type text }} }} }}
         """
         # ASSUMPTION: if only one date-type column then it is due_at
         tasks = []
@@ -0,0 +1,8 @@
+""" Monday importer description, importable without source SDK """
+
+SPEC = {
+    "code": "monday",  # codename / ID of importer
+    "name": "Monday",  # name of application
+    "url": "https://nozbe.help/advancedfeatures/importers/#monday",
+    "input_fields": ("team_id", "nt_auth_token", "app_key"),
+}
@@ -0,0 +1,87 @@
+""" Lazy pagination over Nozbe list endpoints """
+
+import inspect
+import typing
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000  # max `limit` accepted by Nozbe API
+
+
+def stream(list_method: Callable, records: bool = False, **kwargs) -> Iterator:
+    """Iterate over objects of one request of openapi_client `get_*` list method as they arrive
+
+    list_method - e.g. `api.ProjectsApi(nt_client).get_projects`
+    records - yield JSON records (dicts) instead of models
+    kwargs - parameters of list_method, e.g. `limit`
+
+    The response is parsed while it is read, so memory is bounded by one object
+    instead of the whole page. The connection is busy until the iterator is
+    exhausted or closed.
+    """
+    api_instance = list_method.__self__
+    serialize = getattr(api_instance, f"_{list_method.__name__}_serialize")
+    params = dict.fromkeys(inspect.signature(serialize).parameters) | {"_host_index": 0}
+    response = api_instance.api_client.call_api(
+        *serialize(**params | kwargs), _preload_content=False
+    )
+    # list methods return List[Model]
+    (item_type,) = typing.get_args(inspect.signature(list_method).return_annotation)
+    return api_instance.api_client.response_deserialize_stream(
+        response, None if records else item_type
+    )
+
+
+def paginate(
+    list_method: Callable,
+    page_size: int = PAGE_SIZE,
+    prefetch: bool = False,
+    sort_by: str | None = None,
+    streamed: bool = False,
+    **kwargs,
+) -> Iterator:
+    """Iterate lazily over all objects returned by openapi_client `get_*` list method
+
+    list_method - e.g. `api.TasksApi(nt_client).get_tasks`
+    page_size - number of objects fetched per request (`limit`)
+    prefetch - fetch next page in background while current one is consumed
+    sort_by - passed to the endpoint, use it to get stable order across pages
+    streamed - parse pages while they are read (see stream), instead of prefetch
+    kwargs - filters passed to list_method as is
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    if sort_by:
+        kwargs["sort_by"] = sort_by
+
+    def _page(offset: int) -> list:
+        return list_method(limit=page_size, offset=offset, **kwargs) or []
+
+    if streamed:
+        offset = 0
+        while True:
+            count = 0
+            for count, elt in enumerate(
+                stream(list_method, limit=page_size, offset=offset, **kwargs), 1
+            ):
+                yield elt
+            if count < page_size:
+                return
+            offset += page_size
+
+    if not prefetch:
+        offset = 0
+        while True:
+            page = _page(offset)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        offset, next_page = 0, executor.submit(_page, 0)
+        while next_page:
+            page = next_page.result()
+            offset += page_size
+            next_page = executor.submit(_page, offset) if len(page) >= page_size else None
+            yield from page
@@ -0,0 +1,136 @@
+""" Import progress events with throughput and ETA """
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
+
+from ntimporters.cancellation import ImportCancelled
+from ntimporters.telemetry import Metrics
+
+# imported entities, in order of nesting
+KINDS = ("projects", "sections", "tasks", "comments")
+
+
+class Progress:
+    """Planned vs. done counts of an import, reported as events to a sink
+
+    sink - callable receiving event dicts or a queue-like object (with `put`)
+    metrics - telemetry of the same import, used to report transferred bytes
+    interval - minimal number of seconds between two progress events
+
+    Planned counts grow as an importer fetches source data (projects first,
+    then sections and tasks of each project), so the ETA is based on done
+    projects refined with done tasks of the project being imported.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[dict], Any] | None = None,
+        metrics: Metrics | None = None,
+        interval: float = 1.0,
+    ):
+        self.sink = sink
+        self.metrics = metrics
+        self.interval = interval
+        self.planned: Counter = Counter()
+        self.done: Counter = Counter()
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._emitted_at = 0.0
+        # tasks of the project being imported
+        self._project_tasks = Counter()
+
+    def plan(self, kind: str, count: int):
+        """Add entities to be imported"""
+        with self._lock:
+            self.planned[kind] += count
+            if kind == "tasks":
+                self._project_tasks["planned"] += count
+        self._emit("progress")
+
+    def advance(self, kind: str, count: int = 1):
+        """Mark entities as imported (or skipped)"""
+        with self._lock:
+            self.done[kind] += count
+            if kind == "tasks":
+                self._project_tasks["done"] += count
+            elif kind == "projects":
+                self._project_tasks.clear()
+        self._emit("progress")
+
+    def fraction(self) -> float:
+        """Estimated part of import done"""
+        if not (projects := self.planned["projects"]):
+            return 0.0
+        current = 0.0
+        if planned_tasks := self._project_tasks["planned"]:
+            current = min(1.0, self._project_tasks["done"] / planned_tasks)
+        return min(1.0, (self.done["projects"] + current) / projects)
+
+    def bytes(self) -> int:
+        """Bytes sent and received so far"""
+        if self.metrics is None:
+            return 0
+        return sum(self.metrics.bytes_in.values()) + sum(self.metrics.bytes_out.values())
+
+    def snapshot(self, event: str = "progress") -> dict:
+        """Return progress event"""
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            fraction = self.fraction()
+            done = dict(self.done)
+            planned = dict(self.planned)
+        transferred = self.bytes()
+        return {
+            "event": event,
+            "planned": {kind: planned.get(kind, 0) for kind in KINDS},
+            "done": {kind: done.get(kind, 0) for kind in KINDS},
+            "bytes": transferred,
+            "elapsed": round(elapsed, 3),
+            "fraction": round(fraction, 4),
+            "throughput": {
+                "entities_per_second": round(sum(done.values()) / elapsed, 2) if elapsed else 0.0,
+                "bytes_per_second": round(transferred / elapsed, 2) if elapsed else 0.0,
+            },
+            "eta": round(elapsed * (1 - fraction) / fraction, 1) if fraction else None,
+        }
+
+    def finish(self, error=None) -> dict:
+        """Report the end of import and return the final event
+
+        The event is also attached to ImportCancelled as its partial-progress summary.
+        """
+        if isinstance(error, ImportCancelled):
+            event = "cancelled"
+        else:
+            event = "error" if error else "finished"
+        snapshot = self.snapshot(event)
+        if event == "finished":
+            snapshot |= {"fraction": 1.0, "eta": 0.0}
+        if error is not None:
+            snapshot["error"] = str(error)
+        if isinstance(error, ImportCancelled):
+            error.summary = snapshot
+        self._send(snapshot)
+        return snapshot
+
+    def _emit(self, event: str):
+        """Send event to the sink, at most once per interval"""
+        if self.sink is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._emitted_at < self.interval:
+                return
+            self._emitted_at = now
+        self._send(self.snapshot(event))
+
+    def _send(self, snapshot: dict):
+        if self.sink is None:
+            return
+        if put := getattr(self.sink, "put", None):
+            put(snapshot)
+        else:
+            self.sink(snapshot)
@@ -0,0 +1,77 @@
+""" Project group gathering projects of an import """
+
+import functools
+
+from ntimporters.cancellation import ImportCancelled
+from ntimporters.coalescing import post
+from ntimporters.pagination import paginate
+from ntimporters.utils import get_group_id, post_idempotent, stable_id
+from openapi_client import api, models
+
+
+class ImportGroup:
+    """Project group of an import, e.g. "Imported from Trello"
+
+    The group is looked up (and created if missing) and its assignments are
+    fetched once per import, so assigning a project takes a single request,
+    sent with the write coalescer of nt_client if any.
+    """
+
+    def __init__(self, nt_client, team_id: str, name: str):
+        self.nt_client = nt_client
+        self.team_id = team_id
+        self.name = name
+        self._created = False
+
+    @functools.cached_property
+    def id(self) -> str | None:
+        """Group id, the group is created if missing"""
+        if group_id := get_group_id(self.nt_client, self.team_id, self.name):
+            return group_id
+        group = post_idempotent(
+            api.ProjectGroupsApi(self.nt_client).post_project_group,
+            models.ProjectGroup(
+                id=stable_id(self.team_id, "project_group", self.name),
+                name=self.name,
+                team_id=self.team_id,
+                is_private=True,
+            ),
+        )
+        self._created = True
+        return str(group.id) if group else None
+
+    @functools.cached_property
+    def assigned(self) -> set[str]:
+        """Ids of projects in the group"""
+        if not self.id or self._created:
+            return set()
+        return {
+            str(elt.object_id)
+            for elt in paginate(
+                api.GroupAssignmentsApi(self.nt_client).get_group_assignments,
+                group_id=self.id,
+                group_type="project",
+            )
+        }
+
+    def add(self, project_id: str):
+        """Assign project to the group, errors are printed, cancellation is raised"""
+        # assignment is a side step of the import, it must not fail the import
+        try:
+            if not self.id or (project_id := str(project_id)) in self.assigned:
+                return
+            post(
+                api.GroupAssignmentsApi(self.nt_client).post_group_assignment,
+                models.GroupAssignment(
+                    id=stable_id(self.id, project_id),
+                    object_id=project_id,
+                    group_id=self.id,
+                    group_type="project",
+                ),
+                on_error=print,
+            )
+            self.assigned.add(project_id)
+        except ImportCancelled:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            print(exc)
@@ -6,14 +6,29 @@ from time import sleep
 class RLProxy:
     """Proxy class with rate limiting"""
 
-    def __init__(self, proxied_object, window=15 * 60, num_requests=450, prefix="get_"):
-        """Window - timeframe in seconds , num_requests = max number of wrapped_method calls"""
+    def __init__(
+        self,
+        proxied_object,
+        window=15 * 60,
+        num_requests=450,
+        prefix="get_",
+        metrics=None,
+        service="api",
+        cancel_token=None,
+    ):
+        """Window - timeframe in seconds , num_requests = max number of wrapped_method calls
+        metrics - optional ntimporters.telemetry.Metrics, sleeps are recorded as `service`
+        cancel_token - optional ntimporters.cancellation.CancelToken checked before every call
+        and interrupting sleeps"""
         now = datetime.datetime.now()
 
         self.__proxied = proxied_object
         self._max_rate = num_requests
         self._window = window
         self._prefix = prefix
+        self._metrics = metrics
+        self._service = service
+        self._cancel_token = cancel_token
 
         self.num_requests = 0
         self.next_reset_at = now + datetime.timedelta(seconds=self._window)
@@ -21,6 +36,8 @@ class RLProxy:
     def __getattr__(self, attr):
         def wrapped_method(*args, **kwargs):
             """Wrapped method with rate limiting"""
+            if self._cancel_token is not None:
+                self._cancel_token.check()
             if self._prefix is None or attr.startswith(self._prefix):
                 # apply rl only to class.get_* methods (as in Todoist SDK)
                 self.check_rl()
@@ -41,7 +58,12 @@ class RLProxy:
             self.reset()
         if self.num_requests >= self._max_rate:
             time_to_sleep = (self.next_reset_at - now).seconds
-            sleep(time_to_sleep + 0.1)
+            if self._metrics is not None:
+                self._metrics.record_sleep(self._service, time_to_sleep + 0.1)
+            if self._cancel_token is not None:
+                self._cancel_token.sleep(time_to_sleep + 0.1)
+            else:
+                sleep(time_to_sleep + 0.1)
             self.reset()
         self.num_requests += 1
 
@@ -0,0 +1,24 @@
+""" Registry of importers, their modules (and source SDKs) are loaded on first import run """
+
+import importlib
+from collections.abc import Callable
+
+IMPORTERS = ("asana", "monday", "todoist", "trello")
+
+
+def spec(code: str) -> dict:
+    """Return SPEC of importer without loading the importer"""
+    if code not in IMPORTERS:
+        raise ValueError(f"Unknown importer {code!r}")
+    return importlib.import_module(f"ntimporters.{code}.spec").SPEC
+
+
+def specs() -> dict[str, dict]:
+    """Return importer code -> SPEC of all importers"""
+    return {code: spec(code) for code in IMPORTERS}
+
+
+def run_import(code: str) -> Callable:
+    """Return run_import of importer, loading it with its dependencies"""
+    spec(code)
+    return importlib.import_module(f"ntimporters.{code}.importer").run_import
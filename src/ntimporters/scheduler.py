@@ -0,0 +1,195 @@
+""" Multi-tenant import scheduler with fair sharing across teams """
+
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+from ntimporters import registry
+from ntimporters.cancellation import CancelToken
+from ntimporters.concurrency import RequestLimiter
+from ntimporters.telemetry import Metrics
+from ntimporters.utils import id16
+
+
+@dataclass(eq=False)
+class ImportJob:
+    """Import scheduled to run `run_import` of given importer
+
+    importer - importer code, e.g. "trello"
+    kwargs - arguments of run_import (credentials, team_id)
+    priority - jobs with higher priority start first
+    timeout - seconds the import may run, counted from its start
+    progress - callable or queue receiving progress events
+    """
+
+    importer: str
+    kwargs: dict
+    priority: int = 0
+    timeout: float | None = None
+    progress: Any = None
+    id: str = field(default_factory=id16)
+    metrics: Metrics = field(default_factory=Metrics, repr=False)
+    cancel_token: CancelToken = field(default_factory=CancelToken, repr=False)
+    future: Future = field(default_factory=Future, repr=False)
+
+    @property
+    def team_id(self) -> str:
+        return str(self.kwargs.get("team_id"))
+
+    def cancel(self) -> bool:
+        """Drop pending job or request cancellation of the running one"""
+        if self.future.cancel():
+            return True
+        self.cancel_token.cancel()
+        return not self.future.done()
+
+    def result(self, timeout: float | None = None):
+        """Wait for run_import result (None, error message or exception)"""
+        return self.future.result(timeout)
+
+
+class Scheduler:
+    """Run imports of many teams in one process
+
+    workers - number of imports running at the same time
+    per_team - max number of running imports of a single team
+    limits - max concurrent requests per service (nozbe, trello, monday, asana, todoist)
+        shared by all imports, `default_limit` applies to services missing in limits
+    adaptive - limits adapt to responses of each service (up to configured limits),
+        see ntimporters.concurrency.AdaptiveLimit
+
+    The next job is the one with the highest priority; among equal priorities
+    teams with fewer running imports and then teams served least recently go
+    first, so a team with many (or huge) imports does not starve the others.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        per_team: int = 1,
+        limits: dict[str, int] | None = None,
+        default_limit: int | None = None,
+        adaptive: bool = False,
+    ):
+        self.per_team = per_team
+        self.limiter = RequestLimiter(limits, default_limit, adaptive=adaptive)
+        self._cond = threading.Condition()
+        self._pending: dict[str, list] = defaultdict(list)  # team -> heap of jobs
+        self._running: Counter = Counter()
+        self._served: dict[str, int] = {}
+        self._seq = itertools.count()
+        self._jobs: dict[str, ImportJob] = {}
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"ntimporters-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        importer: str,
+        priority: int = 0,
+        timeout: float | None = None,
+        progress=None,
+        **kwargs,
+    ) -> ImportJob:
+        """Queue import, kwargs are passed to run_import of the importer"""
+        # fail early for unknown importers, importer itself is loaded when the job runs
+        registry.spec(importer)
+        job = ImportJob(importer, kwargs, priority=priority, timeout=timeout, progress=progress)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            heapq.heappush(self._pending[job.team_id], (-priority, next(self._seq), job))
+            self._jobs[job.id] = job
+            self._cond.notify()
+        return job
+
+    def job(self, job_id: str) -> ImportJob | None:
+        """Get job by id"""
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        """Return pending and running jobs per team"""
+        with self._cond:
+            return {
+                "pending": {team: len(heap) for team, heap in self._pending.items() if heap},
+                "running": {team: count for team, count in self._running.items() if count},
+                "limits": {
+                    service: self.limiter.current(service)
+                    for service in ("nozbe", "trello", "monday", "asana", "todoist")
+                },
+            }
+
+    def _next_job(self) -> ImportJob | None:
+        """Pop the next job to run, must be called with the lock held"""
+        candidates = [
+            (heap[0][0], self._running[team], self._served.get(team, -1), heap[0][1], team)
+            for team, heap in self._pending.items()
+            if heap and self._running[team] < self.per_team
+        ]
+        if not candidates:
+            return None
+        team = min(candidates)[-1]
+        *_, job = heapq.heappop(self._pending[team])
+        self._running[team] += 1
+        self._served[team] = next(self._seq)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while (job := self._next_job()) is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    # as in concurrent.futures workers, any error of the import
+                    # belongs to its future and must not stop the worker
+                    try:
+                        job.future.set_result(self._run(job))
+                    except BaseException as exc:  # noqa: BLE001
+                        job.future.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._running[job.team_id] -= 1
+                    self._jobs.pop(job.id, None)
+                    self._cond.notify_all()
+
+    def _run(self, job: ImportJob):
+        """Run import of the job"""
+        if job.timeout is not None:
+            job.cancel_token.deadline = time.monotonic() + job.timeout
+        return registry.run_import(job.importer)(
+            **job.kwargs,
+            metrics=job.metrics,
+            progress=job.progress,
+            cancel_token=job.cancel_token,
+            limiter=self.limiter,
+        )
+
+    def shutdown(self, wait: bool = True, cancel: bool = False):
+        """Stop accepting jobs, cancel pending and running ones if `cancel`"""
+        with self._cond:
+            self._closed = True
+            if cancel:
+                for job in list(self._jobs.values()):
+                    job.cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.shutdown()
@@ -0,0 +1,62 @@
+""" Singleflight: concurrent identical reads share one call and its result """
+
+import functools
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Calls of the same key made while one is running wait for it and get its result
+
+    Only calls overlapping in time are shared, nothing is cached: a call
+    started after the running one finished makes a call of its own. An
+    exception of the call is raised in every caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self.calls = self.shared = 0
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs):
+        """Return func(*args, **kwargs), or result of the running call of key"""
+        with self._lock:
+            if running := (future := self._calls.get(key)) is not None:
+                self.shared += 1
+            else:
+                self.calls += 1
+                future = self._calls[key] = Future()
+        if running:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+        future.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        """Numbers of calls made and of calls which shared a running one"""
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared}
+
+
+def shared(func: Callable) -> Callable:
+    """Decorator: concurrent calls of func with equal (hashable) arguments share one call
+
+    Put it below functools.cache, so that concurrent misses of the cache
+    make one call, e.g. of a member looked up by many threads at once.
+    """
+    group = SingleFlight()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return group.do((args, tuple(sorted(kwargs.items()))), func, *args, **kwargs)
+
+    wrapper.singleflight = group
+    return wrapper
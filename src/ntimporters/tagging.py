@@ -0,0 +1,82 @@
+""" Tags assigned by importers to many tasks """
+
+import functools
+import weakref
+
+from ntimporters.cancellation import ImportCancelled
+from ntimporters.coalescing import post
+from ntimporters.utils import id16, map_color
+from openapi_client import api, models
+
+UNASSIGNED_TAG = "missing responsibility"
+
+
+class TaskTag:
+    """Tag assigned to many tasks of an import, e.g. "missing responsibility"
+
+    The tag is looked up (and created if missing) once. Whether a task already
+    has the tag is asked for that task only, and not at all when the tag was
+    just created, so tagging a task takes at most a read and a write, sent
+    with the write coalescer of nt_client if any.
+    """
+
+    def __init__(self, nt_client, name: str, color: str | None = None):
+        self.nt_client = nt_client
+        self.name = name
+        self.color = color
+        self._created = False
+        # ids of tasks tagged or found tagged during the import
+        self.assigned: set[str] = set()
+
+    @functools.cached_property
+    def id(self) -> str | None:
+        """Tag id, the tag is created if missing"""
+        tags_api = api.TagsApi(self.nt_client)
+        if (found := tags_api.get_tags(limit=1, name=self.name)) and found[0]:
+            return str(found[0].id)
+        tag = tags_api.post_tag(
+            models.Tag(id=id16(), name=self.name, team_id=None, color=map_color(self.color))
+        )
+        self._created = True
+        return str(tag.id) if tag else None
+
+    def has(self, task_id: str) -> bool:
+        """Check if task has the tag"""
+        if task_id in self.assigned:
+            return True
+        if not self.id or self._created:
+            return False
+        if api.TagAssignmentsApi(self.nt_client).get_tag_assignments(
+            tag_id=self.id, task_id=task_id, limit=1
+        ):
+            self.assigned.add(task_id)
+            return True
+        return False
+
+    def add(self, task_id: str):
+        """Assign tag to task, errors are printed, cancellation is raised"""
+        # tagging is a side step of the import, it must not fail the import
+        try:
+            if not self.id or self.has(task_id := str(task_id)):
+                return
+            post(
+                api.TagAssignmentsApi(self.nt_client).post_tag_assignment,
+                models.TagAssignment(id=id16(), tag_id=self.id, task_id=task_id),
+                on_error=print,
+            )
+            self.assigned.add(task_id)
+        except ImportCancelled:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            print(exc)
+
+
+# import-scoped: one per Nozbe client
+_unassigned: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def set_unassigned_tag(nt_client, task_id: str):
+    """set 'missing responsibility' tag"""
+    if (tag := _unassigned.get(nt_client)) is None:
+        tag = _unassigned[nt_client] = TaskTag(nt_client, UNASSIGNED_TAG)
+    tag.add(task_id)
@@ -0,0 +1,268 @@
+""" Import telemetry: request counters, latency histograms and phase timings """
+
+import functools
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit
+
+import requests
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+NOZBE = "nozbe"
+# path segments looking like object IDs: Nozbe (16 chars), Trello (24 hex), numeric
+ID_SEGMENT = re.compile(r"^(?:[a-zA-Z0-9]{16}|[0-9a-f]{24}|\d{3,})$")
+
+
+def body_size(body) -> int:
+    """Bytes of request body sent (str bodies are sent UTF-8 encoded), 0 for streams"""
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return len(body) if isinstance(body, bytes) else 0
+
+
+def endpoint(url: str) -> str:
+    """Return URL path with object IDs replaced by {id}"""
+    return "/".join(
+        "{id}" if ID_SEGMENT.match(segment) else segment
+        for segment in urlsplit(url).path.split("/")
+    )
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets"""
+
+    __slots__ = ("buckets", "count", "counts", "total")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        """Add observation"""
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> dict:
+        """Return JSON-serializable representation"""
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class Metrics:
+    """Thread-safe metrics of a single import
+
+    Requests are labelled with `service` (nozbe, trello, monday, asana, todoist),
+    HTTP method, endpoint (see `endpoint`) and response status.
+    Phases are timed with `phase`; time spent in requests is additionally split into
+    fetch (source API), read (Nozbe GET) and write (other Nozbe calls) and the rest
+    of `import` phase is reported as map.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.latency: dict[tuple, Histogram] = defaultdict(Histogram)
+        self.request_seconds: Counter = Counter()
+        self.retries: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self.sleep_seconds: Counter = Counter()
+        self.bytes_in: Counter = Counter()
+        self.bytes_out: Counter = Counter()
+        self.phases: Counter = Counter()
+
+    def record_request(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        status: int,
+        seconds: float,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+    ):
+        """Record finished request"""
+        key = (service, method.upper(), endpoint(url))
+        with self._lock:
+            self.requests[(*key, int(status))] += 1
+            self.latency[key].observe(seconds)
+            self.request_seconds[_request_phase(service, method)] += seconds
+            self.bytes_in[service] += bytes_in or 0
+            self.bytes_out[service] += bytes_out or 0
+            if status == 429:
+                self.rate_limited[service] += 1
+
+    def record_retry(self, service: str):
+        """Record retried request"""
+        with self._lock:
+            self.retries[service] += 1
+
+    def record_sleep(self, service: str, seconds: float):
+        """Record time spent waiting because of rate limits"""
+        with self._lock:
+            self.sleep_seconds[service] += seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measure time spent in given phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] += time.perf_counter() - start
+
+    @contextmanager
+    def track(self, service: str, method: str, url: str, bytes_out: int = 0):
+        """Measure a request, set `status` and `bytes_in` keys of yielded dict"""
+        result = {"status": 0, "bytes_in": 0}
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            self.record_request(
+                service,
+                method,
+                url,
+                result["status"],
+                time.perf_counter() - start,
+                bytes_in=result["bytes_in"],
+                bytes_out=bytes_out,
+            )
+
+    def phase_timings(self) -> dict[str, float]:
+        """Return phase timings, including request-based split of import phase"""
+        with self._lock:
+            phases = dict(self.phases) | dict(self.request_seconds)
+            if "import" in phases:
+                phases["map"] = max(
+                    0.0, phases["import"] - sum(self.request_seconds.values())
+                )
+        return {name: round(seconds, 6) for name, seconds in phases.items()}
+
+    def to_json(self) -> dict:
+        """Return metrics as JSON-serializable dict"""
+        with self._lock:
+            data = {
+                "requests": [
+                    {"service": s, "method": m, "endpoint": e, "status": st, "count": count}
+                    for (s, m, e, st), count in sorted(self.requests.items())
+                ],
+                "latency": [
+                    {"service": s, "method": m, "endpoint": e} | histogram.to_dict()
+                    for (s, m, e), histogram in sorted(self.latency.items())
+                ],
+                "retries": dict(self.retries),
+                "rate_limited": dict(self.rate_limited),
+                "sleep_seconds": dict(self.sleep_seconds),
+                "bytes_in": dict(self.bytes_in),
+                "bytes_out": dict(self.bytes_out),
+            }
+        return data | {"phases": self.phase_timings()}
+
+    def dumps(self) -> str:
+        """Return metrics as JSON string"""
+        return json.dumps(self.to_json())
+
+    def to_prometheus(self, prefix: str = "ntimporters") -> str:
+        """Return metrics in Prometheus text exposition format"""
+        data, lines = self.to_json(), []
+        request_labels = ("service", "method", "endpoint")
+
+        lines.append(f"# TYPE {prefix}_requests_total counter")
+        for elt in data["requests"]:
+            labels = _labels(elt, (*request_labels, "status"))
+            lines.append(f"{prefix}_requests_total{{{labels}}} {elt['count']}")
+
+        lines.append(f"# TYPE {prefix}_request_duration_seconds histogram")
+        for elt in data["latency"]:
+            labels = _labels(elt, request_labels)
+            for bound, count in (*elt["buckets"].items(), ("+Inf", elt["count"])):
+                lines.append(
+                    f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {elt['sum']}")
+            lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {elt['count']}")
+
+        for name in ("retries", "rate_limited", "sleep_seconds", "bytes_in", "bytes_out"):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for service, value in data[name].items():
+                lines.append(f'{prefix}_{name}_total{{service="{service}"}} {value}')
+
+        lines.append(f"# TYPE {prefix}_phase_seconds gauge")
+        for name, value in data["phases"].items():
+            lines.append(f'{prefix}_phase_seconds{{phase="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _labels(sample: dict, names: tuple) -> str:
+    """Format Prometheus labels"""
+    return ",".join(f'{name}="{_escape(sample[name])}"' for name in names)
+
+
+def phase(metrics: "Metrics | None", name: str):
+    """Measure phase if metrics are collected"""
+    return nullcontext() if metrics is None else metrics.phase(name)
+
+
+def _escape(value) -> str:
+    """Escape Prometheus label value"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _request_phase(service: str, method: str) -> str:
+    """Map request onto import phase"""
+    if service != NOZBE:
+        return "fetch"
+    return "read" if method.upper() in ("GET", "HEAD") else "write"
+
+
+def instrument_asana(asana_client, metrics: "Metrics | None"):
+    """Record requests made by asana.ApiClient"""
+    if metrics is None:
+        return asana_client
+    request = asana_client.request
+
+    @functools.wraps(request)
+    def _request(method, url, *args, **kwargs):
+        with metrics.track("asana", method, url) as tracked:
+            response = request(method, url, *args, **kwargs)
+            tracked["status"] = getattr(response, "status", 0)
+            tracked["bytes_in"] = len(getattr(response, "data", b"") or b"")
+            return response
+
+    asana_client.request = _request
+    return asana_client
+
+
+def instrumented_session(metrics: "Metrics | None", service: str) -> requests.Session:
+    """Return requests session reporting its requests to metrics"""
+    session = requests.Session()
+    if metrics is None:
+        return session
+
+    def _record(response: requests.Response, *_args, **_kwargs):
+        request = response.request
+        metrics.record_request(
+            service,
+            request.method or "GET",
+            request.url or "",
+            response.status_code,
+            response.elapsed.total_seconds(),
+            bytes_in=int(response.headers.get("Content-Length") or 0),
+            bytes_out=body_size(request.body),
+        )
+
+    session.hooks["response"].append(_record)
+    return session
@@ -2,25 +2,38 @@
 
 import functools
 from dataclasses import dataclass
-from typing import Optional
 
 import openapi_client as nt
 from dateutil.parser import isoparse
+from ntimporters.cancellation import CancelToken, ImportCancelled
+from ntimporters.coalescing import coalesce, flush, post
+from ntimporters.concurrency import RequestLimiter, limit_session
+from ntimporters.dry_run import DryRun
+from ntimporters.progress import Progress
+from ntimporters.project_group import ImportGroup
+from ntimporters.todoist.spec import SPEC
+from ntimporters.tagging import set_unassigned_tag
 from ntimporters.rate_limiting import RLProxy
+from ntimporters.singleflight import shared
+from ntimporters.telemetry import Metrics, instrumented_session, phase
+from ntimporters.id_map import IdMap
+from ntimporters.pagination import paginate
 from ntimporters.utils import (
-    add_to_project_group,
     check_limits,
-    API_HOST,
     get_imported_entities,
     current_nt_member,
     exists,
     get_single_tasks_project_id,
     id16,
     match_nt_users,
+    nozbe_client,
     nt_members_by_email,
     nt_open_projects_len,
+    post_idempotent,
     post_tag,
-    set_unassigned_tag,
+    SOURCE_HOSTS,
+    source_api_host,
+    stable_id,
     trim,
 )
 from openapi_client import models, api
@@ -35,55 +48,128 @@ def unpack(paginator):
     return list(itertools.chain.from_iterable(paginator))
 
 
-SPEC = {
-    "code": "todoist",  # codename / ID of importer
-    "name": "Todoist",  # name of application
-    "url": "https://nozbe.help/advancedfeatures/importers/#todoist",
-    "input_fields": ("nt_auth_token", "auth_token", "team_id"),
-}
+def rebased_session(session, host: str):
+    """Send requests of session to host instead of the real Todoist API
+
+    Todoist REST client has its API URL hard-coded.
+    """
+    if host == SOURCE_HOSTS["todoist"]:
+        return session
+    request = session.request
+
+    @functools.wraps(request)
+    def _request(method, url, *args, **kwargs):
+        return request(method, url.replace(SOURCE_HOSTS["todoist"], host, 1), *args, **kwargs)
+
+    session.request = _request
+    return session
+
+
 IMPORT_NAME = "Imported from Todoist"
 
 
 # main method called by Nozbe app
-def run_import(nt_auth_token: str, auth_token: str, team_id: str) -> Optional[Exception]:
-    """Perform import from todoist to Nozbe"""
+def run_import(
+    nt_auth_token: str,
+    auth_token: str,
+    team_id: str,
+    metrics: Metrics | None = None,
+    progress=None,
+    cancel_token: CancelToken | None = None,
+    limiter: RequestLimiter | None = None,
+    dry_run: bool = False,
+) -> Exception | dict | None:
+    """Perform import from todoist to Nozbe
+
+    metrics - records requests and phases
+    progress - callable or queue receiving progress events
+    cancel_token - import stops when it is cancelled or past its deadline,
+        ImportCancelled with partial-progress summary is returned
+    limiter - caps concurrent requests per service
+    dry_run - nothing is written to Nozbe, the import plan with cost estimate
+        (see DryRun.plan) is returned instead
+    """
     if not nt_auth_token:
         return "Missing 'nt_auth_token'"
     if not auth_token:
         return "Missing 'auth_token'"
 
+    recorder = DryRun() if dry_run else None
+    metrics = metrics or (Metrics() if progress or dry_run else None)
+    tracker = Progress(progress, metrics)
+    host = source_api_host("todoist")
     try:
-        _import_data(
-            nt.ApiClient(
-                configuration=nt.Configuration(
-                    host=API_HOST,
-                    api_key={"ApiKeyAuth": nt_auth_token},
-                    username=nt_auth_token.split("_")[0],
-                )
-            ),
-            RLProxy(TodoistAPI(auth_token)),
-            TodoistAPISync(auth_token, api_version="v9"),
-            team_id,
-            nt_auth_token,
-        )
+        with phase(metrics, "import"):
+            _import_data(
+                nozbe_client(
+                    nt_auth_token,
+                    metrics=metrics,
+                    cancel_token=cancel_token,
+                    limiter=limiter,
+                    dry_run=recorder,
+                ),
+                RLProxy(
+                    TodoistAPI(
+                        auth_token,
+                        session=rebased_session(
+                            limit_session(
+                                instrumented_session(metrics, "todoist"),
+                                limiter,
+                                "todoist",
+                                cancel_token,
+                            ),
+                            host,
+                        ),
+                    ),
+                    # request quota of the real API, not of local fakes
+                    num_requests=450 if host == SOURCE_HOSTS["todoist"] else 10**9,
+                    metrics=metrics,
+                    service="todoist",
+                    cancel_token=cancel_token,
+                ),
+                TodoistAPISync(
+                    auth_token,
+                    api_version="v9",
+                    api_endpoint=host,
+                    session=limit_session(
+                        instrumented_session(metrics, "todoist"), limiter, "todoist", cancel_token
+                    ),
+                ),
+                team_id,
+                nt_auth_token,
+                progress=tracker,
+                cancel_token=cancel_token,
+            )
     except Exception as exc:
+        tracker.finish(exc)
         return exc
-    return None
+    tracker.finish()
+    return recorder and recorder.plan(metrics, tracker)
 
 
 def _import_data(
-    nt_client: nt.ApiClient, todoist_client, todoist_sync_client, team_id: str, nt_auth_token: str
+    nt_client: nt.ApiClient,
+    todoist_client,
+    todoist_sync_client,
+    team_id: str,
+    nt_auth_token: str,
+    progress: Progress | None = None,
+    cancel_token: CancelToken | None = None,
 ):
     """Import everything from todoist to Nozbe"""
+    progress = progress or Progress()
+    cancel_token = cancel_token or CancelToken()
     nt_project_api = api.ProjectsApi(nt_client)
     single_tasks_id = get_single_tasks_project_id(nt_client, team_id)
     imported = get_imported_entities(nt_client, team_id, IMPORT_NAME)
+    group = ImportGroup(nt_client, team_id, IMPORT_NAME)
     author_id = current_nt_member(nt_client, team_id)
 
     def _import_project(project: dict):
         """Import todoist project"""
         if project.name != "Inbox":
             project_model = models.Project(
+                id=stable_id(team_id, SPEC["code"], project.id),
                 name=(name := trim(project.name)),
                 is_template=False,
                 team_id=team_id,
@@ -98,16 +184,18 @@ def _import_data(
             try:
                 nt_project = (
                     exists("projects", name, imported)
-                    or nt_project_api.post_project(project_model)
+                    or post_idempotent(nt_project_api.post_project, project_model)
                     or {}
                 )
+            except ImportCancelled:
+                raise
             except Exception as e:
                 print(e)
                 return
 
             if not (nt_project_id := nt_project and str(nt_project.id)):
                 return
-            add_to_project_group(nt_client, team_id, nt_project_id, "Imported from Todoist")
+            group.add(nt_project_id)
         else:
             nt_project_id = single_tasks_id
 
@@ -122,6 +210,7 @@ def _import_data(
             nt_auth_token,
             is_sap=nt_project_id == single_tasks_id,
             imported=imported,
+            progress=progress,
         )
 
     todoist_projects = unpack(todoist_client.get_projects())
@@ -133,8 +222,13 @@ def _import_data(
         len(todoist_projects) + nt_open_projects_len(nt_client, team_id),
     )
     _import_members(nt_client, todoist_client, todoist_projects, team_id, nt_auth_token)
-    for project in todoist_projects:
-        _import_project(project)
+    progress.plan("projects", len(todoist_projects))
+    with coalesce(nt_client):
+        for project in todoist_projects:
+            cancel_token.check()
+            _import_project(project)
+            flush(nt_client)
+            progress.advance("projects")
 
 
 def _import_members(
@@ -174,14 +268,18 @@ def _import_project_sections(
     nt_auth_token: str,
     is_sap: bool = False,
     imported=None,
+    progress: Progress | None = None,
 ):
     """Import todoist lists as project sections"""
+    progress = progress or Progress()
     nt_api_sections = api.ProjectSectionsApi(nt_client)
 
     # import project sections
-    mapping = {}
+    mapping = IdMap()
     if project.name != "Inbox":
-        for section in unpack(todoist_client.get_sections(project_id=project.id)):
+        sections = unpack(todoist_client.get_sections(project_id=project.id))
+        progress.plan("sections", len(sections))
+        for section in sections:
             try:
                 if nt_section := exists(
                     "project_sections", name := trim(section.name), imported
@@ -197,6 +295,7 @@ def _import_project_sections(
                     mapping[section.id] = str(nt_section.id)
             except OpenApiException as e:
                 print(e)
+            progress.advance("sections")
     _import_tasks(
         nt_client,
         todoist_client,
@@ -209,6 +308,7 @@ def _import_project_sections(
         nt_auth_token,
         is_sap,
         imported=imported,
+        progress=progress,
     )
 
 
@@ -224,7 +324,9 @@ def _import_tasks(
     nt_auth_token,
     is_sap: bool = False,
     imported=None,
+    progress: Progress | None = None,
 ):
+    progress = progress or Progress()
     nt_api_tag_assignments = api.TagAssignmentsApi(nt_client)
     nt_api_tasks = api.TasksApi(nt_client)
     tags_mapping = _import_tags(nt_client, todoist_client, team_id, nt_auth_token)
@@ -261,16 +363,19 @@ def _import_tasks(
         return should_set_tag, responsible_id
 
     # get tasks and completed tasks, while completed tasks are fetched from sync api
-    for task in todoist_sync_client.completed.get_all(project_id=to_project_id).get("items", []) + [
+    tasks = todoist_sync_client.completed.get_all(project_id=to_project_id).get("items", []) + [
         task.to_dict() for task in unpack(todoist_client.get_tasks(project_id=to_project_id))
-    ]:
+    ]
+    progress.plan("tasks", len(tasks))
+    for task in tasks:
         due_at, is_all_day = _parse_timestamp(task.get("due"))
         should_set_tag, responsible_id = _get_responsible_id(task)
         if nt_task := exists(
             "tasks", name := trim(task.get("content", "")), imported
-        ) or nt_api_tasks.post_task(
+        ) or post_idempotent(
+            nt_api_tasks.post_task,
             models.Task(
-                id=id16(),
+                id=stable_id(nt_project_id, task.get("id")),
                 is_followed=False,
                 is_abandoned=False,
                 name=name,
@@ -286,7 +391,7 @@ def _import_tasks(
                 is_all_day=is_all_day,
                 responsible_id=responsible_id,
                 ended_at=_parse_timestamp(task.get("completed_date"))[0],
-            )
+            ),
         ):
             if not is_sap and should_set_tag:
                 set_unassigned_tag(nt_client, nt_task.id)
@@ -298,6 +403,7 @@ def _import_tasks(
                     task,
                     imported=imported,
                     author_id=author_id,
+                    progress=progress,
                 )
                 _import_tags_assignments(
                     nt_api_tag_assignments,
@@ -305,12 +411,16 @@ def _import_tasks(
                     tags_mapping,
                     task.get("labels") or [],
                 )
+            except ImportCancelled:
+                raise
             except Exception as e:
                 print(e)
+        progress.advance("tasks")
 
 
 # pylint: enable=too-many-arguments
 @functools.cache
+@shared
 def todoist_members(todoist_client, project_id: str):
     """Get todoist collaborators per project"""
     return {
@@ -324,22 +434,23 @@ def _import_tags_assignments(
     """Assign tags to task"""
     for tag_name in task_tags:
         if nt_tag_id := tags_mapping.get(tag_name):
-            try:
-                nt_api_tag_assignments.post_tag_assignment(
-                    models.TagAssignment(
-                        id=id16(),
-                        tag_id=nt_tag_id,
-                        task_id=nt_task_id,
-                    )
-                )
-            except Exception as e:
-                print(e)
+            post(
+                nt_api_tag_assignments.post_tag_assignment,
+                models.TagAssignment(
+                    id=id16(),
+                    tag_id=nt_tag_id,
+                    task_id=nt_task_id,
+                ),
+                on_error=print,
+            )
 
 
-def _import_tags(nt_client, todoist_client, team_id: str, nt_auth_token: str) -> dict:
+def _import_tags(nt_client, todoist_client, team_id: str, nt_auth_token: str) -> IdMap:
     """Import todoist tags and return name -> NT tag id mapping"""
     nt_api_tags = api.TagsApi(nt_client)
-    nt_tags = {str(elt.name): str(elt.id) for elt in nt_api_tags.get_tags(fields="id,name")}
+    nt_tags = IdMap(
+        (str(elt.name), str(elt.id)) for elt in paginate(nt_api_tags.get_tags, fields="id,name")
+    )
     check_limits(
         nt_auth_token,
         team_id,
@@ -358,12 +469,20 @@ class Comment:
     """Fake Todoist comment class"""
 
     content: str
+    id: str = "description"
 
 
 def _import_comments(
-    nt_client, todoist_client, nt_task_id: str, task: dict, imported=None, author_id=None
+    nt_client,
+    todoist_client,
+    nt_task_id: str,
+    task: dict,
+    imported=None,
+    author_id=None,
+    progress=None,
 ):
     """Import task-related comments"""
+    progress = progress or Progress()
     nt_api_comments = api.CommentsApi(nt_client)
 
     comments = sorted(
@@ -371,10 +490,13 @@ def _import_comments(
     )
     if task.get("description"):
         comments.insert(0, Comment(content=task.get("description")))
+    progress.plan("comments", len(comments))
     for comment in comments:
         if not exists("comments", body := str(comment.content or "…"), imported):
-            nt_api_comments.post_comment(
+            post(
+                nt_api_comments.post_comment,
                 models.Comment(
+                    id=stable_id(nt_task_id, comment.id),
                     is_team=False,
                     is_pinned=False,
                     body=body,
@@ -382,5 +504,7 @@ def _import_comments(
                     author_id=author_id or id16(),
                     created_at=1,
                     extra="",
-                )
+                ),
+                key=nt_task_id,
             )
+        progress.advance("comments")
@@ -0,0 +1,8 @@
+""" Todoist importer description, importable without source SDK """
+
+SPEC = {
+    "code": "todoist",  # codename / ID of importer
+    "name": "Todoist",  # name of application
+    "url": "https://nozbe.help/advancedfeatures/importers/#todoist",
+    "input_fields": ("nt_auth_token", "auth_token", "team_id"),
+}
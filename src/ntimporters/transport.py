@@ -0,0 +1,326 @@
+""" Transports of openapi_client: HTTP/2 and in-process WSGI/ASGI apps
+
+A transport is what `RESTClientObject.pool_manager` is, an object with
+urllib3.PoolManager's `request(method, url, body=, fields=, headers=,
+timeout=, preload_content=, ...)` returning an urllib3.HTTPResponse look-alike.
+Set one as `Configuration.transport`, urllib3.PoolManager is used when not set.
+"""
+
+import asyncio
+import io
+import sys
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from urllib.parse import quote, unquote, urlencode, urlsplit
+
+import urllib3
+
+# longest unread body read by release_conn, longer ones are closed unread
+RELEASE_READ_BYTES = 2**16
+
+
+def _number(value) -> float | None:
+    return value if isinstance(value, (int, float)) else None
+
+
+def _timeouts(timeout) -> tuple[float | None, float | None]:
+    """Connect and read seconds of urllib3.Timeout or number of seconds"""
+    if timeout is None or isinstance(timeout, (int, float)):
+        return timeout, timeout
+    timer = timeout.clone()
+    timer.start_connect()
+    return _number(timer.connect_timeout), _number(timer.read_timeout)
+
+
+class Response:
+    """urllib3.HTTPResponse look-alike reading body from chunks on demand"""
+
+    def __init__(
+        self,
+        status: int,
+        reason: str,
+        headers,
+        chunks: Iterable[bytes],
+        close: Callable | None = None,
+    ):
+        self.status = status
+        self.reason = reason
+        self.headers = urllib3.HTTPHeaderDict(headers)
+        self._chunks: Iterator[bytes] | None = iter(chunks)
+        self._close = close
+        self._data: bytes | None = None
+
+    @property
+    def data(self) -> bytes:
+        """Whole body, the rest of it is read on first access"""
+        if self._data is None:
+            self._data = b"".join(self.stream())
+        return self._data
+
+    def stream(self, amt: int = 2**16) -> Iterator[bytes]:
+        """Yield chunks of body as received (amt is ignored, chunks are as sent)"""
+        if self._chunks is None:
+            if self._data:
+                yield self._data
+            return
+        try:
+            yield from (chunk for chunk in self._chunks if chunk)
+        finally:
+            self.close()
+
+    def isclosed(self) -> bool:
+        return self._chunks is None
+
+    def close(self):
+        if self._chunks is not None:
+            self._chunks = None
+            if self._close is not None:
+                self._close()
+
+    def release_conn(self):
+        """Return connection (or HTTP/2 stream) of the response to the pool
+
+        An unread short body (e.g. of a 429) is read, so that an HTTP/1.1
+        connection stays open, a long one is closed unread.
+        """
+        length = int(self.headers.get("Content-Length") or RELEASE_READ_BYTES + 1)
+        if self._chunks is not None and length <= RELEASE_READ_BYTES:
+            _ = self.data
+        self.close()
+
+
+class Transport:
+    """Base of transports, subclasses implement `send`"""
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | str | None = None,
+        fields=None,
+        headers=None,
+        timeout=None,
+        encode_multipart: bool = True,
+        **_kwargs,
+    ) -> Response:
+        """Perform request, same arguments as urllib3.PoolManager.request"""
+        headers = dict(headers or {})
+        if fields and method in ("GET", "HEAD", "DELETE"):
+            url += ("&" if "?" in url else "?") + urlencode(fields)
+        elif fields and encode_multipart:
+            body, headers["Content-Type"] = urllib3.encode_multipart_formdata(fields)
+        elif fields:
+            body = urlencode(fields)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if isinstance(body, str):
+            body = body.encode()
+        return self.send(method, url, headers, body or b"", _timeouts(timeout))
+
+    def send(
+        self, method: str, url: str, headers: dict, body: bytes, timeouts: tuple
+    ) -> Response:
+        """Send request, timeouts are connect and read seconds (None - no timeout)"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Close connections (PoolManager.clear)"""
+
+
+class Http2Transport(Transport):
+    """HTTP/2 transport multiplexing requests to a host over one connection (httpx, optional)
+
+    verify - verify TLS certificates, or path to CA bundle
+    cert - client certificate file or (certificate, key) files
+    max_connections - connections kept per transport, requests are multiplexed over them
+    client_kwargs - passed to httpx.Client
+    """
+
+    def __init__(self, verify=True, cert=None, max_connections: int | None = None, **client_kwargs):
+        import httpx
+
+        self._httpx = httpx
+        self._client = httpx.Client(
+            http2=True,
+            verify=verify,
+            cert=cert,
+            limits=httpx.Limits(max_connections=max_connections),
+            **client_kwargs,
+        )
+
+    @classmethod
+    def from_configuration(cls, configuration, **client_kwargs):
+        """Transport with TLS settings and pool size of openapi_client Configuration"""
+        verify = (configuration.ssl_ca_cert or True) if configuration.verify_ssl else False
+        cert = configuration.cert_file
+        if cert and configuration.key_file:
+            cert = (cert, configuration.key_file)
+        return cls(
+            verify=verify,
+            cert=cert,
+            max_connections=configuration.connection_pool_maxsize,
+            **client_kwargs,
+        )
+
+    def send(self, method, url, headers, body, timeouts) -> Response:
+        httpx = self._httpx
+        request = self._client.build_request(
+            method,
+            url,
+            headers=headers,
+            content=body,
+            timeout=httpx.Timeout(timeouts[1], connect=timeouts[0]),
+        )
+        try:
+            response = self._client.send(request, stream=True)
+        except httpx.TimeoutException as exc:
+            raise urllib3.exceptions.TimeoutError(str(exc)) from exc
+        except httpx.TransportError as exc:
+            raise urllib3.exceptions.ProtocolError(str(exc)) from exc
+        return Response(
+            response.status_code,
+            response.reason_phrase,
+            response.headers.multi_items(),
+            response.iter_bytes(),
+            response.close,
+        )
+
+    def clear(self):
+        self._client.close()
+
+
+class WSGITransport(Transport):
+    """Transport calling WSGI app in-process, without sockets
+
+    app - WSGI application, e.g. `NozbeEmulator.wsgi` of ntimporters.emulator
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    def send(self, method, url, headers, body, timeouts) -> Response:
+        parts = urlsplit(url)
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(parts.path),
+            "QUERY_STRING": parts.query,
+            "SERVER_NAME": parts.hostname or "localhost",
+            "SERVER_PORT": str(parts.port or (443 if parts.scheme == "https" else 80)),
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": parts.scheme or "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            environ[key if key == "CONTENT_TYPE" else f"HTTP_{key}"] = value
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started["status"], started["headers"] = status, response_headers
+            return lambda data: None
+
+        result = self.app(environ, start_response)
+        chunks = iter(result)
+        # the app may call start_response when its first chunk is produced
+        first = next(chunks, b"") if not started else b""
+        status, reason = started["status"].split(" ", 1)
+        return Response(
+            int(status),
+            reason,
+            started["headers"],
+            _prepend(first, chunks),
+            getattr(result, "close", None),
+        )
+
+
+def _prepend(first: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    yield first
+    yield from chunks
+
+
+class ASGITransport(Transport):
+    """Transport calling ASGI app in-process, on an event loop of its own thread
+
+    app - ASGI application, e.g. `NozbeEmulator.asgi` of ntimporters.emulator
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="ntimporters-asgi", daemon=True
+                ).start()
+            return self._loop
+
+    async def _call(self, method, url, headers, body) -> tuple:
+        parts = urlsplit(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": parts.scheme or "http",
+            "path": unquote(parts.path),
+            "raw_path": quote(parts.path).encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [
+                (name.lower().encode("latin-1"), str(value).encode("latin-1"))
+                for name, value in headers.items()
+            ],
+            "client": None,
+            "server": (parts.hostname or "localhost", parts.port),
+        }
+        received, done = False, asyncio.Event()
+        response: dict = {"chunks": []}
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["chunks"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return response["status"], response["headers"], response["chunks"]
+
+    def send(self, method, url, headers, body, timeouts) -> Response:
+        future = asyncio.run_coroutine_threadsafe(
+            self._call(method, url, headers, body), self._event_loop()
+        )
+        status, response_headers, chunks = future.result(timeouts[1])
+        return Response(status, "", response_headers, chunks)
+
+    def clear(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
@@ -1,5 +1,14 @@
 """ Trello module """
 
-from ntimporters.trello.importer import SPEC, run_import
+from ntimporters.trello.spec import SPEC
 
 __all__ = ["SPEC", "run_import"]
+
+
+def __getattr__(name: str):
+    """Load importer with its dependencies on first use of run_import"""
+    if name == "run_import":
+        from ntimporters.trello.importer import run_import
+
+        return run_import
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,20 @@
 """Trello -> Nozbe importer"""
 
-from typing import Optional
-
 import openapi_client as nt
 from dateutil.parser import isoparse
 from ntimporters.trello.trello_api import TrelloClient
+from ntimporters.id_map import IdMap
+from ntimporters.pagination import paginate
+from ntimporters.cancellation import CancelToken, ImportCancelled
+from ntimporters.coalescing import coalesce, flush, post
+from ntimporters.concurrency import RequestLimiter
+from ntimporters.dry_run import DryRun
+from ntimporters.progress import Progress
+from ntimporters.project_group import ImportGroup
+from ntimporters.trello.spec import SPEC
+from ntimporters.tagging import set_unassigned_tag
+from ntimporters.telemetry import Metrics, phase
 from ntimporters.utils import (
-    API_HOST,
-    add_to_project_group,
     check_limits,
     current_nt_member,
     exists,
@@ -15,29 +22,42 @@ from ntimporters.utils import (
     id16,
     map_color,
     match_nt_users,
+    nozbe_client,
     nt_open_projects_len,
     parse_timestamp,
+    post_idempotent,
     post_tag,
-    set_unassigned_tag,
+    stable_id,
     trim,
 )
 from openapi_client import models, api
 from openapi_client.exceptions import OpenApiException
 
-SPEC = {
-    "code": "trello",  # codename / ID of importer
-    "name": "Trello",  # name of application
-    "url": "https://nozbe.help/advancedfeatures/importers/#trello",
-    "input_fields": ("nt_auth_token", "app_key", "auth_token", "team_id"),
-}
 IMPORT_NAME = "Imported from Trello"
 
 
 # main method called by Nozbe app
 def run_import(
-    nt_auth_token: str, auth_token: str, app_key: str, team_id: str
-) -> Optional[Exception]:
-    """Perform import from Trello to Nozbe"""
+    nt_auth_token: str,
+    auth_token: str,
+    app_key: str,
+    team_id: str,
+    metrics: Metrics | None = None,
+    progress=None,
+    cancel_token: CancelToken | None = None,
+    limiter: RequestLimiter | None = None,
+    dry_run: bool = False,
+) -> Exception | dict | None:
+    """Perform import from Trello to Nozbe
+
+    metrics - records requests and phases
+    progress - callable or queue receiving progress events
+    cancel_token - import stops when it is cancelled or past its deadline,
+        ImportCancelled with partial-progress summary is returned
+    limiter - caps concurrent requests per service
+    dry_run - nothing is written to Nozbe, the import plan with cost estimate
+        (see DryRun.plan) is returned instead
+    """
     if not nt_auth_token:
         return "Missing 'nt_auth_token'"
     if not auth_token:
@@ -45,34 +65,57 @@ def run_import(
     if not app_key:
         return "Missing 'app_key'"
 
+    recorder = DryRun() if dry_run else None
+    metrics = metrics or (Metrics() if progress or dry_run else None)
+    tracker = Progress(progress, metrics)
     try:
-        _import_data(
-            nt.ApiClient(
-                configuration=nt.Configuration(
-                    host=API_HOST,
-                    api_key={"ApiKeyAuth": nt_auth_token},
-                    username=nt_auth_token.split("_")[0],
-                )
-            ),
-            TrelloClient(app_key, auth_token),
-            team_id,
-            nt_auth_token,
-        )
+        with phase(metrics, "import"):
+            # the import stops at the first project failing, returning its error
+            if error := _import_data(
+                nozbe_client(
+                    nt_auth_token,
+                    metrics=metrics,
+                    cancel_token=cancel_token,
+                    limiter=limiter,
+                    dry_run=recorder,
+                ),
+                TrelloClient(
+                    app_key, auth_token, metrics=metrics, cancel_token=cancel_token, limiter=limiter
+                ),
+                team_id,
+                nt_auth_token,
+                progress=tracker,
+                cancel_token=cancel_token,
+            ):
+                raise error
     except Exception as exc:
         print(exc)
+        tracker.finish(exc)
         return exc
-    return None
+    tracker.finish()
+    return recorder and recorder.plan(metrics, tracker)
 
 
-def _import_data(nt_client: nt.ApiClient, trello_client, team_id: str, nt_auth_token: str):
+def _import_data(
+    nt_client: nt.ApiClient,
+    trello_client,
+    team_id: str,
+    nt_auth_token: str,
+    progress: Progress | None = None,
+    cancel_token: CancelToken | None = None,
+):
     """Import everything from Trello to Nozbe"""
+    progress = progress or Progress()
+    cancel_token = cancel_token or CancelToken()
     projects_api = api.ProjectsApi(nt_client)
     curr_member = current_nt_member(nt_client, team_id)
     imported = get_imported_entities(nt_client, team_id, IMPORT_NAME)
+    group = ImportGroup(nt_client, team_id, IMPORT_NAME)
 
     def _import_project(project: dict, curr_member: str):
         """Import trello project"""
         project_model = models.Project(
+            id=stable_id(team_id, SPEC["code"], project.get("id")),
             name=(name := trim(project.get("name", ""))),
             is_template=False,
             team_id=team_id,
@@ -87,11 +130,13 @@ def _import_data(nt_client: nt.ApiClient, trello_client, team_id: str, nt_auth_t
             extra="",
         )
         nt_project = (
-            exists("projects", name, imported) or projects_api.post_project(project_model) or {}
+            exists("projects", name, imported)
+            or post_idempotent(projects_api.post_project, project_model)
+            or {}
         )
         if not (nt_project_id := nt_project and str(nt_project.id)):
             return
-        add_to_project_group(nt_client, team_id, nt_project_id, IMPORT_NAME)
+        group.add(nt_project_id)
 
         _import_project_sections(
             nt_client,
@@ -102,6 +147,7 @@ def _import_data(nt_client: nt.ApiClient, trello_client, team_id: str, nt_auth_t
             team_id,
             nt_auth_token,
             imported=imported,
+            progress=progress,
         )
 
     check_limits(
@@ -111,11 +157,18 @@ def _import_data(nt_client: nt.ApiClient, trello_client, team_id: str, nt_auth_t
         "projects_open",
         len(trello_projects := trello_client.projects()) + nt_open_projects_len(nt_client, team_id),
     )
-    for project in trello_projects:
-        try:
-            _import_project(project, curr_member)
-        except Exception as error:
-            return error
+    progress.plan("projects", len(trello_projects))
+    with coalesce(nt_client):
+        for project in trello_projects:
+            cancel_token.check()
+            try:
+                _import_project(project, curr_member)
+                flush(nt_client)
+            except ImportCancelled:
+                raise
+            except Exception as error:
+                return error
+            progress.advance("projects")
     return None
 
 
@@ -129,8 +182,10 @@ def _import_project_sections(
     team_id: str,
     nt_auth_token: str,
     imported=None,
+    progress: Progress | None = None,
 ):
     """Import trello lists as project sections"""
+    progress = progress or Progress()
     nt_api_sections = api.ProjectSectionsApi(nt_client)
     nt_api_tasks = api.TasksApi(nt_client)
 
@@ -142,6 +197,7 @@ def _import_project_sections(
         "project_sections",
         len(trello_sections := trello_client.sections(project.get("id"))),
     )
+    progress.plan("sections", len(trello_sections))
     for j, section in enumerate(trello_sections):
         nt_section_id = None
         try:
@@ -174,12 +230,15 @@ def _import_project_sections(
                         return responsible_id
             return None
 
-        for i, task in enumerate(trello_client.tasks(section.get("id"))):
+        progress.plan("tasks", len(trello_tasks := trello_client.tasks(section.get("id"))))
+        for i, task in enumerate(trello_tasks):
             responsible_id = _get_responsible_id(task) or nt_member_id if task.get("due") else None
 
             nt_task = exists("tasks", name := trim(task.get("name", "")), imported)
-            if nt_task := nt_task or nt_api_tasks.post_task(
+            if nt_task := nt_task or post_idempotent(
+                nt_api_tasks.post_task,
                 models.Task(
+                    id=stable_id(nt_project_id, task.get("id")),
                     name=name,
                     project_id=nt_project_id,
                     author_id=nt_member_id,
@@ -198,7 +257,7 @@ def _import_project_sections(
                         None if not task.get("dueComplete") else parse_timestamp(task.get("due"))
                     ),
                     # there is no ended_at time @ trello
-                )
+                ),
             ):
                 if task.get("due") and not responsible_id:
                     set_unassigned_tag(nt_client, str(nt_task.id))
@@ -217,8 +276,11 @@ def _import_project_sections(
                     task,
                     imported=imported,
                     author_id=nt_member_id,
+                    progress=progress,
                 )
                 # TODO import attachments, reminders?
+            progress.advance("tasks")
+        progress.advance("sections")
 
 
 # pylint: enable=too-many-arguments
@@ -226,10 +288,12 @@ def _import_project_sections(
 
 def _import_tags_per_project(
     nt_client, trello_client, project: dict, team_id: str, nt_auth_token: str
-) -> dict:
+) -> IdMap:
     """Import trello tags and return name -> NT tag id mapping"""
     nt_api_tags = api.TagsApi(nt_client)
-    nt_tags = {str(elt.name): str(elt.id) for elt in nt_api_tags.get_tags(fields="id,name")}
+    nt_tags = IdMap(
+        (str(elt.name), str(elt.id)) for elt in paginate(nt_api_tags.get_tags, fields="id,name")
+    )
     check_limits(
         nt_auth_token,
         team_id,
@@ -254,33 +318,36 @@ def _import_tags(nt_client, nt_task_id: str, task: dict, tags_mapping):
         if nt_tag_id := tags_mapping.get(tag.get("name") or "Unnamed"):
             if nt_tag_id in assigned:
                 continue
-            try:
-                nt_api_tag_assignments.post_tag_assignment(
-                    models.TagAssignment(
-                        id=id16(),
-                        tag_id=nt_tag_id,
-                        task_id=nt_task_id,
-                    )
-                )
-                assigned.append(nt_tag_id)
-            except Exception as exc:
-                print(exc)
+            post(
+                nt_api_tag_assignments.post_tag_assignment,
+                models.TagAssignment(
+                    id=id16(),
+                    tag_id=nt_tag_id,
+                    task_id=nt_task_id,
+                ),
+                on_error=print,
+            )
+            assigned.append(nt_tag_id)
 
 
 def _import_comments(
-    nt_client, trello_client, nt_task_id: str, task, imported=None, author_id=None
+    nt_client, trello_client, nt_task_id: str, task, imported=None, author_id=None, progress=None
 ):
     """Import task-related comments"""
+    progress = progress or Progress()
     tr_task_id = task.get("id")
     nt_api_comments = api.CommentsApi(nt_client)
     comments = [{"text": task.get("desc")}] if task.get("desc") else []
     comments += sorted(
         trello_client.comments(tr_task_id), key=lambda elt: isoparse(elt.get("date")).timestamp()
     )
+    progress.plan("comments", len(comments))
     for comment in comments:
         if not exists("comments", body := comment.get("text") or "…", imported):
-            nt_api_comments.post_comment(
+            post(
+                nt_api_comments.post_comment,
                 models.Comment(
+                    id=stable_id(nt_task_id, comment.get("id") or "description"),
                     body=body,
                     task_id=nt_task_id,
                     author_id=author_id or id16(),
@@ -288,8 +355,10 @@ def _import_comments(
                     is_team=False,
                     is_pinned=False,
                     extra="",
-                )
+                ),
+                key=nt_task_id,
             )
+        progress.advance("comments")
 
 
 # def _import_members(nt_client, trello_client, team_id: str):
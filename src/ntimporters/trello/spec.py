@@ -0,0 +1,8 @@
+""" Trello importer description, importable without source SDK """
+
+SPEC = {
+    "code": "trello",  # codename / ID of importer
+    "name": "Trello",  # name of application
+    "url": "https://nozbe.help/advancedfeatures/importers/#trello",
+    "input_fields": ("nt_auth_token", "app_key", "auth_token", "team_id"),
+}
@@ -4,7 +4,13 @@ import datetime
 import functools
 
 import requests
-from ntimporters.utils import ImportException
+from ntimporters.client_pool import default_pool
+from ntimporters.concurrency import limit
+from ntimporters.http_cache import CachedSession, default_cache
+from ntimporters.json_codec import default_codec
+from ntimporters.singleflight import SingleFlight
+from ntimporters.telemetry import Metrics
+from ntimporters.utils import ImportException, source_api_host
 
 # board -> project
 # list ->  section
@@ -14,21 +20,93 @@ from ntimporters.utils import ImportException
 
 
 class TrelloClient:
-    """Simple trello REST API client"""
-
-    api_path = "https://api.trello.com/1"
-
-    def __init__(self, app_key, token):
+    """Simple trello REST API client
+
+    api_path - Trello API URL, TRELLO_API_HOST environment variable or the real API by default
+    json_codec - JSON codec of responses (see ntimporters.json_codec)
+    session - requests.Session-like client, shared one of the host by default
+        (see ntimporters.client_pool)
+    singleflight - coalescing of concurrent identical reads (see ntimporters.singleflight)
+    cache - on-disk cache of reads (see ntimporters.http_cache), of NTIMPORTERS_HTTP_CACHE
+        file by default, none if not set
+
+    The user (`members/me`) is fetched on first use of author_email or boards_ids.
+    """
+
+    def __init__(
+        self,
+        app_key,
+        token,
+        metrics: Metrics | None = None,
+        cancel_token=None,
+        limiter=None,
+        api_path: str | None = None,
+        json_codec=None,
+        session=None,
+        singleflight=None,
+        cache=None,
+    ):
+        self.api_path = (api_path or source_api_host("trello")).rstrip("/")
+        self.singleflight = singleflight or SingleFlight()
+        self.json_codec = json_codec or default_codec()
+        self.session = session or default_pool().session(self.api_path)
+        if (cache := cache or default_cache()) is not None:
+            self.session = CachedSession(self.session, cache)
+        self.metrics = metrics
+        self.cancel_token = cancel_token
+        self.limiter = limiter
         self.headers = {
             "Authorization": f'OAuth oauth_consumer_key="{app_key}", oauth_token="{token}"'
         }
-        user_data = self.user()
-        self.author_email = str(user_data.get("email"))
-        self.boards_ids = user_data.get("idBoards", [])
+
+    @functools.cached_property
+    def _me(self) -> dict:
+        return self.user()
+
+    @property
+    def author_email(self) -> str:
+        """Email of the user"""
+        return str(self._me.get("email"))
+
+    @property
+    def boards_ids(self) -> list:
+        """Ids of boards of the user"""
+        return self._me.get("idBoards", [])
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """Perform GET request"""
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+            kwargs.setdefault("timeout", self.cancel_token.timeout())
+        if self.metrics is None:
+            with limit(self.limiter, "trello", self.cancel_token) as outcome:
+                resp = self.session.get(url, headers=self.headers, **kwargs)
+                outcome.status = resp.status_code
+                return resp
+        with (
+            self.metrics.track("trello", "GET", url) as tracked,
+            limit(self.limiter, "trello", self.cancel_token) as outcome,
+        ):
+            resp = self.session.get(url, headers=self.headers, **kwargs)
+            tracked["status"] = outcome.status = resp.status_code
+            tracked["bytes_in"] = (
+                int(resp.headers.get("Content-Length") or 0)
+                if kwargs.get("stream")
+                else len(resp.content)
+            )
+            return resp
+
+    def _read(self, url: str) -> requests.Response:
+        """Perform GET request and read its body"""
+        resp = self._get(url)
+        _ = resp.content
+        return resp
 
     def _req(self, suffix) -> dict:
-        if resp := requests.get(f"{self.api_path}/{suffix}", headers=self.headers):
-            return resp.json()
+        url = f"{self.api_path}/{suffix}"
+        # concurrent requests of the same url share one response
+        if resp := self.singleflight.do(url, self._read, url):
+            return self.json_codec.loads(resp.content)
         else:
             raise ImportException(
                 f"Connection to trello failed ({resp.status_code}). Wrong credentials?"
@@ -76,16 +154,14 @@ class TrelloClient:
         members_emails = {}
         for board_id in self.boards_ids:
             for member in self._req(f"boards/{board_id}/members"):
-                if (email := self.member(member.get("id")).get("email")) != self.user().get(
-                    "email"
-                ):
+                if (email := self.member(member.get("id")).get("email")) != self._me.get("email"):
                     members_emails[member.get("id")] = email
 
         return members_emails
 
     def attachment(self, attachment_url: str):
         """Get attachment body"""
-        if resp := requests.get(attachment_url, stream=True, headers=self.headers):
+        if resp := self._get(attachment_url, stream=True):
             if resp and hasattr(resp, "raw"):
                 return resp.raw
         return b""
@@ -103,6 +179,7 @@ class TrelloClient:
                 if edata.get("card", {}).get("id") == task_id:
                     comments.append(
                         {
+                            "id": element.get("id"),
                             "text": edata.get("text"),
                             "date": element.get("date"),
                             "author_email": str(
@@ -123,6 +200,7 @@ class TrelloClient:
                 comment_body.append(f"{checked} {item.get('name')}")
             parsed.append(
                 {
+                    "id": checklist.get("id"),
                     "author_email": str(self.author_email),
                     "text": "\n".join(comment_body),
                     "date": datetime.datetime.now().isoformat(),
@@ -6,33 +6,156 @@ import hashlib
 from os import getenv
 import json
 import random
-from collections import UserDict
+from collections.abc import Iterator
 from typing import Optional, Tuple
 
 import requests
 from dateutil.parser import isoparse
-from openapi_client import models, api, Color
-
-HOST = "api4"
-if getenv("DEV_ACCESS_TOKEN"):
-    HOST = f"dev{HOST}"
-API_HOST = getenv("CUSTOM_API_HOST") or f"https://{HOST}.nozbe.com/v1/api"
+from ntimporters.client_pool import default_pool
+from ntimporters.id_map import SPILL_THRESHOLD, IdMap
+from ntimporters.json_codec import default_codec
+from ntimporters.pagination import MAX_PAGE_SIZE, paginate
+from ntimporters.singleflight import SingleFlight
+from ntimporters.telemetry import NOZBE, Metrics
+from openapi_client import models, api, ApiClient, Color, Configuration
+from openapi_client.exceptions import ApiException
+
+DEFAULT_HOST = "api4"
 # API_HOST = "http://localhost:8888/v1/api"
 
 
+def nozbe_host() -> str:
+    """Return Nozbe API host name, environment is read on every call"""
+    return f"dev{DEFAULT_HOST}" if getenv("DEV_ACCESS_TOKEN") else DEFAULT_HOST
+
+
+def api_host() -> str:
+    """Return Nozbe API URL, environment is read on every call"""
+    return getenv("CUSTOM_API_HOST") or f"https://{nozbe_host()}.nozbe.com/v1/api"
+
+
+# APIs of source services, <SERVICE>_API_HOST environment variables point
+# importers elsewhere, e.g. at local fake servers
+SOURCE_HOSTS = {
+    "asana": "https://app.asana.com/api/1.0",
+    "monday": "https://api.monday.com/v2",
+    "todoist": "https://api.todoist.com",
+    "trello": "https://api.trello.com/1",
+}
+
+
+def source_api_host(service: str) -> str:
+    """Return API URL of source service, environment is read on every call"""
+    return (getenv(f"{service.upper()}_API_HOST") or SOURCE_HOSTS[service]).rstrip("/")
+
+
+def __getattr__(name: str):
+    """Keep HOST and API_HOST available, evaluated on access instead of import"""
+    if name == "HOST":
+        return nozbe_host()
+    if name == "API_HOST":
+        return api_host()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def nozbe_client(
+    nt_auth_token: str,
+    metrics: Metrics | None = None,
+    cancel_token=None,
+    limiter=None,
+    host: str | None = None,
+    dry_run=None,
+    json_codec=None,
+    transport=None,
+    pooled: bool = True,
+    singleflight=None,
+    **kwargs,
+) -> ApiClient:
+    """Create Nozbe API client, kwargs are passed to Configuration
+
+    json_codec - JSON codec (see ntimporters.json_codec), json module unless
+        NTIMPORTERS_JSON selects orjson
+    transport - transport of requests (see ntimporters.transport), urllib3 by default
+    pooled - without transport, reuse connections of the process pool
+        (see ntimporters.client_pool) instead of opening new ones; the pool
+        keeps connections for all writers of the write coalescer and the
+        importing thread, or as many as the limiter lets through
+    singleflight - coalescing of concurrent identical reads (see ntimporters.singleflight),
+        one of the client by default
+    """
+    configuration = Configuration(
+        host=host or api_host(),
+        api_key={"ApiKeyAuth": nt_auth_token},
+        username=nt_auth_token.split("_")[0],
+        **kwargs,
+    )
+    configuration.metrics = metrics
+    configuration.cancel_token = cancel_token
+    configuration.limiter = limiter
+    configuration.dry_run = dry_run
+    configuration.json_codec = json_codec or default_codec()
+    if transport is None and pooled:
+        from ntimporters.coalescing import WORKERS
+
+        configuration.connection_pool_maxsize = max(
+            configuration.connection_pool_maxsize or 0,
+            WORKERS + 1,
+            (limiter and limiter.maximum(NOZBE)) or 0,
+        )
+        transport = default_pool().nozbe(configuration)
+    configuration.transport = transport
+    configuration.singleflight = singleflight or SingleFlight()
+    return ApiClient(configuration=configuration)
+
+
 def id16():
     """Generate random string"""
     return "".join(random.choices(string.ascii_letters + string.digits, k=16))
 
 
+def stable_id(*parts) -> str:
+    """Deterministic id16 of imported entity, e.g. stable_id(team_id, "trello", card_id)
+
+    Nested entities may be identified by their parent's stable id, e.g.
+    stable_id(nt_task_id, comment_id).
+    Parts missing (None) in source data give a random id16, so that such
+    entities are not all taken for one and the same already created entity.
+    """
+    if any(part is None for part in parts):
+        return id16()
+    alphabet = string.ascii_letters + string.digits
+    digest = hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).digest()
+    number = int.from_bytes(digest, "big")
+    chars = []
+    for _ in range(16):
+        number, index = divmod(number, len(alphabet))
+        chars.append(alphabet[index])
+    return "".join(chars)
+
+
+def post_idempotent(method, model):
+    """Create entity with api method, the one with the same id created before counts as created
+
+    Nozbe answers 409 Conflict for existing ids, the model itself is returned then.
+    """
+    try:
+        return method(model)
+    except ApiException as exc:
+        if exc.status == 409 and getattr(model, "id", None):
+            return model
+        raise
+
+
 class ImportException(Exception):
     """Importer exception"""
 
 
-def subscribe_trial(api_key: str, nt_team_id: str, members_len: int = 1) -> bool:
+def subscribe_trial(
+    api_key: str, nt_team_id: str, members_len: int = 1, host: str | None = None
+) -> bool:
     """Return True if trial has been subscribed"""
     resp = requests.patch(
-        "/".join((API_HOST.removesuffix("/api"), "teams", nt_team_id, "plan")),
+        "/".join(((host or api_host()).removesuffix("/api"), "teams", nt_team_id, "plan")),
         json={"members_len": members_len, "plan_type": "trial", "is_recurring": False, "creds": 0},
         headers={"Authorization": f"Apikey {api_key}", "API-Version": "current"},
     )
@@ -56,12 +179,15 @@ def nt_open_projects_len(nt_client, team_id: str):
 
 
 def check_limits(api_key: str, nt_team_id: str, nt_client, limit_name: str, current_len: int):
-    """Raise an exception if limits exceeded"""
+    """Raise an exception if limits exceeded, only record the check in dry-run mode"""
     # if "localhost" in API_HOST:
     #     return
     limits = nt_limits(nt_client, nt_team_id)
+    if (dry_run := getattr(nt_client.configuration, "dry_run", None)) is not None:
+        dry_run.check_limit(limit_name, current_len, limits.get(limit_name, 0))
+        return
     if current_len > (limit := limits.get(limit_name, 0)) > -1 and not subscribe_trial(
-        api_key, nt_team_id
+        api_key, nt_team_id, host=nt_client.configuration.host
     ):
         raise ImportException(f"LIMIT {limit_name} : {current_len} > {limit}")
 
@@ -74,96 +200,64 @@ def get_group_id(nt_client, team_id: str, group_name: str) -> str | None:
     return str(st_groups[0].id) if st_groups and st_groups[0] else None
 
 
-def exists(entity_type: str, name: str, imported_entities: dict[str, tuple[str, str]]) -> dict:
+def exists(entity_type: str, name: str, imported_entities: dict[str, IdMap]) -> "Dict":
     """Check if entity already exists and return its id"""
 
     if imported_entities:
-        if (records := imported_entities.get(entity_type)) and (record := records.get(name)):
-            return record
+        if (records := imported_entities.get(entity_type)) and (record_id := records.get(name)):
+            return Dict({"id": record_id})
     return Dict({"id": None})
 
 
-class Dict(UserDict):
-    """Class pretending OpenApi object and dict in the same time"""
+class Dict:
+    """Lightweight record pretending OpenApi object and dict in the same time"""
+
+    __slots__ = ("id",)
 
-    @property
-    def id(self):
-        """Id as a property"""
-        return self.get("id")
+    def __init__(self, data: dict):
+        self.id = data.get("id")
 
-    def __len__(self):
+    def get(self, key: str, default=None):
+        """Dict-like access to id"""
+        return self.id if key == "id" else default
+
+    def __bool__(self):
         """Check if none"""
-        return self.get("id") is not None
+        return self.id is not None
 
 
-def get_imported_entities(nt_client, team_id, group_name) -> dict[str, list]:
-    """Get already imported records"""
-    already_imported = []
+def get_imported_entities(nt_client, team_id, group_name) -> dict[str, IdMap]:
+    """Get already imported records as name -> id mappings"""
+    entities = {
+        "comments": IdMap(hash_keys=True, spill_threshold=SPILL_THRESHOLD),
+        **{
+            f"{rtype}s": IdMap(spill_threshold=SPILL_THRESHOLD)
+            for rtype in ("task", "tag", "project", "project_section")
+        },
+    }
     if group_id := get_group_id(nt_client, team_id, group_name):
-        for pgroup in api.GroupAssignmentsApi(nt_client).get_group_assignments(
-            group_id=group_id, group_type="project"
+        for pgroup in paginate(
+            api.GroupAssignmentsApi(nt_client).get_group_assignments,
+            group_id=group_id,
+            group_type="project",
         ):
             project = api.ProjectsApi(nt_client).get_project_by_id(str(pgroup.object_id))
-            already_imported.append(("project", project))
-            for section in api.ProjectSectionsApi(nt_client).get_project_sections(
-                project_id=str(project.id)
+            entities["projects"][str(project.name)] = project.id
+            for section in paginate(
+                api.ProjectSectionsApi(nt_client).get_project_sections, project_id=str(project.id)
             ):
-                already_imported.append(("project_section", section))
-            for task in api.TasksApi(nt_client).get_tasks(project_id=str(project.id)):
-                already_imported.append(("task", task))
-                for comment in api.CommentsApi(nt_client).get_comments(task_id=str(task.id)):
-                    already_imported.append(("comment", comment))
-                for tag in api.TagsApi(nt_client).get_tags(task_id=str(task.id)):
-                    already_imported.append(("tag", tag))
-    entities = {
-        "comments": {
-            str(elt[1].body): Dict({"id": elt[1].id})
-            for elt in already_imported
-            if elt[0] == "comment"
-        }
-    }
-    for rtype in ("task", "tag", "project", "project_section"):
-        entities[f"{rtype}s"] = {
-            str(elt[1].name): Dict({"id": elt[1].id}) for elt in already_imported if elt[0] == rtype
-        }
+                entities["project_sections"][str(section.name)] = section.id
+            for task in paginate(api.TasksApi(nt_client).get_tasks, project_id=str(project.id)):
+                entities["tasks"][str(task.name)] = task.id
+                for comment in paginate(
+                    api.CommentsApi(nt_client).get_comments, task_id=str(task.id)
+                ):
+                    entities["comments"][str(comment.body)] = comment.id
+                for tag in paginate(api.TagsApi(nt_client).get_tags, task_id=str(task.id)):
+                    entities["tags"][str(tag.name)] = tag.id
     return entities
 
 
-def add_to_project_group(nt_client, team_id: str, project_id: str, group_name: str):
-    """Add project to project' group"""
-    try:
-        group_id = get_group_id(nt_client, team_id, group_name)
-        if not group_id and (
-            group := api.ProjectGroupsApi(nt_client).post_project_group(
-                models.ProjectGroup(id=id16(), name=group_name, team_id=team_id, is_private=True)
-            )
-        ):
-            group_id = group.id
-        args = {"object_id": str(project_id), "group_id": str(group_id), "group_type": "project"}
-        if group_id and not api.GroupAssignmentsApi(nt_client).get_group_assignments(
-            limit=1, **args
-        ):
-            api.GroupAssignmentsApi(nt_client).post_group_assignment(
-                models.GroupAssignment(id=id16(), **args)
-            )
-    except Exception as exc:
-        print(exc)
-
-
-def set_unassigned_tag(nt_client, task_id: str):
-    """set 'missing responsibility' tag"""
-    tag_name, tag_id = "missing responsibility", None
-    if tag_id := post_tag(nt_client, tag_name, None):
-        args = {"tag_id": str(tag_id), "task_id": str(task_id)}
-        if not api.TagAssignmentsApi(nt_client).get_tag_assignments(**args, limit=1):
-            try:
-                api.TagAssignmentsApi(nt_client).post_tag_assignment(
-                    models.TagAssignment(id=id16(), **args)
-                )
-            except Exception as exc:
-                print(exc)
-
-
 def nt_limits(nt_client, team_id: str):
     """Check Nozbe limits"""
     if (team := api.TeamsApi(nt_client).get_team_by_id(team_id)) and hasattr(team, "limits"):
@@ -178,20 +272,22 @@ def map_color(color: Optional[str]) -> Color:
     return Color(color if color in colors else random.choice(colors))  # nosec
 
 
-def get_projects_per_team(nt_client, team_id: str) -> Optional[str]:
+def get_projects_per_team(nt_client, team_id: str) -> Iterator[dict]:
     """Get team-related projects"""
     nt_project_api = api.ProjectsApi(nt_client)
-    return [
+    return (
         dict(project)
-        for project in nt_project_api.get_projects(
+        for project in paginate(
+            nt_project_api.get_projects,
+            page_size=MAX_PAGE_SIZE,
+            streamed=True,
             team_id=team_id,
-            limit=10000,
             fields=(
                 "id,name,author_id,created_at,last_event_at,ended_at,"
                 "team_id,is_open,is_single_actions"
             ),
         )
-    ]
+    )
 
 
 def get_single_tasks_project_id(nt_client, team_id: str) -> Optional[str]:
@@ -214,11 +310,11 @@ def nt_members_by_email(nt_client, team_id: str | None = None) -> Tuple[dict, st
         str(elt.user_id): str(elt.id)
         for elt in filter(
             lambda elt: elt.team_id == team_id if team_id else True,
-            api.TeamMembersApi(nt_client).get_team_members(),
+            paginate(api.TeamMembersApi(nt_client).get_team_members),
         )
     }
     current_user_id, mapping = nt_client.configuration.username, {}
-    for user in api.UsersApi(nt_client).get_users():
+    for user in paginate(api.UsersApi(nt_client).get_users):
         if hasattr(user, "email") and user.email:
             email = user.email
         elif hasattr(user, "invitation_email") and user.invitation_email:
@@ -268,7 +364,7 @@ def match_nt_users(nt_client, emails: list) -> dict:
 
     nt_users = [
         (str(elt.email if hasattr(elt, "email") else elt.invitation_email), str(elt.id))
-        for elt in api.UsersApi(nt_client).get_users()
+        for elt in paginate(api.UsersApi(nt_client).get_users)
         if any((hasattr(elt, "email"), hasattr(elt, "invitation_email")))
     ]
     pairs = []
@@ -283,7 +379,7 @@ def match_nt_users(nt_client, emails: list) -> dict:
     if pairs:
         nt_members = {
             str(elt.user_id): str(elt.id)
-            for elt in api.TeamMembersApi(nt_client).get_team_members()
+            for elt in paginate(api.TeamMembersApi(nt_client).get_team_members)
         }
         return {elt[0]: nt_members.get(elt[1]) for elt in pairs if elt[1] in nt_members}
     return {}
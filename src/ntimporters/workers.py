@@ -0,0 +1,321 @@
+""" Pool of pre-forked worker processes running imports """
+
+import multiprocessing
+import pickle
+import pkgutil
+import queue
+import resource
+import sys
+import threading
+from collections import deque
+from multiprocessing import connection
+from multiprocessing.connection import Connection
+
+from ntimporters import registry
+from ntimporters.cancellation import CancelToken
+from ntimporters.scheduler import ImportJob
+from ntimporters.utils import ImportException
+
+# seconds between checks of running jobs for cancellation
+POLL_INTERVAL = 0.1
+
+
+def preload_modules() -> list[str]:
+    """Modules imported once by the fork server: Nozbe API client, its models and all importers"""
+    import openapi_client.api
+    import openapi_client.models
+
+    return [
+        "openapi_client.api_client",
+        *(
+            f"openapi_client.api.{elt.name}"
+            for elt in pkgutil.iter_modules(openapi_client.api.__path__)
+        ),
+        *(
+            f"openapi_client.models.{elt.name}"
+            for elt in pkgutil.iter_modules(openapi_client.models.__path__)
+        ),
+        *(f"ntimporters.{code}.importer" for code in registry.IMPORTERS),
+    ]
+
+
+def _peak_rss_mb() -> float:
+    """Peak memory of current process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _picklable(value):
+    """Value or its repr wrapped in ImportException if it cannot be sent to the parent"""
+    try:
+        pickle.dumps(value)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return ImportException(repr(value))
+    return value
+
+
+def _work(conn: Connection, max_jobs: int, max_rss_mb: float | None):
+    """Worker process: run jobs received over conn until recycled or stopped"""
+    jobs: queue.Queue = queue.Queue()
+    current: dict = {}  # job id -> cancel token of the running job
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def listen():
+        # the only reader of conn, the main thread runs jobs
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                # parent is gone
+                message = ("stop",)
+            if message[0] == "cancel":
+                if (token := current.get(message[1])) is not None:
+                    token.cancel()
+                continue
+            jobs.put(message)
+            if message[0] == "stop":
+                return
+
+    threading.Thread(target=listen, name="ntimporters-worker-conn", daemon=True).start()
+    for done in range(1, max_jobs + 1):
+        message = jobs.get()
+        if message[0] == "stop":
+            return
+        _, job_id, importer, kwargs, timeout, progress = message
+        token = current[job_id] = CancelToken(timeout)
+        result = error = None
+        # any error of the import is sent to the parent as the job's error,
+        # the worker goes on with the next job
+        try:
+            result = registry.run_import(importer)(
+                **kwargs,
+                cancel_token=token,
+                progress=(lambda event, job_id=job_id: send(("progress", job_id, event)))
+                if progress
+                else None,
+            )
+        except BaseException as exc:  # noqa: BLE001
+            error = exc
+        finally:
+            current.pop(job_id, None)
+        # the parent sends no more jobs to a retiring worker
+        retiring = done >= max_jobs or (max_rss_mb is not None and _peak_rss_mb() > max_rss_mb)
+        send(("done", job_id, _picklable(result), _picklable(error), retiring))
+        if retiring:
+            return
+
+
+class _Worker:
+    """Parent side of a worker process"""
+
+    def __init__(self, process, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.job: ImportJob | None = None
+        self.jobs_done = 0
+        self.cancel_sent = False
+        self.retiring = False
+
+
+class WorkerPool:
+    """Run imports in pre-forked worker processes
+
+    workers - number of worker processes
+    max_jobs - jobs run by a worker before it is replaced by a fresh one
+    max_rss_mb - worker whose peak memory passed given MB is replaced after its job
+    preload - modules imported once by the fork server (see preload_modules)
+
+    Workers are forked from a fork server which imported the Nozbe API client
+    with all models and all importers, so a job starts as soon as a worker is
+    free instead of paying for interpreter start and imports. Jobs run in
+    submission order; cancellation, timeouts and progress events work as with
+    Scheduler, metrics of jobs stay in the workers.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_jobs: int = 100,
+        max_rss_mb: float | None = None,
+        preload: list[str] | None = None,
+    ):
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_forkserver_preload(preload_modules() if preload is None else preload)
+        self._lock = threading.Lock()
+        self._pending: deque[ImportJob] = deque()
+        self._workers: list[_Worker] = []
+        self._wakeup_reader, self._wakeup = self._context.Pipe(duplex=False)
+        self._closed = False
+        self.started = self.recycled = self.lost = 0
+        for _ in range(workers):
+            self._spawn()
+        self._supervisor = threading.Thread(
+            target=self._supervise, name="ntimporters-pool", daemon=True
+        )
+        self._supervisor.start()
+
+    def submit(self, importer: str, timeout: float | None = None, progress=None, **kwargs):
+        """Queue import, kwargs (credentials, team_id) are passed to run_import of the importer"""
+        registry.spec(importer)
+        job = ImportJob(importer, kwargs, timeout=timeout, progress=progress)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Worker pool is shut down")
+            self._pending.append(job)
+        self._wake()
+        return job
+
+    def stats(self) -> dict:
+        """Return numbers of pending jobs, busy and idle workers and replaced workers"""
+        with self._lock:
+            busy = sum(worker.job is not None for worker in self._workers)
+            return {
+                "pending": len(self._pending),
+                "busy": busy,
+                "idle": len(self._workers) - busy,
+                "started": self.started,
+                "recycled": self.recycled,
+                "lost": self.lost,
+            }
+
+    def shutdown(self, wait: bool = True, cancel: bool = False):
+        """Stop accepting jobs, cancel pending and running ones if `cancel`"""
+        with self._lock:
+            self._closed = True
+            if cancel:
+                for job in self._pending:
+                    job.cancel()
+                for worker in self._workers:
+                    if worker.job is not None:
+                        worker.job.cancel()
+        self._wake()
+        if wait:
+            self._supervisor.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.shutdown()
+
+    def _wake(self):
+        with self._lock:
+            self._wakeup.send_bytes(b"")
+
+    def _spawn(self):
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=_work,
+            args=(child, self.max_jobs, self.max_rss_mb),
+            name="ntimporters-worker",
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        self._workers.append(_Worker(process, parent))
+        self.started += 1
+
+    def _supervise(self):
+        while True:
+            with self._lock:
+                self._dispatch()
+                self._forward_cancels()
+                if self._closed and not self._pending and all(
+                    worker.job is None for worker in self._workers
+                ):
+                    break
+                waitables = [self._wakeup_reader]
+                for worker in self._workers:
+                    waitables += (worker.conn, worker.process.sentinel)
+            ready = connection.wait(waitables, timeout=POLL_INTERVAL)
+            if self._wakeup_reader in ready:
+                while self._wakeup_reader.poll():
+                    self._wakeup_reader.recv_bytes()
+            with self._lock:
+                for worker in list(self._workers):
+                    self._receive(worker)
+                    if not worker.process.is_alive():
+                        self._replace(worker)
+        for worker in self._workers:
+            try:
+                worker.conn.send(("stop",))
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join()
+            worker.conn.close()
+
+    def _dispatch(self):
+        """Send pending jobs to idle workers, must be called with the lock held"""
+        for worker in self._workers:
+            if not self._pending:
+                return
+            if worker.job is not None or worker.retiring or not worker.process.is_alive():
+                continue
+            while self._pending:
+                job = self._pending.popleft()
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                worker.job, worker.cancel_sent = job, False
+                worker.conn.send(
+                    ("run", job.id, job.importer, job.kwargs, job.timeout, job.progress is not None)
+                )
+                break
+
+    def _forward_cancels(self):
+        """Pass cancellation of running jobs to their workers"""
+        for worker in self._workers:
+            if worker.job is None or worker.cancel_sent:
+                continue
+            if worker.job.cancel_token.cancelled:
+                worker.conn.send(("cancel", worker.job.id))
+                worker.cancel_sent = True
+
+    def _receive(self, worker: _Worker):
+        """Handle messages of worker, must be called with the lock held"""
+        while True:
+            try:
+                if not worker.conn.poll():
+                    return
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                return
+            job = worker.job
+            if job is None or message[1] != job.id:
+                continue
+            if message[0] == "progress":
+                if put := getattr(job.progress, "put", None):
+                    put(message[2])
+                else:
+                    job.progress(message[2])
+            elif message[0] == "done":
+                _, _, result, error, worker.retiring = message
+                worker.job = None
+                worker.jobs_done += 1
+                if error is not None:
+                    job.future.set_exception(error)
+                else:
+                    job.future.set_result(result)
+
+    def _replace(self, worker: _Worker):
+        """Replace exited worker, failing its job if any"""
+        self._workers.remove(worker)
+        worker.process.join()
+        worker.conn.close()
+        if worker.job is not None:
+            self.lost += 1
+            worker.job.future.set_exception(
+                ImportException(f"Worker process exited with code {worker.process.exitcode}")
+            )
+        else:
+            self.recycled += 1
+        if not self._closed:
+            self._spawn()
+
@@ -17,46 +17,108 @@
 
 __version__ = "1.0.0"
 
-# import apis into sdk package
-from openapi_client.api.attachments_api import AttachmentsApi
-from openapi_client.api.comments_api import CommentsApi
-from openapi_client.api.group_assignments_api import GroupAssignmentsApi
-from openapi_client.api.project_accesses_api import ProjectAccessesApi
-from openapi_client.api.project_groups_api import ProjectGroupsApi
-from openapi_client.api.project_sections_api import ProjectSectionsApi
-from openapi_client.api.projects_api import ProjectsApi
-from openapi_client.api.reminders_api import RemindersApi
-from openapi_client.api.tag_assignments_api import TagAssignmentsApi
-from openapi_client.api.tags_api import TagsApi
-from openapi_client.api.tasks_api import TasksApi
-from openapi_client.api.team_members_api import TeamMembersApi
-from openapi_client.api.teams_api import TeamsApi
-from openapi_client.api.users_api import UsersApi
-
-# import ApiClient
-from openapi_client.api_response import ApiResponse
-from openapi_client.api_client import ApiClient
-from openapi_client.configuration import Configuration
-from openapi_client.exceptions import OpenApiException
-from openapi_client.exceptions import ApiTypeError
-from openapi_client.exceptions import ApiValueError
-from openapi_client.exceptions import ApiKeyError
-from openapi_client.exceptions import ApiAttributeError
-from openapi_client.exceptions import ApiException
-
-# import models into sdk package
-from openapi_client.models.attachment import Attachment
-from openapi_client.models.color import Color
-from openapi_client.models.comment import Comment
-from openapi_client.models.group_assignment import GroupAssignment
-from openapi_client.models.project import Project
-from openapi_client.models.project_access import ProjectAccess
-from openapi_client.models.project_group import ProjectGroup
-from openapi_client.models.project_section import ProjectSection
-from openapi_client.models.reminder import Reminder
-from openapi_client.models.tag import Tag
-from openapi_client.models.tag_assignment import TagAssignment
-from openapi_client.models.task import Task
-from openapi_client.models.team import Team
-from openapi_client.models.team_member import TeamMember
-from openapi_client.models.user import User
+import importlib
+from typing import TYPE_CHECKING
+
+# apis, ApiClient and models are imported on first access (see __getattr__), so
+# importing the package does not build every pydantic model up front
+_LAZY = {
+    "AttachmentsApi": "openapi_client.api.attachments_api",
+    "CommentsApi": "openapi_client.api.comments_api",
+    "GroupAssignmentsApi": "openapi_client.api.group_assignments_api",
+    "ProjectAccessesApi": "openapi_client.api.project_accesses_api",
+    "ProjectGroupsApi": "openapi_client.api.project_groups_api",
+    "ProjectSectionsApi": "openapi_client.api.project_sections_api",
+    "ProjectsApi": "openapi_client.api.projects_api",
+    "RemindersApi": "openapi_client.api.reminders_api",
+    "TagAssignmentsApi": "openapi_client.api.tag_assignments_api",
+    "TagsApi": "openapi_client.api.tags_api",
+    "TasksApi": "openapi_client.api.tasks_api",
+    "TeamMembersApi": "openapi_client.api.team_members_api",
+    "TeamsApi": "openapi_client.api.teams_api",
+    "UsersApi": "openapi_client.api.users_api",
+    "ApiResponse": "openapi_client.api_response",
+    "ApiClient": "openapi_client.api_client",
+    "Configuration": "openapi_client.configuration",
+    "OpenApiException": "openapi_client.exceptions",
+    "ApiTypeError": "openapi_client.exceptions",
+    "ApiValueError": "openapi_client.exceptions",
+    "ApiKeyError": "openapi_client.exceptions",
+    "ApiAttributeError": "openapi_client.exceptions",
+    "ApiException": "openapi_client.exceptions",
+    "Attachment": "openapi_client.models.attachment",
+    "Color": "openapi_client.models.color",
+    "Comment": "openapi_client.models.comment",
+    "GroupAssignment": "openapi_client.models.group_assignment",
+    "Project": "openapi_client.models.project",
+    "ProjectAccess": "openapi_client.models.project_access",
+    "ProjectGroup": "openapi_client.models.project_group",
+    "ProjectSection": "openapi_client.models.project_section",
+    "Reminder": "openapi_client.models.reminder",
+    "Tag": "openapi_client.models.tag",
+    "TagAssignment": "openapi_client.models.tag_assignment",
+    "Task": "openapi_client.models.task",
+    "Team": "openapi_client.models.team",
+    "TeamMember": "openapi_client.models.team_member",
+    "User": "openapi_client.models.user",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from openapi_client.api.attachments_api import AttachmentsApi
+    from openapi_client.api.comments_api import CommentsApi
+    from openapi_client.api.group_assignments_api import GroupAssignmentsApi
+    from openapi_client.api.project_accesses_api import ProjectAccessesApi
+    from openapi_client.api.project_groups_api import ProjectGroupsApi
+    from openapi_client.api.project_sections_api import ProjectSectionsApi
+    from openapi_client.api.projects_api import ProjectsApi
+    from openapi_client.api.reminders_api import RemindersApi
+    from openapi_client.api.tag_assignments_api import TagAssignmentsApi
+    from openapi_client.api.tags_api import TagsApi
+    from openapi_client.api.tasks_api import TasksApi
+    from openapi_client.api.team_members_api import TeamMembersApi
+    from openapi_client.api.teams_api import TeamsApi
+    from openapi_client.api.users_api import UsersApi
+    from openapi_client.api_response import ApiResponse
+    from openapi_client.api_client import ApiClient
+    from openapi_client.configuration import Configuration
+    from openapi_client.exceptions import OpenApiException
+    from openapi_client.exceptions import ApiTypeError
+    from openapi_client.exceptions import ApiValueError
+    from openapi_client.exceptions import ApiKeyError
+    from openapi_client.exceptions import ApiAttributeError
+    from openapi_client.exceptions import ApiException
+    from openapi_client.models.attachment import Attachment
+    from openapi_client.models.color import Color
+    from openapi_client.models.comment import Comment
+    from openapi_client.models.group_assignment import GroupAssignment
+    from openapi_client.models.project import Project
+    from openapi_client.models.project_access import ProjectAccess
+    from openapi_client.models.project_group import ProjectGroup
+    from openapi_client.models.project_section import ProjectSection
+    from openapi_client.models.reminder import Reminder
+    from openapi_client.models.tag import Tag
+    from openapi_client.models.tag_assignment import TagAssignment
+    from openapi_client.models.task import Task
+    from openapi_client.models.team import Team
+    from openapi_client.models.team_member import TeamMember
+    from openapi_client.models.user import User
+
+
+# subpackages and modules, loaded as before on `openapi_client.<name>` access
+_SUBMODULES = ("api", "api_client", "api_response", "configuration", "exceptions", "models", "rest")
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    if (module := _LAZY.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY, *_SUBMODULES})
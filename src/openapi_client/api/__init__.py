@@ -1,18 +1,52 @@
 # flake8: noqa
 
-# import apis into api package
-from openapi_client.api.attachments_api import AttachmentsApi
-from openapi_client.api.comments_api import CommentsApi
-from openapi_client.api.group_assignments_api import GroupAssignmentsApi
-from openapi_client.api.project_accesses_api import ProjectAccessesApi
-from openapi_client.api.project_groups_api import ProjectGroupsApi
-from openapi_client.api.project_sections_api import ProjectSectionsApi
-from openapi_client.api.projects_api import ProjectsApi
-from openapi_client.api.reminders_api import RemindersApi
-from openapi_client.api.tag_assignments_api import TagAssignmentsApi
-from openapi_client.api.tags_api import TagsApi
-from openapi_client.api.tasks_api import TasksApi
-from openapi_client.api.team_members_api import TeamMembersApi
-from openapi_client.api.teams_api import TeamsApi
-from openapi_client.api.users_api import UsersApi
+import importlib
+from typing import TYPE_CHECKING
 
+# apis are imported on first access (see __getattr__)
+_LAZY = {
+    "AttachmentsApi": "openapi_client.api.attachments_api",
+    "CommentsApi": "openapi_client.api.comments_api",
+    "GroupAssignmentsApi": "openapi_client.api.group_assignments_api",
+    "ProjectAccessesApi": "openapi_client.api.project_accesses_api",
+    "ProjectGroupsApi": "openapi_client.api.project_groups_api",
+    "ProjectSectionsApi": "openapi_client.api.project_sections_api",
+    "ProjectsApi": "openapi_client.api.projects_api",
+    "RemindersApi": "openapi_client.api.reminders_api",
+    "TagAssignmentsApi": "openapi_client.api.tag_assignments_api",
+    "TagsApi": "openapi_client.api.tags_api",
+    "TasksApi": "openapi_client.api.tasks_api",
+    "TeamMembersApi": "openapi_client.api.team_members_api",
+    "TeamsApi": "openapi_client.api.teams_api",
+    "UsersApi": "openapi_client.api.users_api",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from openapi_client.api.attachments_api import AttachmentsApi
+    from openapi_client.api.comments_api import CommentsApi
+    from openapi_client.api.group_assignments_api import GroupAssignmentsApi
+    from openapi_client.api.project_accesses_api import ProjectAccessesApi
+    from openapi_client.api.project_groups_api import ProjectGroupsApi
+    from openapi_client.api.project_sections_api import ProjectSectionsApi
+    from openapi_client.api.projects_api import ProjectsApi
+    from openapi_client.api.reminders_api import RemindersApi
+    from openapi_client.api.tag_assignments_api import TagAssignmentsApi
+    from openapi_client.api.tags_api import TagsApi
+    from openapi_client.api.tasks_api import TasksApi
+    from openapi_client.api.team_members_api import TeamMembersApi
+    from openapi_client.api.teams_api import TeamsApi
+    from openapi_client.api.users_api import UsersApi
+
+
+def __getattr__(name: str):
+    if (module := _LAZY.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
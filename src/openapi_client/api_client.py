@@ -13,17 +13,22 @@
 """  # noqa: E501
 
 
+import codecs
 import datetime
 from dateutil.parser import parse
 from enum import Enum
+import functools
 import json
 import mimetypes
 import os
 import re
 import tempfile
+import threading
+import warnings
+from types import MappingProxyType
 
 from urllib.parse import quote
-from typing import Tuple, Optional, List, Dict, Union
+from typing import Any, Iterable, Iterator, Tuple, Optional, List, Dict, Union
 from pydantic import SecretStr
 
 from openapi_client.configuration import Configuration
@@ -42,6 +47,82 @@ from openapi_client.exceptions import (
 
 RequestSerialized = Tuple[str, str, Dict[str, str], Optional[str], List[str]]
 
+# JSON values written as they are by serialize_body, others go through sanitize_for_serialization
+_JSON_SCALARS = frozenset((str, int, float, bool))
+
+
+@functools.cache
+def _body_fields(klass) -> Tuple[Tuple[str, str, bool], ...]:
+    """(name, JSON key, nullable) of fields `klass.to_dict()` writes, in its order
+
+    Read-only fields are left out and nullable fields are written as null when
+    set to None explicitly. Both are only known to the generated `to_dict`, so
+    it is called once per model on instances made without validation: with
+    all fields set to find written ones and with all of them None to find
+    nullable ones.
+    """
+    names = list(klass.model_fields)
+    with warnings.catch_warnings():
+        # values do not match field types, pydantic warns on serialization
+        warnings.simplefilter("ignore")
+        written = klass.model_construct(**{name: object() for name in names}).to_dict()
+        nullable = klass.model_construct(
+            _fields_set=set(names), **dict.fromkeys(names)
+        ).to_dict()
+    fields = []
+    for name in names:
+        key = klass.model_fields[name].alias or name
+        if key in written:
+            fields.append((name, key, key in nullable))
+    return tuple(fields)
+
+
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Yields items of a JSON array from chunks of UTF-8 bytes as they arrive
+
+    Only the unparsed rest of the last chunk and the current item are held in
+    memory. Items are parsed with the json module: it can resume at an offset
+    of a partially received body.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer, pos, eof = "", 0, False
+    expected = "["
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n":
+            pos += 1
+        if pos < len(buffer):
+            char = buffer[pos]
+            if expected == "[":
+                if char != "[":
+                    raise ValueError(f"Expected JSON array, got {char!r}")
+                pos, expected = pos + 1, "item or ]"
+                continue
+            if char == "]" and expected != "item":
+                return
+            if expected == ", or ]":
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+                pos, expected = pos + 1, "item"
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            # a number ending with the buffer or before ".", "e", "+" or "-"
+            # may go on in the next chunk
+            if end is not None and (eof or end < len(buffer) and buffer[end] not in ".eE+-"):
+                pos, expected = end, ", or ]"
+                yield item
+                continue
+        if eof:
+            raise ValueError("Incomplete or invalid JSON array")
+        chunk = next(chunks, None)
+        eof = chunk is None
+        buffer, pos = buffer[pos:] + utf8.decode(chunk or b"", final=eof), 0
+
+
 class ApiClient:
     """Generic API client for OpenAPI client library builds.
 
@@ -50,6 +131,13 @@ class ApiClient:
     the methods and models for each application are generated from the OpenAPI
     templates.
 
+    Thread safety: one ApiClient (and API objects built on it) may be used
+    from many threads at once. State of a request is kept in the call,
+    `default_headers` is a read-only mapping replaced as a whole by
+    `set_default_header`, and the REST client shares only thread-safe
+    objects (pool manager or transport, limiter, metrics, cancel token).
+    The configuration must not be changed while requests are made.
+
     :param configuration: .Configuration object for this client
     :param header_name: a header to pass when making calls to the API.
     :param header_value: a header value to pass when making calls to
@@ -69,7 +157,6 @@ class ApiClient:
         'datetime': datetime.datetime,
         'object': object,
     }
-    _pool = None
 
     def __init__(
         self,
@@ -84,10 +171,16 @@ class ApiClient:
         self.configuration = configuration
 
         self.rest_client = rest.RESTClientObject(configuration)
-        self.default_headers = {}
+        self._default_headers_lock = threading.Lock()
+        self.default_headers = MappingProxyType({})
         if header_name is not None:
-            self.default_headers[header_name] = header_value
+            self.set_default_header(header_name, header_value)
         self.cookie = cookie
+        self.writes = None
+        """Write coalescer of creates posted with ntimporters.coalescing.post
+           (ntimporters.coalescing.WriteCoalescer), set within its `coalesce`
+           block, creates are sent right away when None.
+        """
         # Set default User-Agent.
         self.user_agent = 'OpenAPI-Generator/1.0.0/python'
         self.client_side_validation = configuration.client_side_validation
@@ -105,10 +198,14 @@ class ApiClient:
 
     @user_agent.setter
     def user_agent(self, value):
-        self.default_headers['User-Agent'] = value
+        self.set_default_header('User-Agent', value)
 
     def set_default_header(self, header_name, header_value):
-        self.default_headers[header_name] = header_value
+        """Replaces read-only default headers with a copy including the header"""
+        with self._default_headers_lock:
+            self.default_headers = MappingProxyType(
+                {**self.default_headers, header_name: header_value}
+            )
 
 
     _default = None
@@ -176,9 +273,8 @@ class ApiClient:
 
         config = self.configuration
 
-        # header parameters
-        header_params = header_params or {}
-        header_params.update(self.default_headers)
+        # header parameters, a new dict: headers passed by the caller are not changed
+        header_params = {**(header_params or {}), **self.default_headers}
         if self.cookie:
             header_params['Cookie'] = self.cookie
         if header_params:
@@ -225,7 +321,7 @@ class ApiClient:
 
         # body
         if body:
-            body = self.sanitize_for_serialization(body)
+            body = self.serialize_body(body)
 
         # request url
         if _host is None or self.configuration.ignore_operation_servers:
@@ -253,7 +349,8 @@ class ApiClient:
         header_params=None,
         body=None,
         post_params=None,
-        _request_timeout=None
+        _request_timeout=None,
+        _preload_content=True
     ) -> rest.RESTResponse:
         """Makes the HTTP request (synchronous)
         :param method: Method to call.
@@ -264,6 +361,8 @@ class ApiClient:
         :param post_params dict: Request post form parameters,
             for `application/x-www-form-urlencoded`, `multipart/form-data`.
         :param _request_timeout: timeout setting for this request.
+        :param _preload_content: if False, body is left unread for
+            response_deserialize_stream.
         :return: RESTResponse
         """
 
@@ -273,7 +372,8 @@ class ApiClient:
                 method, url,
                 headers=header_params,
                 body=body, post_params=post_params,
-                _request_timeout=_request_timeout
+                _request_timeout=_request_timeout,
+                _preload_content=_preload_content
             )
 
         except ApiException as e:
@@ -314,7 +414,15 @@ class ApiClient:
                 if content_type is not None:
                     match = re.search(r"charset=([a-zA-Z\-\d]+)[\s;]?", content_type)
                 encoding = match.group(1) if match else "utf-8"
-                response_text = response_data.data.decode(encoding)
+                if (
+                    content_type is not None
+                    and content_type.startswith("application/json")
+                    and encoding.lower() in ("utf-8", "utf8")
+                ):
+                    # JSON parsers read UTF-8 bytes, no need for an intermediate str
+                    response_text = response_data.data
+                else:
+                    response_text = response_data.data.decode(encoding)
                 return_data = self.deserialize(response_text, response_type, content_type)
         finally:
             if not 200 <= response_data.status <= 299:
@@ -331,6 +439,32 @@ class ApiClient:
             raw_data = response_data.data
         )
 
+    def response_deserialize_stream(
+        self,
+        response_data: rest.RESTResponse,
+        item_type: Union[str, type, None]
+    ) -> Iterator[Any]:
+        """Deserializes items of a JSON array response one by one as they arrive.
+
+        :param response_data: RESTResponse of call_api(..., _preload_content=False).
+        :param item_type: class literal or class name of items,
+            None to yield JSON records as they are.
+        :return: iterator of deserialized items, its connection is returned
+            to the pool once exhausted or closed.
+        """
+        try:
+            if not 200 <= response_data.status <= 299:
+                response_data.read()
+                raise ApiException.from_response(
+                    http_resp=response_data,
+                    body=response_data.data.decode("utf-8", "replace"),
+                    data=None,
+                )
+            for record in _iter_json_array(response_data.stream()):
+                yield record if item_type is None else self.__deserialize(record, item_type)
+        finally:
+            response_data.release()
+
     def sanitize_for_serialization(self, obj):
         """Builds a JSON POST object.
 
@@ -383,10 +517,47 @@ class ApiClient:
             for key, val in obj_dict.items()
         }
 
-    def deserialize(self, response_text: str, response_type: str, content_type: Optional[str]):
+    def serialize_body(self, body):
+        """Builds a JSON POST body.
+
+        Models and dicts are serialized straight to JSON bytes: fields of a
+        model are read from it (see _body_fields) instead of a `to_dict()`
+        followed by sanitize_for_serialization, None fields are skipped.
+        Other bodies are sanitized, as by sanitize_for_serialization.
+
+        :param body: The data to serialize.
+        :return: JSON bytes or the serialized form of body.
+        """
+        if isinstance(body, dict):
+            record = body
+            if any(
+                value is not None and type(value) not in _JSON_SCALARS
+                for value in body.values()
+            ):
+                record = self.sanitize_for_serialization(body)
+        elif hasattr(type(body), "model_fields") and hasattr(body, "to_dict"):
+            values, fields_set = body.__dict__, body.model_fields_set
+            record = {}
+            for name, key, nullable in _body_fields(type(body)):
+                value = values[name]
+                if value is None:
+                    if nullable and name in fields_set:
+                        record[key] = None
+                elif type(value) in _JSON_SCALARS:
+                    record[key] = value
+                else:
+                    record[key] = self.sanitize_for_serialization(value)
+        else:
+            return self.sanitize_for_serialization(body)
+        codec = self.configuration.json_codec
+        return codec.dumps(record) if codec else json.dumps(record).encode()
+
+    def deserialize(
+        self, response_text: Union[str, bytes], response_type: str, content_type: Optional[str]
+    ):
         """Deserializes response into an object.
 
-        :param response: RESTResponse object to be deserialized.
+        :param response_text: response body, JSON body may be UTF-8 bytes.
         :param response_type: class literal for
             deserialized object, or string of class name.
         :param content_type: content type of response.
@@ -394,17 +565,18 @@ class ApiClient:
         :return: deserialized object.
         """
 
+        loads = self.configuration.json_codec.loads if self.configuration.json_codec else json.loads
         # fetch data from response object
         if content_type is None:
             try:
-                data = json.loads(response_text)
+                data = loads(response_text)
             except ValueError:
                 data = response_text
         elif content_type.startswith("application/json"):
-            if response_text == "":
+            if not response_text:
                 data = ""
             else:
-                data = json.loads(response_text)
+                data = loads(response_text)
         elif content_type.startswith("text/plain"):
             data = response_text
         else:
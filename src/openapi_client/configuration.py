@@ -219,15 +219,73 @@ conf = openapi_client.Configuration(
         """date format
         """
 
+        self.rate_limit_delay = 10
+        """Seconds to wait before retrying a request rejected with 429
+           without Retry-After header
+        """
+
+        self.metrics = None
+        """Telemetry sink, e.g. ntimporters.telemetry.Metrics
+           Requests made by the client are reported with
+           `record_request`, `record_retry` and `record_sleep`.
+        """
+
+        self.cancel_token = None
+        """Cancellation token, e.g. ntimporters.cancellation.CancelToken
+           Checked before every request (`check`), used for 429 back-off
+           (`sleep`) and to bound request timeouts (`timeout`).
+        """
+
+        self.limiter = None
+        """Concurrent requests limiter, e.g. ntimporters.concurrency.RequestLimiter
+           Every request waits for `slot("nozbe")` and reports its status to
+           the slot, so adaptive limits react to 429 and 5xx responses.
+        """
+
+        self.dry_run = None
+        """Dry-run recorder, e.g. ntimporters.dry_run.DryRun
+           Its `wrap(pool_manager)` result is used instead of the pool manager,
+           so that writes are recorded and not sent.
+        """
+
+        self.json_codec = None
+        """JSON codec, e.g. ntimporters.json_codec.OrjsonCodec
+           Its `dumps(obj) -> bytes` serializes request bodies and `loads(bytes)`
+           parses JSON responses without decoding them to str first.
+           The json module is used when not set.
+        """
+
+        self.transport = None
+        """Transport of requests, e.g. ntimporters.transport.Http2Transport
+           An object with urllib3.PoolManager's `request` method, used
+           instead of a PoolManager built from this configuration.
+        """
+
+        self.singleflight = None
+        """Coalescing of reads, e.g. ntimporters.singleflight.SingleFlight
+           Concurrent GET requests with the same URL and headers share one
+           request and its response through its `do(key, func)`.
+        """
+
     def __deepcopy__(self, memo):
         cls = self.__class__
         result = cls.__new__(cls)
         memo[id(self)] = result
         for k, v in self.__dict__.items():
-            if k not in ('logger', 'logger_file_handler'):
+            if k not in ('logger', 'logger_file_handler', 'metrics', 'cancel_token', 'limiter',
+                         'dry_run', 'json_codec', 'transport', 'singleflight'):
                 setattr(result, k, copy.deepcopy(v, memo))
         # shallow copy of loggers
         result.logger = copy.copy(self.logger)
+        # metrics, cancel token, limiter, dry-run recorder, JSON codec, transport
+        # and singleflight are shared
+        result.metrics = self.metrics
+        result.cancel_token = self.cancel_token
+        result.limiter = self.limiter
+        result.dry_run = self.dry_run
+        result.json_codec = self.json_codec
+        result.transport = self.transport
+        result.singleflight = self.singleflight
         # use setters to configure loggers
         result.logger_file = self.logger_file
         result.debug = self.debug
@@ -14,19 +14,55 @@
 """  # noqa: E501
 
 
-# import models into model package
-from openapi_client.models.attachment import Attachment
-from openapi_client.models.color import Color
-from openapi_client.models.comment import Comment
-from openapi_client.models.group_assignment import GroupAssignment
-from openapi_client.models.project import Project
-from openapi_client.models.project_access import ProjectAccess
-from openapi_client.models.project_group import ProjectGroup
-from openapi_client.models.project_section import ProjectSection
-from openapi_client.models.reminder import Reminder
-from openapi_client.models.tag import Tag
-from openapi_client.models.tag_assignment import TagAssignment
-from openapi_client.models.task import Task
-from openapi_client.models.team import Team
-from openapi_client.models.team_member import TeamMember
-from openapi_client.models.user import User
+import importlib
+from typing import TYPE_CHECKING
+
+# models are imported on first access (see __getattr__)
+_LAZY = {
+    "Attachment": "openapi_client.models.attachment",
+    "Color": "openapi_client.models.color",
+    "Comment": "openapi_client.models.comment",
+    "GroupAssignment": "openapi_client.models.group_assignment",
+    "Project": "openapi_client.models.project",
+    "ProjectAccess": "openapi_client.models.project_access",
+    "ProjectGroup": "openapi_client.models.project_group",
+    "ProjectSection": "openapi_client.models.project_section",
+    "Reminder": "openapi_client.models.reminder",
+    "Tag": "openapi_client.models.tag",
+    "TagAssignment": "openapi_client.models.tag_assignment",
+    "Task": "openapi_client.models.task",
+    "Team": "openapi_client.models.team",
+    "TeamMember": "openapi_client.models.team_member",
+    "User": "openapi_client.models.user",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from openapi_client.models.attachment import Attachment
+    from openapi_client.models.color import Color
+    from openapi_client.models.comment import Comment
+    from openapi_client.models.group_assignment import GroupAssignment
+    from openapi_client.models.project import Project
+    from openapi_client.models.project_access import ProjectAccess
+    from openapi_client.models.project_group import ProjectGroup
+    from openapi_client.models.project_section import ProjectSection
+    from openapi_client.models.reminder import Reminder
+    from openapi_client.models.tag import Tag
+    from openapi_client.models.tag_assignment import TagAssignment
+    from openapi_client.models.task import Task
+    from openapi_client.models.team import Team
+    from openapi_client.models.team_member import TeamMember
+    from openapi_client.models.user import User
+
+
+def __getattr__(name: str):
+    if (module := _LAZY.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
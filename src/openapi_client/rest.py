@@ -50,6 +50,20 @@ class RESTResponse(io.IOBase):
             self.data = self.response.data
         return self.data
 
+    def stream(self, chunk_size=2**16):
+        """Yields body in chunks as they arrive, or at once if already read."""
+        if self.data is not None or not hasattr(self.response, "stream"):
+            yield self.read()
+            return
+        yield from self.response.stream(chunk_size)
+
+    def release(self):
+        """Returns connection to the pool, closing it if body was not read to the end."""
+        if hasattr(self.response, "release_conn"):
+            if not self.response.isclosed():
+                self.response.close()
+            self.response.release_conn()
+
     def getheaders(self):
         """Returns a dictionary of the response headers."""
         return self.response.headers
@@ -59,60 +73,125 @@ class RESTResponse(io.IOBase):
         return self.response.headers.get(name, default)
 
 
-class RESTClientObject:
-    def __init__(self, configuration) -> None:
-        # urllib3.PoolManager will pass all kw parameters to connectionpool
-        # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/poolmanager.py#L75  # noqa: E501
-        # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/connectionpool.py#L680  # noqa: E501
-        # Custom SSL certificates and client certificates: http://urllib3.readthedocs.io/en/latest/advanced-usage.html  # noqa: E501
-
-        self.rate_limiting_tries = 0
-        # cert_reqs
-        if configuration.verify_ssl:
-            cert_reqs = ssl.CERT_REQUIRED
-        else:
-            cert_reqs = ssl.CERT_NONE
+def _retry_after(response, default: float) -> float:
+    """Seconds to wait before retry: Retry-After header (in seconds) or default"""
+    try:
+        return max(0.0, float(response.headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
 
-        pool_args = {
-            "cert_reqs": cert_reqs,
-            "ca_certs": configuration.ssl_ca_cert,
-            "cert_file": configuration.cert_file,
-            "key_file": configuration.key_file,
-        }
-        if configuration.assert_hostname is not None:
-            pool_args["assert_hostname"] = configuration.assert_hostname
 
-        if configuration.retries is not None:
-            pool_args["retries"] = configuration.retries
+def _body_size(body) -> int:
+    """Bytes of request body sent (str bodies are sent UTF-8 encoded), 0 for streams"""
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return len(body) if isinstance(body, bytes) else 0
 
-        if configuration.tls_server_name:
-            pool_args["server_hostname"] = configuration.tls_server_name
 
-        if configuration.socket_options is not None:
-            pool_args["socket_options"] = configuration.socket_options
+def pool_manager(configuration) -> urllib3.PoolManager:
+    """Returns urllib3 pool manager (or proxy manager) of configuration."""
+    # urllib3.PoolManager will pass all kw parameters to connectionpool
+    # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/poolmanager.py#L75  # noqa: E501
+    # https://github.com/shazow/urllib3/blob/f9409436f83aeb79fbaf090181cd81b784f1b8ce/urllib3/connectionpool.py#L680  # noqa: E501
+    # Custom SSL certificates and client certificates: http://urllib3.readthedocs.io/en/latest/advanced-usage.html  # noqa: E501
 
-        if configuration.connection_pool_maxsize is not None:
-            pool_args["maxsize"] = configuration.connection_pool_maxsize
+    # cert_reqs
+    if configuration.verify_ssl:
+        cert_reqs = ssl.CERT_REQUIRED
+    else:
+        cert_reqs = ssl.CERT_NONE
+
+    pool_args = {
+        "cert_reqs": cert_reqs,
+        "ca_certs": configuration.ssl_ca_cert,
+        "cert_file": configuration.cert_file,
+        "key_file": configuration.key_file,
+    }
+    if configuration.assert_hostname is not None:
+        pool_args["assert_hostname"] = configuration.assert_hostname
+
+    if configuration.retries is not None:
+        pool_args["retries"] = configuration.retries
+    else:
+        # connection errors are retried as by default, responses never: 429s are
+        # retried by RESTClientObject, seen by metrics, limiter and cancel token
+        pool_args["retries"] = urllib3.Retry(
+            total=3, status_forcelist=(), respect_retry_after_header=False
+        )
 
-        # https pool manager
-        self.pool_manager: urllib3.PoolManager
+    if configuration.tls_server_name:
+        pool_args["server_hostname"] = configuration.tls_server_name
 
-        if configuration.proxy:
-            if is_socks_proxy_url(configuration.proxy):
-                from urllib3.contrib.socks import SOCKSProxyManager
+    if configuration.socket_options is not None:
+        pool_args["socket_options"] = configuration.socket_options
 
-                pool_args["proxy_url"] = configuration.proxy
-                pool_args["headers"] = configuration.proxy_headers
-                self.pool_manager = SOCKSProxyManager(**pool_args)
-            else:
-                pool_args["proxy_url"] = configuration.proxy
-                pool_args["proxy_headers"] = configuration.proxy_headers
-                self.pool_manager = urllib3.ProxyManager(**pool_args)
+    if configuration.connection_pool_maxsize is not None:
+        pool_args["maxsize"] = configuration.connection_pool_maxsize
+
+    if configuration.proxy:
+        if is_socks_proxy_url(configuration.proxy):
+            from urllib3.contrib.socks import SOCKSProxyManager
+
+            pool_args["proxy_url"] = configuration.proxy
+            pool_args["headers"] = configuration.proxy_headers
+            return SOCKSProxyManager(**pool_args)
         else:
-            self.pool_manager = urllib3.PoolManager(**pool_args)
+            pool_args["proxy_url"] = configuration.proxy
+            pool_args["proxy_headers"] = configuration.proxy_headers
+            return urllib3.ProxyManager(**pool_args)
+    else:
+        return urllib3.PoolManager(**pool_args)
+
+
+class RESTClientObject:
+    """HTTP client of ApiClient, safe to share across threads
+
+    Attributes are set once from the configuration; state of a request
+    (including its 429 retries) is kept in the call, the pool manager and
+    the limiter are thread-safe.
+    """
+    def __init__(self, configuration) -> None:
+        self.rate_limit_delay = configuration.rate_limit_delay
+        self.metrics = configuration.metrics
+        self.cancel_token = configuration.cancel_token
+        self.limiter = configuration.limiter
+        self.json_codec = configuration.json_codec
+        self.singleflight = configuration.singleflight
+        # https pool manager
+        self.pool_manager: urllib3.PoolManager = (
+            configuration.transport
+            if configuration.transport is not None
+            else pool_manager(configuration)
+        )
+
+        if configuration.dry_run is not None:
+            self.pool_manager = configuration.dry_run.wrap(self.pool_manager)
+
+    def _pool_request(self, method, url, read=True, **kwargs):
+        """Perform request with pool manager, within a limiter slot if any
+
+        Body is read within the slot unless `read` is False (streamed responses).
+        """
+        if self.limiter is None:
+            return self.pool_manager.request(method, url, **kwargs)
+        with self.limiter.slot("nozbe", self.cancel_token) as outcome:
+            r = self.pool_manager.request(method, url, **kwargs)
+            if read:
+                # read body before releasing the slot
+                r.data
+            outcome.status = r.status
+            return r
 
     def request(
-        self, method, url, headers=None, body=None, post_params=None, _request_timeout=None
+        self,
+        method,
+        url,
+        headers=None,
+        body=None,
+        post_params=None,
+        _request_timeout=None,
+        _preload_content=True,
+        _rate_limit_tries=0,
     ):
         """Perform requests.
 
@@ -127,8 +206,47 @@ class RESTClientObject:
                                  number provided, it will be total request
                                  timeout. It can also be a pair (tuple) of
                                  (connection, read) timeouts.
+        :param _preload_content: if False, body of GET response is left unread
+                                 for RESTResponse.stream (not read within the
+                                 limiter slot either).
+        :param _rate_limit_tries: number of 429 responses to this request
+                                  so far, it is retried up to 37 times.
         """
         method = method.upper()
+        if method == "GET" and _preload_content and self.singleflight is not None:
+            # concurrent identical reads share one request and its (read) response
+            key = (url, tuple(sorted((headers or {}).items())))
+            return self.singleflight.do(key, self._read, url, headers, _request_timeout)
+        return self._request(
+            method,
+            url,
+            headers=headers,
+            body=body,
+            post_params=post_params,
+            _request_timeout=_request_timeout,
+            _preload_content=_preload_content,
+            _rate_limit_tries=_rate_limit_tries,
+        )
+
+    def _read(self, url, headers, _request_timeout):
+        """GET request with its response read"""
+        response = self._request("GET", url, headers=headers, _request_timeout=_request_timeout)
+        response.read()
+        return response
+
+    def _request(
+        self,
+        method,
+        url,
+        headers=None,
+        body=None,
+        post_params=None,
+        _request_timeout=None,
+        _preload_content=True,
+        _rate_limit_tries=0,
+    ):
+        """Perform request, see `request`"""
+        method = method.upper()
         assert method in ["GET", "HEAD", "DELETE", "POST", "PUT", "PATCH", "OPTIONS"]
 
         if post_params and body:
@@ -141,6 +259,11 @@ class RESTClientObject:
         if devtoken := getenv("DEV_ACCESS_TOKEN"):
             headers["X-DevToken"] = devtoken
 
+        if self.cancel_token is not None:
+            # do not start new requests once cancelled, bound them by the deadline
+            self.cancel_token.check()
+            _request_timeout = _request_timeout or self.cancel_token.timeout()
+
         timeout = None
         if _request_timeout:
             if isinstance(_request_timeout, (int, float)):
@@ -148,16 +271,22 @@ class RESTClientObject:
             elif isinstance(_request_timeout, tuple) and len(_request_timeout) == 2:
                 timeout = urllib3.Timeout(connect=_request_timeout[0], read=_request_timeout[1])
 
+        request_body = None
+        start = time.perf_counter()
         try:
             # For `POST`, `PUT`, `PATCH`, `OPTIONS`, `DELETE`
             if method in ["POST", "PUT", "PATCH", "OPTIONS", "DELETE"]:
                 # no content type provided or payload is json
                 content_type = headers.get("Content-Type")
                 if not content_type or re.search("json", content_type, re.IGNORECASE):
-                    request_body = None
-                    if body is not None:
-                        request_body = json.dumps(body)
-                    r = self.pool_manager.request(
+                    if isinstance(body, bytes):
+                        # serialized by ApiClient.serialize_body
+                        request_body = body
+                    elif body is not None:
+                        request_body = (
+                            self.json_codec.dumps(body) if self.json_codec else json.dumps(body)
+                        )
+                    r = self._pool_request(
                         method,
                         url,
                         body=request_body,
@@ -166,7 +295,7 @@ class RESTClientObject:
                         preload_content=False,
                     )
                 elif content_type == "application/x-www-form-urlencoded":
-                    r = self.pool_manager.request(
+                    r = self._pool_request(
                         method,
                         url,
                         fields=post_params,
@@ -185,7 +314,7 @@ class RESTClientObject:
                         (a, json.dumps(b)) if isinstance(b, dict) else (a, b)
                         for a, b in post_params
                     ]
-                    r = self.pool_manager.request(
+                    r = self._pool_request(
                         method,
                         url,
                         fields=post_params,
@@ -198,7 +327,7 @@ class RESTClientObject:
                 # other content types than JSON when `body` argument is
                 # provided in serialized form.
                 elif isinstance(body, str) or isinstance(body, bytes):
-                    r = self.pool_manager.request(
+                    r = self._pool_request(
                         method,
                         url,
                         body=body,
@@ -208,7 +337,7 @@ class RESTClientObject:
                     )
                 elif headers["Content-Type"] == "text/plain" and isinstance(body, bool):
                     request_body = "true" if body else "false"
-                    r = self.pool_manager.request(
+                    r = self._pool_request(
                         method,
                         url,
                         body=request_body,
@@ -224,20 +353,49 @@ class RESTClientObject:
                     raise ApiException(status=0, reason=msg)
             # For `GET`, `HEAD`
             else:
-                r = self.pool_manager.request(
-                    method, url, fields={}, timeout=timeout, headers=headers, preload_content=False
+                r = self._pool_request(
+                    method,
+                    url,
+                    read=_preload_content,
+                    fields={},
+                    timeout=timeout,
+                    headers=headers,
+                    preload_content=False,
+                )
+
+            if self.metrics is not None:
+                self.metrics.record_request(
+                    "nozbe",
+                    method,
+                    url,
+                    r.status,
+                    time.perf_counter() - start,
+                    bytes_in=int(r.headers.get("Content-Length") or 0),
+                    bytes_out=_body_size(request_body or body),
                 )
 
-            if r.status == 429 and self.rate_limiting_tries <= 36:
-                self.rate_limiting_tries += 1
-                time.sleep(10)
-                return self.request(
+            if r.status == 429 and _rate_limit_tries <= 36:
+                delay = _retry_after(r, self.rate_limit_delay)
+                if hasattr(r, "release_conn"):
+                    # read the short body, so the connection can be reused
+                    _ = r.data
+                    r.release_conn()
+                if self.metrics is not None:
+                    self.metrics.record_retry("nozbe")
+                    self.metrics.record_sleep("nozbe", delay)
+                if self.cancel_token is not None:
+                    self.cancel_token.sleep(delay)
+                else:
+                    time.sleep(delay)
+                return self._request(
                     method,
                     url,
                     headers=headers,
                     body=body,
                     post_params=post_params,
                     _request_timeout=_request_timeout,
+                    _preload_content=_preload_content,
+                    _rate_limit_tries=_rate_limit_tries + 1,
                 )
 
         except urllib3.exceptions.SSLError as e: